@@ -3,12 +3,14 @@ import pandas as pd
 from faker import Faker
 import warnings
 
+from formato_colunar import salvar_pacientes
+
 # Ignorar FutureWarnings do pandas que podem aparecer com certas versões do numpy/pandas
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
-def gerar_pacientes_realistas(qtd=500, file_path="pacientes_simulados_realistas_v3.csv"):
+def gerar_pacientes_realistas(qtd=500, file_path="pacientes_simulados_realistas_v3.parquet", motor="laco"):
     """
-    Gera um DataFrame e um arquivo CSV de pacientes diabéticos simulados (Versão 3).
+    Gera um DataFrame e um arquivo (Parquet ou CSV) de pacientes diabéticos simulados (Versão 3).
     Os parâmetros são baseados na literatura fornecida sobre pé diabético,
     simulando dados de um sistema de palmilha inteligente (in-shoe).
     
@@ -18,8 +20,23 @@ def gerar_pacientes_realistas(qtd=500, file_path="pacientes_simulados_realistas_
     - Torna 'stance_time_s' (para PTI) dependente da velocidade da marcha.
       com DM.
     - Confirma faixas de Pressão (kPa) e Assimetria de Temperatura (°C).
+
+    motor: 'laco' (padrão, um paciente por iteração) ou 'vetorizado'
+    (gerador_vetorizado.gerar_lote, mesmas distribuições e esquema,
+    sorteadas como vetores a partir de um np.random.Generator).
     """
     
+    if motor == 'vetorizado':
+        # Motor vetorizado: todas as colunas sorteadas como vetores NumPy, já na ordem final
+        from gerador_vetorizado import gerar_lote
+        df = gerar_lote(qtd, np.random.default_rng(42))
+        try:
+            salvar_pacientes(df, file_path)
+            print(f"Arquivo '{file_path}' gerado com {qtd} pacientes.")
+        except Exception as e:
+            print(f"Erro ao salvar o arquivo '{file_path}': {e}")
+        return df
+
     faker = Faker('pt_BR') 
     np.random.seed(42) # Para reprodutibilidade
     
@@ -248,9 +265,10 @@ def gerar_pacientes_realistas(qtd=500, file_path="pacientes_simulados_realistas_
     ]
     df = df[colunas_perfil + colunas_sensores]
     
-    # Salvar em CSV com separador ; e decimal , (comum no Brasil)
+    # Salvar em Parquet (esquema compacto de features.txt) ou, se o caminho
+    # terminar em .csv, em CSV com separador ; e decimal , (comum no Brasil)
     try:
-        df.to_csv(file_path, index=False, sep=';', decimal=',')
+        salvar_pacientes(df, file_path)
         print(f"Arquivo '{file_path}' gerado com {qtd} pacientes.")
         
         # Imprimir estatísticas de verificação
@@ -272,10 +290,10 @@ def gerar_pacientes_realistas(qtd=500, file_path="pacientes_simulados_realistas_
 
 
     except Exception as e:
-        print(f"Erro ao salvar o arquivo CSV: {e}")
+        print(f"Erro ao salvar o arquivo '{file_path}': {e}")
         
     return df
 
 if __name__ == "__main__":
     # Gera 1000 novos e salva em um arquivo diferente
-    gerar_pacientes_realistas(qtd=1000, file_path="novos_1000_pacientes.csv")
\ No newline at end of file
+    gerar_pacientes_realistas(qtd=1000, file_path="novos_1000_pacientes.parquet")
\ No newline at end of file
@@ -1,27 +1,39 @@
 # analise_modelagem_v3.py
 # Script atualizado para o gerador de pacientes v3 (baseado na literatura)
 
+import os
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 from sklearn.preprocessing import StandardScaler
-from imblearn.over_sampling import SMOTE
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, f1_score, roc_auc_score, confusion_matrix
 import numpy as np
 import joblib
 
+from formato_colunar import ler_pacientes
+from engenharia_features import adicionar_features, FEATURES_NUMERICAS, FEATURES_CATEGORICAS
+from pacote_modelo import salvar_pacote, ARQUIVO_PACOTE
+from balanceamento import balancear, criar_floresta
+
+# Tratamento do desbalanceamento: 'smote' (padrão), 'smote_paralelo', 'peso_classe',
+# 'peso_classe_subamostra', 'bootstrap_balanceado' ou 'subamostragem'.
+# Custo e qualidade de cada uma: python balanceamento.py [qtd]
+ESTRATEGIA_BALANCEAMENTO = 'smote'
+
+# Modo sem gráficos (ex.: 'python pacientes.py --sem-graficos treinar'): não importa
+# seaborn/matplotlib nem bloqueia em plt.show(); só gera os artefatos.
+SEM_GRAFICOS = os.environ.get('PACIENTES_SEM_GRAFICOS') == '1'
+
 # --- 1. Carregamento dos Dados ---
 try:
-    df_500 = pd.read_csv("pacientes_simulados_v3_literatura.csv", sep=';', decimal=',')
-    df_1000 = pd.read_csv("novos_1000_pacientes.csv", sep=';', decimal=',')
+    # Parquet com esquema compacto (CSVs antigos: python formato_colunar.py entrada.csv saida.parquet)
+    df_500 = ler_pacientes("pacientes_simulados_v3_literatura.parquet")
+    df_1000 = ler_pacientes("novos_1000_pacientes.parquet")
     # Combina os dois DataFrames
     df = pd.concat([df_500, df_1000], ignore_index=True)
     print(f"Dados combinados com sucesso: {df.shape[0]} pacientes e {df.shape[1]} colunas.") # Total 1500
 except FileNotFoundError as e:
     print(f"Erro: Arquivo não encontrado - {e}")
-    print("Certifique-se que ambos os arquivos CSV existem.")
+    print("Certifique-se que ambos os arquivos de pacientes existem.")
     exit()
 except Exception as e:
      print(f"Erro ao carregar ou concatenar arquivos: {e}")
@@ -31,23 +43,11 @@ print(f"Dados carregados com sucesso: {df.shape[0]} pacientes e {df.shape[1]} co
 
 # --- 2. Pré-processamento e Engenharia de Features ---
 
-# Converter 'sexo' para numérico
-df['sexo'] = df['sexo'].map({'M': 0, 'F': 1})
-
-# Engenharia de Features: Criar médias e assimetrias
+# Converter 'sexo' para numérico e criar médias e assimetrias (módulo compartilhado
+# com os scripts de pontuação, para que treino e previsão usem o mesmo código).
 # A literatura sugere que a assimetria (diferença entre pés) é um forte preditor.
 # A média pode reduzir o ruído e a dimensionalidade.
-
-# Média dos Picos de Pressão
-df['pressao_pico_media'] = df[['pressao_pico_esq_kpa', 'pressao_pico_dir_kpa']].mean(axis=1)
-# Assimetria de Pressão (Absoluta)
-df['pressao_assimetria_kpa'] = (df['pressao_pico_esq_kpa'] - df['pressao_pico_dir_kpa']).abs()
-# Média da Integral Pressão-Tempo (PTI)
-df['pressao_integral_media'] = df[['pressao_integral_esq_kpa_s', 'pressao_integral_dir_kpa_s']].mean(axis=1)
-# Média da Temperatura
-df['temperatura_media'] = df[['temperatura_esq_c', 'temperatura_dir_c']].mean(axis=1)
-# Média da Umidade
-df['umidade_media'] = df[['umidade_esq_perc', 'umidade_dir_perc']].mean(axis=1)
+adicionar_features(df)
 
 # --- 3. Análise Exploratória (Atualizada) ---
 
@@ -60,35 +60,33 @@ sensor_features_v3 = [
 print(df[sensor_features_v3].describe().to_markdown(floatfmt=".2f"))
 
 # Plotar a distribuição da Assimetria de Temperatura (um preditor chave)
-sns.histplot(data=df, x='temp_assimetria_c', hue='risco_ulcera_calc', kde=True, multiple="stack")
-plt.axvline(x=2.2, color='red', linestyle='--', label='Limiar Crítico (2.2°C)')
-plt.legend()
-plt.title('Distribuição da Assimetria de Temperatura por Risco')
-plt.show()
+if not SEM_GRAFICOS:
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+    sns.histplot(data=df, x='temp_assimetria_c', hue='risco_ulcera_calc', kde=True, multiple="stack")
+    plt.axvline(x=2.2, color='red', linestyle='--', label='Limiar Crítico (2.2°C)')
+    plt.legend()
+    plt.title('Distribuição da Assimetria de Temperatura por Risco')
+    plt.show()
 
 # --- 4. Preparação para Modelagem ---
 
+target = 'risco_ulcera_calc'
+
+# Split (Treino 70%, Teste 30%) decidido já aqui, sobre os índices, para que as
+# medianas de imputação venham só do treino (mesma divisão de antes: mesmo
+# random_state e estratificação)
+idx_treino, idx_teste = train_test_split(df.index, test_size=0.3, random_state=42, stratify=df[target])
+
 # Lidar com valores ausentes (embora o script de geração não crie NaNs, é uma boa prática)
-df.fillna(df.median(numeric_only=True), inplace=True)
+# Medianas do TREINO, usadas no treino e no teste e guardadas no pacote (a pontuação usa os mesmos valores)
+medianas_treino = df.loc[idx_treino].median(numeric_only=True)
+df.fillna(medianas_treino, inplace=True)
 
 # Definir features numéricas (para escalar) e categóricas (já são 0/1)
-features_num = [
-    'idade', 'tempo_diabetes_anos', 'hba1c_perc', 'imc', 'velocidade_marcha_m_s',
-    
-    # Features UMI adicionadas
-    'contagem_passos', 'aceleracao_vertical_rms', 'orientacao_pe_graus',
-    
-    # Features de engenharia existentes
-    'pressao_pico_media', 'pressao_integral_media',
-    'temperatura_media', 'temp_assimetria_c', 'umidade_media',
-    'pressao_assimetria_kpa'
-]
-
-features_cat = [
-    'sexo', 'neuropatia_s_n', 'deformidade_s_n', 'ulcera_previa_s_n',
-    'amputacao_previa_s_n', 'dap_s_n', 'retinopatia_s_n', 'nefropatia_s_n',
-    'has_s_n', 'tabagismo_s_n', 'alcool_s_n', 'atividade_fisica_s_n'
-]
+# (listas compartilhadas em engenharia_features com o treino out-of-core)
+features_num = list(FEATURES_NUMERICAS)
+features_cat = list(FEATURES_CATEGORICAS)
 
 # Escalar apenas as features numéricas
 scaler = StandardScaler()
@@ -106,7 +104,6 @@ colunas_remover = [
 ]
 
 # Definir X (features) e y (target)
-target = 'risco_ulcera_calc'
 X = df.drop(columns=colunas_remover + [target])
 y = df[target]
 
@@ -116,21 +113,20 @@ print(f"\nTarget (y): {target}")
 
 # --- 5. Treinamento e Avaliação do Modelo ---
 
-# Split (Treino 70%, Teste 30%)
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.3, random_state=42, stratify=y)
+# Split (Treino 70%, Teste 30%), com os índices sorteados antes da imputação
+X_train, X_test = X.loc[idx_treino], X.loc[idx_teste]
+y_train, y_test = y.loc[idx_treino], y.loc[idx_teste]
 
 print(f"\nDados divididos: {len(y_train)} para treino, {len(y_test)} para teste.")
-print(f"Distribuição do target no treino (antes SMOTE): \n{y_train.value_counts(normalize=True)}")
+print(f"Distribuição do target no treino (antes do balanceamento): \n{y_train.value_counts(normalize=True)}")
 
-# Balanceamento de Classes (SMOTE) apenas no treino
-smote = SMOTE(random_state=42)
-X_train_bal, y_train_bal = smote.fit_resample(X_train, y_train)
+# Balanceamento de Classes apenas no treino (estratégias sem reamostragem devolvem o próprio treino)
+X_train_bal, y_train_bal = balancear(ESTRATEGIA_BALANCEAMENTO, X_train, y_train, seed=42)
 
-print(f"\nDistribuição do target no treino (depois SMOTE): \n{y_train_bal.value_counts(normalize=True)}")
+print(f"\nDistribuição do target no treino (depois do balanceamento '{ESTRATEGIA_BALANCEAMENTO}'): \n{y_train_bal.value_counts(normalize=True)}")
 
 # Modelo: Random Forest Classifier
-rf = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1, max_depth=10)
+rf = criar_floresta(ESTRATEGIA_BALANCEAMENTO, seed=42, n_jobs=-1, n_estimators=100, max_depth=10)
 rf.fit(X_train_bal, y_train_bal)
 
 # --- 6. Resultados ---
@@ -179,8 +175,12 @@ joblib.dump(scaler, 'scaler_v1.joblib')
 joblib.dump(X.columns, 'features_v1.joblib')
 joblib.dump(features_num, 'numeric_features_v1.joblib')
 
+# Pacote único (modelo compilado + scaler + features + medianas de imputação + hash do esquema), usado na pontuação
+salvar_pacote(rf, scaler, X.columns, features_num, imputacao=medianas_treino)
+
 print("Modelo, Scaler e Lista de Features salvos com sucesso!")
 print("  - modelo_rf_v1.joblib")
 print("  - scaler_v1.joblib")
 print("  - features_v1.joblib")
-print("  - numeric_features_v1.joblib")
\ No newline at end of file
+print("  - numeric_features_v1.joblib")
+print(f"  - {ARQUIVO_PACOTE}")
\ No newline at end of file
@@ -3,12 +3,14 @@ import pandas as pd
 from faker import Faker
 import warnings
 
+from formato_colunar import salvar_pacientes
+
 # Ignorar FutureWarnings do pandas que podem aparecer com certas versões do numpy/pandas
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
-def gerar_pacientes_realistas(qtd=100, file_path="novos_100_pacientes.csv"):
+def gerar_pacientes_realistas(qtd=100, file_path="novos_100_pacientes.parquet"):
     """
-    Gera um DataFrame e um arquivo CSV de pacientes diabéticos simulados (Versão 3).
+    Gera um DataFrame e um arquivo (Parquet ou CSV) de pacientes diabéticos simulados (Versão 3).
     Os parâmetros são baseados na literatura fornecida sobre pé diabético,
     simulando dados de um sistema de palmilha inteligente (in-shoe).
     
@@ -248,9 +250,10 @@ def gerar_pacientes_realistas(qtd=100, file_path="novos_100_pacientes.csv"):
     ]
     df = df[colunas_perfil + colunas_sensores]
     
-    # Salvar em CSV com separador ; e decimal , (comum no Brasil)
+    # Salvar em Parquet (esquema compacto de features.txt) ou, se o caminho
+    # terminar em .csv, em CSV com separador ; e decimal , (comum no Brasil)
     try:
-        df.to_csv(file_path, index=False, sep=';', decimal=',')
+        salvar_pacientes(df, file_path)
         print(f"Arquivo '{file_path}' gerado com {qtd} pacientes.")
         
         # Imprimir estatísticas de verificação
@@ -272,9 +275,9 @@ def gerar_pacientes_realistas(qtd=100, file_path="novos_100_pacientes.csv"):
 
 
     except Exception as e:
-        print(f"Erro ao salvar o arquivo CSV: {e}")
+        print(f"Erro ao salvar o arquivo '{file_path}': {e}")
         
     return df
 
 if __name__ == "__main__":
-    gerar_pacientes_realistas(qtd=100, file_path="novos_100_pacientes.csv")
\ No newline at end of file
+    gerar_pacientes_realistas(qtd=100, file_path="novos_100_pacientes.parquet")
\ No newline at end of file
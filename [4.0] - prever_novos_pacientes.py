@@ -1,26 +1,30 @@
 # prever_novos_pacientes.py
 
-import pandas as pd
-import joblib
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
+from formato_colunar import ler_pacientes
+from engenharia_features import adicionar_features
+from pacote_modelo import carregar_pacote, ARQUIVO_PACOTE
 
 # --- 1. Carregar Artefatos Salvos ---
+# Pacote único: modelo (compilado e RandomForest original), scaler, lista de features e features numéricas (conferidos pelo hash do esquema)
 try:
-    model = joblib.load('modelo_rf_v1.joblib')
-    scaler = joblib.load('scaler_v1.joblib')
-    feature_names = joblib.load('features_v1.joblib')
-    numeric_feature_names = joblib.load('numeric_features_v1.joblib') # ADICIONAR ESTA LINHA
+    pacote = carregar_pacote(ARQUIVO_PACOTE)
+    model = pacote # Floresta compilada em lotes pequenos, RandomForest original nos grandes (mesmas probabilidades)
+    scaler = pacote.scaler
+    feature_names = pacote.features
+    numeric_feature_names = pacote.features_numericas
     print("Modelo, Scaler, Lista de Features e Lista de Features Numéricas carregados com sucesso.")
 except FileNotFoundError as e:
     print(f"Erro: Não foi possível carregar os artefatos salvos ({e}).")
-    # ...(resto do bloco try/except)
-    print("Certifique-se de que os arquivos ... e 'numeric_features_v1.joblib' estão no mesmo diretório.") # AJUSTAR MENSAGEM
+    print(f"Certifique-se de que '{ARQUIVO_PACOTE}' está no mesmo diretório (gerado por '[2]' ou por 'python pacote_modelo.py converter').")
+    exit()
+except ValueError as e:
+    print(f"Erro: Pacote do modelo inválido ({e}).")
     exit()
 
 # --- 2. Carregar Novos Dados ---
-file_path = "novos_100_pacientes.csv"
+file_path = "novos_100_pacientes.parquet"
 try:
-    df_new = pd.read_csv(file_path, sep=';', decimal=',')
+    df_new = ler_pacientes(file_path)
     print(f"\nArquivo '{file_path}' carregado com {df_new.shape[0]} novos pacientes.")
 except FileNotFoundError:
     print(f"Erro: Arquivo '{file_path}' não encontrado.")
@@ -33,18 +37,8 @@ ids_nomes = df_new[['id', 'nome', 'sobrenome']].copy()
 # --- 3. Pré-processamento dos Novos Dados ---
 # Aplicar EXATAMENTE as mesmas etapas do script de treinamento
 
-# Converter 'sexo'
-df_new['sexo'] = df_new['sexo'].map({'M': 0, 'F': 1})
-
-# Engenharia de Features
-df_new['pressao_pico_media'] = df_new[['pressao_pico_esq_kpa', 'pressao_pico_dir_kpa']].mean(axis=1)
-df_new['pressao_assimetria_kpa'] = (df_new['pressao_pico_esq_kpa'] - df_new['pressao_pico_dir_kpa']).abs()
-df_new['pressao_integral_media'] = df_new[['pressao_integral_esq_kpa_s', 'pressao_integral_dir_kpa_s']].mean(axis=1)
-df_new['temperatura_media'] = df_new[['temperatura_esq_c', 'temperatura_dir_c']].mean(axis=1)
-df_new['umidade_media'] = df_new[['umidade_esq_perc', 'umidade_dir_perc']].mean(axis=1)
-
-# Lidar com possíveis valores ausentes (usar mediana, embora improvável aqui)
-df_new.fillna(df_new.median(numeric_only=True), inplace=True)
+# Converter 'sexo' e aplicar a Engenharia de Features (mesmo módulo do treino)
+adicionar_features(df_new)
 
 # Separar target real
 target = 'risco_ulcera_calc'
@@ -58,6 +52,10 @@ except KeyError as e:
     print("Verifique se o arquivo CSV contém todas as colunas esperadas pelo modelo.")
     exit()
 
+# Valores ausentes: medianas do TREINO guardadas no pacote (não as destes dados),
+# para que a previsão de um paciente não dependa dos demais pacientes do arquivo
+X_new = pacote.imputar(X_new)
+
 # Aplicar o SCALER CARREGADO usando a lista EXATA carregada
 try:
     # USA a lista carregada 'numeric_feature_names' diretamente
@@ -78,6 +76,8 @@ y_new_proba = model.predict_proba(X_new)[:, 1] # Probabilidade de ser classe 1 (
 print("\nPrevisões realizadas nos novos dados.")
 
 # --- 5. Avaliar e Mostrar Resultados ---
+# sklearn.metrics só é importado aqui, na avaliação (a previsão não precisa dele)
+from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 
 print("\n" + "="*30)
 print("AVALIAÇÃO NOS NOVOS 100 PACIENTES")
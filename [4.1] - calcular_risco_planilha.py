@@ -1,11 +1,16 @@
 import gspread
 import pandas as pd
-import joblib
 import numpy as np
-from google.oauth2.service_account import Credentials
-from gspread.utils import rowcol_to_a1 
 import warnings
 
+from engenharia_features import calcular_features
+from normalizacao_planilha import normalizar_planilha, resumir_invalidos
+from pacote_modelo import carregar_pacote
+from cache_predicoes import CachePredicoes, ARQUIVO_CACHE
+from explicacoes import explicar, principais_fatores, COLUNA_FATORES
+from sincronizacao_planilha import ler_alteracoes, atualizar_coluna, salvar_instantaneo
+from cliente_planilhas import obter_cliente
+
 # Ignorar FutureWarnings do gspread ou pandas, se houver
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
@@ -13,18 +18,18 @@ warnings.simplefilter(action='ignore', category=FutureWarning)
 PLANILHA_ID = '1EcnXDdDtrK5Qvtyy3-npivIFtj57Fwwtbg_YpyahCNU'
 NOME_ABA = 'Pacientes_simulados'
 ARQUIVO_CREDENCIAL = 'credentials.json' 
-MODELO_PATH = "modelo_rf_v1.joblib"
-FEATURES_PATH = "features_v1.joblib"
-SCALER_PATH = "scaler_v1.joblib"             # <-- ADICIONADO
-NUMERIC_FEATURES_PATH = "numeric_features_v1.joblib" # <-- ADICIONADO
+PACOTE_PATH = "pacote_rf_v1.joblib"  # Modelo, scaler, features e features numéricas num só arquivo
 NOVA_COLUNA_RISCO = 'risco_modelo_rf' 
+NOVA_COLUNA_FATORES = COLUNA_FATORES  # principais fatores do risco de cada paciente (ao lado do risco)
+ARQUIVO_INSTANTANEO = ".cache/sincronizacao_pacientes_simulados_leitura.joblib"  # hashes das linhas na última execução
 
 # --- Autenticação com Google Sheets ---
+# Cliente compartilhado: sessão única, cota por minuto respeitada e repetição de 429/5xx
 print("Autenticando com Google API...")
 try:
     scopes = ['https://www.googleapis.com/auth/spreadsheets']
-    creds = Credentials.from_service_account_file(ARQUIVO_CREDENCIAL, scopes=scopes)
-    gc = gspread.authorize(creds)
+    cliente = obter_cliente(ARQUIVO_CREDENCIAL, scopes)
+    cliente.conectar()
     print("Autenticação bem-sucedida.")
 except Exception as e:
     print(f"Erro na autenticação: {e}")
@@ -34,22 +39,11 @@ except Exception as e:
 # --- Carregar Planilha e Dados ---
 print(f"Abrindo planilha ID: {PLANILHA_ID}...")
 try:
-    spreadsheet = gc.open_by_key(PLANILHA_ID)
-    worksheet = spreadsheet.worksheet(NOME_ABA)
-    print(f"Aba '{NOME_ABA}' encontrada. Carregando dados...")
-    
-    dados_pacientes_lista = worksheet.get_all_records() 
-    if not dados_pacientes_lista:
-        print("Erro: A planilha parece estar vazia.")
-        exit()
-        
-    df_pacientes = pd.DataFrame(dados_pacientes_lista)
-    # Gspread pode ler colunas vazias como ''. Substituir por NaN para tratamento numérico
-    df_pacientes.replace('', np.nan, inplace=True) 
-    print(f"Dados carregados com sucesso ({len(df_pacientes)} pacientes).")
-    
-    headers_originais = worksheet.row_values(1) 
-    
+    worksheet = cliente.aba(PLANILHA_ID, NOME_ABA)
+    print(f"Aba '{NOME_ABA}' encontrada. Carregando dados (em segundo plano, enquanto o modelo é carregado)...")
+    # Uma única leitura (cabeçalho + dados); cada linha é comparada com o instantâneo da última execução
+    leitura = cliente.em_segundo_plano(ler_alteracoes, worksheet, ARQUIVO_INSTANTANEO,
+                                       ignorar=[NOVA_COLUNA_RISCO, NOVA_COLUNA_FATORES])
 except gspread.exceptions.SpreadsheetNotFound:
     print(f"Erro: Planilha com ID '{PLANILHA_ID}' não encontrada.")
     print("Verifique se o ID está correto e se a conta de serviço tem permissão.")
@@ -58,86 +52,67 @@ except gspread.exceptions.WorksheetNotFound:
     print(f"Erro: Aba '{NOME_ABA}' não encontrada na planilha.")
     exit()
 except Exception as e:
-    print(f"Erro ao carregar dados da planilha: {e}")
+    print(f"Erro ao abrir a planilha: {e}")
     exit()
 
 # --- Carregar Modelo e Artefatos de Pré-processamento ---
 print(f"Carregando modelo e artefatos de pré-processamento...")
 try:
-    modelo = joblib.load(MODELO_PATH)
-    features_necessarias = joblib.load(FEATURES_PATH)
-    scaler = joblib.load(SCALER_PATH)                     # <-- ADICIONADO
-    numeric_feature_names = joblib.load(NUMERIC_FEATURES_PATH) # <-- ADICIONADO
+    pacote = carregar_pacote(PACOTE_PATH)
+    modelo = pacote # Floresta compilada em lotes pequenos, RandomForest original nos grandes (mesmas probabilidades)
+    features_necessarias = pacote.features
+    scaler = pacote.scaler
+    numeric_feature_names = pacote.features_numericas
     print("Modelo e artefatos carregados.")
 except FileNotFoundError as e:
     print(f"Erro: Arquivo não encontrado ({e}).")
-    print("Certifique-se que modelo_rf_v1.joblib, features_v1.joblib, scaler_v1.joblib e numeric_features_v1.joblib estão na raiz.")
+    print(f"Certifique-se que {PACOTE_PATH} está na raiz (gerado por '[2]' ou por 'python pacote_modelo.py converter').")
     exit()
 except Exception as e:
     print(f"Erro ao carregar artefatos: {e}")
     exit()
 
+# --- Receber os Dados da Planilha ---
+try:
+    headers_originais, linhas_planilha, hashes_linhas, linhas_alteradas = leitura.result()
+    if not linhas_planilha:
+        print("Erro: A planilha parece estar vazia.")
+        exit()
+
+    df_pacientes = pd.DataFrame(linhas_planilha, columns=headers_originais)
+    df_pacientes = df_pacientes.drop(columns=[c for c in (NOVA_COLUNA_RISCO, NOVA_COLUNA_FATORES)
+                                              if c in df_pacientes.columns])
+    print(f"Dados carregados com sucesso ({len(df_pacientes)} pacientes, {len(linhas_alteradas)} novos ou alterados desde a última execução).")
+except Exception as e:
+    print(f"Erro ao carregar dados da planilha: {e}")
+    exit()
+
 # --- Preparar Dados para o Modelo (Baseado em prever_novos_pacientes.py) ---
 print("Preparando dados para o modelo...")
 df_processado = df_pacientes.copy()
 
-# 0. Garantir tipos corretos ANTES da engenharia/conversão
-# Colunas que deveriam ser numéricas (exceto S/N e sexo por enquanto)
-colunas_para_num = [col for col in df_processado.columns if col not in ['id', 'nome', 'sobrenome', 'sexo'] and not col.endswith('_s_n')]
-for col in colunas_para_num:
-     df_processado[col] = pd.to_numeric(df_processado[col], errors='coerce')
-
-# 1. Converter 'sexo' (como em prever_novos_pacientes.py)
-if 'sexo' in df_processado.columns:
-    print("Convertendo coluna 'sexo' (M=0, F=1)...")
-    df_processado['sexo'] = df_processado['sexo'].map({'M': 0, 'F': 1, 'm': 0, 'f': 1}).astype(float) # Garante float e trata minúsculas
-    # Se houver outros valores ou NaN, serão convertidos para NaN aqui, tratados depois.
-else:
-     # Verificar se 'sexo' é uma feature necessária pelo modelo
-     if 'sexo' in features_necessarias:
-          print("Aviso: A coluna 'sexo' é necessária para o modelo mas não foi encontrada na planilha.")
-          # Você pode decidir parar (exit()) ou tentar continuar (pode dar erro depois)
-
-# 2. Converter colunas '_s_n' (Sim/Não) para numérico (1/0)
-colunas_sn = [col for col in df_processado.columns if col.endswith('_s_n')]
-print(f"Convertendo colunas Sim/Não: {colunas_sn}")
-for col in colunas_sn:
-    # Trata 's', 'S', 'sim', 'Sim' como 1, todo o resto (incluindo NaN/vazio) como 0
-    df_processado[col] = df_processado[col].apply(lambda x: 1 if str(x).strip().lower() in ['s', 'sim'] else 0).astype(float)
-
-# 3. Engenharia de Features (como em prever_novos_pacientes.py)
+# 0-2. Tipos: numéricas (aceita vírgula decimal), 'sexo' (M=0, F=1) e '_s_n' (S/Sim=1, N/Não/vazio=0)
+# numa passada vetorizada por coluna; células inválidas viram NaN (ou 0 nas '_s_n') e são relatadas juntas
+print("Normalizando tipos das colunas (numéricas, 'sexo' e Sim/Não)...")
+df_processado, celulas_invalidas = normalizar_planilha(df_processado)
+if len(celulas_invalidas):
+    print(f"Aviso: {len(celulas_invalidas)} células com valores inválidos:")
+    for linha in resumir_invalidos(celulas_invalidas):
+        print(f"  {linha}")
+if 'sexo' not in df_processado.columns and 'sexo' in features_necessarias:
+    print("Aviso: A coluna 'sexo' é necessária para o modelo mas não foi encontrada na planilha.")
+    # Você pode decidir parar (exit()) ou tentar continuar (pode dar erro depois)
+
+# 3. Engenharia de Features (mesmo módulo usado no treino)
 print("Aplicando engenharia de features...")
 try:
-    df_processado['pressao_pico_media'] = df_processado[['pressao_pico_esq_kpa', 'pressao_pico_dir_kpa']].mean(axis=1)
-    df_processado['pressao_assimetria_kpa'] = (df_processado['pressao_pico_esq_kpa'] - df_processado['pressao_pico_dir_kpa']).abs()
-    df_processado['pressao_integral_media'] = df_processado[['pressao_integral_esq_kpa_s', 'pressao_integral_dir_kpa_s']].mean(axis=1)
-    df_processado['temperatura_media'] = df_processado[['temperatura_esq_c', 'temperatura_dir_c']].mean(axis=1)
-    df_processado['umidade_media'] = df_processado[['umidade_esq_perc', 'umidade_dir_perc']].mean(axis=1)
+    for nome_feature, valores in calcular_features(df_processado).items():
+        df_processado[nome_feature] = valores
 except KeyError as e:
     print(f"Erro na engenharia de features: Coluna {e} não encontrada.")
     print("Verifique se as colunas de pressão, temperatura e umidade existem na planilha.")
     exit()
 
-# 4. Tratar valores ausentes (NaN) - Estratégia: Imputação com a mediana
-#    Deve ser feito DEPOIS da engenharia e conversões, caso elas gerem NaNs
-print("Tratando valores ausentes (NaN) com a mediana...")
-cols_com_nan_antes = df_processado.columns[df_processado.isnull().any()].tolist()
-if cols_com_nan_antes:
-    print(f"Colunas com valores ausentes antes da imputação: {cols_com_nan_antes}")
-    # Calcula a mediana apenas para colunas numéricas que realmente existem no df_processado
-    medianas = df_processado.select_dtypes(include=np.number).median()
-    df_processado.fillna(medianas, inplace=True)
-    # Verifica se ainda há NaNs (pode acontecer se uma coluna não numérica tiver NaN ou se uma numérica só tiver NaNs)
-    cols_com_nan_depois = df_processado.columns[df_processado.isnull().any()].tolist()
-    if cols_com_nan_depois:
-         print(f"Aviso: Ainda existem valores ausentes após imputação com mediana nas colunas: {cols_com_nan_depois}. Preenchendo com 0.")
-         # Como último recurso, preenche com 0 (ou outra estratégia se preferir)
-         df_processado.fillna(0, inplace=True)
-    else:
-         print("Valores ausentes preenchidos com mediana.")
-else:
-    print("Nenhum valor ausente encontrado.")
-
 # 5. Selecionar e ordenar as features EXATAMENTE como no treino
 print(f"Selecionando e ordenando as features: {features_necessarias}")
 try:
@@ -153,6 +128,16 @@ except KeyError as e:
     print(f"Erro Crítico: Coluna necessária '{e}' não encontrada após pré-processamento.")
     exit()
 
+# 5.1 Tratar valores ausentes (NaN) com as medianas do TREINO guardadas no pacote
+#     Feito DEPOIS da engenharia e conversões, caso elas gerem NaNs; não depende
+#     dos outros pacientes da planilha (o mesmo paciente recebe sempre o mesmo risco)
+cols_com_nan = df_features_final.columns[df_features_final.isnull().any()].tolist()
+if cols_com_nan:
+    print(f"Colunas com valores ausentes (preenchidas com as medianas do treino): {cols_com_nan}")
+    df_features_final = pacote.imputar(df_features_final)
+else:
+    print("Nenhum valor ausente encontrado.")
+
 # 6. Aplicar o SCALER CARREGADO usando a lista EXATA carregada
 print(f"Aplicando scaler nas colunas numéricas: {numeric_feature_names}")
 try:
@@ -170,7 +155,7 @@ try:
 
 except ValueError as e:
     print(f"Erro ao aplicar o scaler: {e}")
-    print("Verifique se as colunas em 'numeric_features_v1.joblib' correspondem às colunas numéricas usadas no treino.")
+    print("Verifique se as colunas numéricas do pacote do modelo correspondem às colunas da planilha.")
     exit()
 except Exception as e:
     print(f"Erro inesperado durante a aplicação do scaler: {e}")
@@ -179,42 +164,53 @@ except Exception as e:
 print("Dados preparados.")
 
 # --- Fazer Previsões ---
+# Só pacientes novos ou alterados (vetor de features diferente) chegam ao modelo;
+# os demais vêm do cache, que é descartado automaticamente se o modelo mudar.
 print("Calculando probabilidades de risco com o modelo...")
 try:
-    probabilidades_risco = modelo.predict_proba(df_features_final)[:, 1]
+    X_final = df_features_final.to_numpy(dtype=np.float64)
+    cache = CachePredicoes(pacote, ARQUIVO_CACHE)
+    chaves_cache = cache.chaves(X_final)
+    probabilidades_risco = cache.pontuar(X_final, modelo, chaves_cache)
     print("Cálculo concluído.")
+    print(cache.resumo())
 except Exception as e:
     print(f"Erro durante a predição: {e}")
     exit()
 
-# --- Adicionar Resultados à Planilha ---
-print(f"Adicionando/Atualizando coluna '{NOVA_COLUNA_RISCO}' na planilha...")
-
-# Verifica se a coluna já existe para atualizar ou adicionar
-if NOVA_COLUNA_RISCO in headers_originais:
-    indice_nova_coluna = headers_originais.index(NOVA_COLUNA_RISCO) + 1
-    print(f"Coluna '{NOVA_COLUNA_RISCO}' já existe (coluna {rowcol_to_a1(1, indice_nova_coluna)[:-1]}). Atualizando valores.")
-else:
-    indice_nova_coluna = len(headers_originais) + 1
-    print(f"Coluna '{NOVA_COLUNA_RISCO}' não encontrada. Adicionando na coluna {rowcol_to_a1(1, indice_nova_coluna)[:-1]}.")
-    try:
-        worksheet.update_cell(1, indice_nova_coluna, NOVA_COLUNA_RISCO)
-        print("Cabeçalho adicionado.")
-    except Exception as e:
-        print(f"Erro ao adicionar cabeçalho: {e}")
-        exit()
-
-letra_nova_coluna = rowcol_to_a1(1, indice_nova_coluna)[:-1] 
+# --- Explicar cada Risco ---
+# Contribuição de cada feature para a probabilidade (decomposição pelos caminhos
+# das árvores); na planilha vão os 3 principais fatores. O texto fica no cache de
+# previsões, na mesma chave: só os pacientes novos ou alterados são explicados
+print("Calculando os principais fatores de risco de cada paciente...")
+try:
+    fatores_risco = cache.fatores(X_final, lambda X: principais_fatores(explicar(X, pacote)[1]), chaves_cache)
+    print(f"{cache.fatores_calculados} pacientes explicados (os demais vieram do cache).")
+    cache.salvar()
+except Exception as e:
+    print(f"Erro ao calcular os fatores de risco: {e}")
+    exit()
 
+# --- Adicionar Resultados à Planilha ---
+# Só as células de risco cujo valor mudou são reescritas, agrupadas em intervalos contíguos num 'batch_update'
+print(f"Atualizando colunas '{NOVA_COLUNA_RISCO}' e '{NOVA_COLUNA_FATORES}' na planilha (apenas células alteradas)...")
 try:
-    valores_para_atualizar = [[p] for p in probabilidades_risco] 
-    range_para_atualizar = f'{letra_nova_coluna}2:{letra_nova_coluna}{len(df_pacientes) + 1}'
-    
-    worksheet.update(range_para_atualizar, valores_para_atualizar, value_input_option='USER_ENTERED')
-    
-    print(f"Coluna '{letra_nova_coluna}' atualizada com os riscos calculados.")
+    # As duas colunas são independentes: escritas em paralelo (a de fatores já conta com a de risco no cabeçalho)
+    cabecalho_fatores = headers_originais + [NOVA_COLUNA_RISCO] * (NOVA_COLUNA_RISCO not in headers_originais)
+    escritas = cliente.em_paralelo(
+        lambda: atualizar_coluna(worksheet, headers_originais, linhas_planilha, NOVA_COLUNA_RISCO, probabilidades_risco),
+        lambda: atualizar_coluna(worksheet, cabecalho_fatores, linhas_planilha, NOVA_COLUNA_FATORES, fatores_risco))
+    for (nome_coluna, cabecalho, descricao), escrita in zip([(NOVA_COLUNA_RISCO, headers_originais, 'de risco'),
+                                                             (NOVA_COLUNA_FATORES, cabecalho_fatores, 'de fatores')],
+                                                            escritas):
+        if nome_coluna not in cabecalho:
+            print(f"Coluna '{nome_coluna}' adicionada na coluna {escrita['coluna']}.")
+        print(f"{escrita['celulas_alteradas']} células {descricao} alteradas em {escrita['intervalos']} intervalos "
+              f"({escrita['chamadas']} chamadas à API).")
+    dados_colunas = [c for c in headers_originais if c not in (NOVA_COLUNA_RISCO, NOVA_COLUNA_FATORES)]
+    salvar_instantaneo(ARQUIVO_INSTANTANEO, dados_colunas, linhas_planilha, hashes=hashes_linhas)
     print("Script concluído com sucesso!")
 
 except Exception as e:
     print(f"Erro ao atualizar a planilha: {e}")
-    print("Verifique as permissões da conta de serviço na planilha (precisa de edição).")
\ No newline at end of file
+    print("Verifique as permissões da conta de serviço na planilha (precisa de edição).")
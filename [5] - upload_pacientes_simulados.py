@@ -1,17 +1,22 @@
 import os
-import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
+import sys
 from dotenv import load_dotenv
 
+from formato_colunar import ler_pacientes, para_exportacao
+from sincronizacao_planilha import enviar_tabela
+from cliente_planilhas import obter_cliente
+from carga_planilha import enviar_em_blocos
+
 # Carregar variáveis do .env
 load_dotenv()
 
 # Configurações do ambiente
 SHEET_ID = os.getenv("SHEET_ID")  # ID da planilha
 SHEET_NAME = "Pacientes_simulados"          # Nome da aba
-CSV_PATH = os.getenv("PACIENTES_SIMULADOS")  # CSV local
+CSV_PATH = os.getenv("PACIENTES_SIMULADOS")  # Arquivo local (Parquet ou CSV)
 CREDENTIALS_PATH = os.getenv("GOOGLE_CREDENTIALS")  # Caminho das credenciais Google
+INSTANTANEO_PATH = ".cache/sincronizacao_pacientes_simulados_envio.joblib"  # O que foi enviado da última vez
+PONTO_CONTROLE_PATH = ".cache/carga_pacientes_simulados.json"  # Progresso de uma carga completa em andamento
 
 # Escopos necessários para editar planilhas e acessar Drive
 SCOPES = [
@@ -19,21 +24,26 @@ SCOPES = [
     "https://www.googleapis.com/auth/drive"
 ]
 
-# Autenticação via Service Account
-creds = Credentials.from_service_account_file(CREDENTIALS_PATH, scopes=SCOPES)
-client = gspread.authorize(creds)
-
-# Ler o CSV local
-df = pd.read_csv(CSV_PATH, sep=";", decimal=",")
-
-# Abrir planilha e aba
-sheet = client.open_by_key(SHEET_ID)
-worksheet = sheet.worksheet(SHEET_NAME)
-
-# Limpar dados antigos
-worksheet.clear()
-
-# Enviar cabeçalho + dados
-worksheet.update([df.columns.values.tolist()] + df.values.tolist())
-
-print(f"{len(df)} pacientes enviados para a aba '{SHEET_NAME}' da planilha.")
+# Cliente compartilhado (Service Account): cota por minuto, repetição de 429/5xx e chamadas em paralelo
+cliente = obter_cliente(CREDENTIALS_PATH, SCOPES)
+
+# Carga completa (primeiro envio, '--completo' ou carga anterior interrompida): em blocos numa
+# aba temporária, com retomada, trocada pela aba atual só no fim. Senão, envio incremental.
+if '--completo' in sys.argv or os.path.exists(PONTO_CONTROLE_PATH) or not os.path.exists(INSTANTANEO_PATH):
+    resumo = enviar_em_blocos(cliente, SHEET_ID, SHEET_NAME, CSV_PATH, PONTO_CONTROLE_PATH, INSTANTANEO_PATH)
+    print(f"{resumo['linhas']} pacientes carregados na aba '{SHEET_NAME}' da planilha"
+          f"{' (carga retomada)' if resumo['retomada'] else ''}: {resumo['linhas_enviadas']} linhas enviadas "
+          f"em {resumo['chamadas_escrita']} chamadas de escrita ({resumo['segundos']:.1f} s).")
+    sys.exit()
+
+# Abrir planilha e aba em segundo plano enquanto o arquivo local é lido
+abertura = cliente.em_segundo_plano(cliente.aba, SHEET_ID, SHEET_NAME)
+df = para_exportacao(ler_pacientes(CSV_PATH))
+worksheet = abertura.result()
+
+# Enviar só as linhas novas/alteradas desde o último envio (em vez de limpar a aba e reenviar tudo)
+resumo = enviar_tabela(worksheet, df.columns.values.tolist(), df.values.tolist(), INSTANTANEO_PATH)
+
+print(f"{resumo['linhas']} pacientes sincronizados com a aba '{SHEET_NAME}' da planilha: "
+      f"{resumo['linhas_alteradas']} linhas enviadas em {resumo['intervalos']} intervalos, "
+      f"{resumo['linhas_apagadas']} apagadas ({resumo['chamadas_escrita']} chamadas de escrita).")
@@ -1,8 +1,9 @@
 import os
-import gspread
-import pandas as pd
 from dotenv import load_dotenv
-from google.oauth2.service_account import Credentials
+
+from formato_colunar import ler_pacientes, salvar_pacientes
+from cliente_planilhas import obter_cliente
+from espelho_planilha import atualizar_espelho
 
 # Carregar variáveis do .env
 load_dotenv()
@@ -10,23 +11,30 @@ load_dotenv()
 # Configurações
 SHEET_ID = os.getenv("SHEET_ID")                  # ID da planilha
 SHEET_NAME = "Pacientes_reais"                    # Nome da aba no Google Sheets
-OUTPUT_CSV = os.getenv("PACIENTES_REAIS")         # Caminho para salvar o CSV
+OUTPUT_CSV = os.getenv("PACIENTES_REAIS")         # Caminho de saída (.parquet ou .csv)
 CREDENTIALS_PATH = os.getenv("GOOGLE_CREDENTIALS") # Caminho das credenciais
+ESPELHO_PATH = ".cache/espelho_pacientes_reais.parquet"       # Cópia local tipada da aba, por 'id'
+INSTANTANEO_PATH = ".cache/espelho_pacientes_reais.joblib"    # Revisão e hashes das linhas do espelho
 
-# Escopos necessários para leitura do Sheets
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
-
-# Autenticação via Service Account
-creds = Credentials.from_service_account_file(CREDENTIALS_PATH, scopes=SCOPES)
-client = gspread.authorize(creds)
+# Escopos necessários para leitura do Sheets (e da data de modificação da planilha, no Drive)
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "https://www.googleapis.com/auth/drive.metadata.readonly"
+]
 
-# Ler aba Pacientes_reais da planilha
-sheet = client.open_by_key(SHEET_ID)
-worksheet = sheet.worksheet(SHEET_NAME)
-data = worksheet.get_all_records()
+# Cliente compartilhado (Service Account): cota por minuto e repetição de 429/5xx
+cliente = obter_cliente(CREDENTIALS_PATH, SCOPES)
 
-# Converter em DataFrame e salvar CSV
-df = pd.DataFrame(data)
-df.to_csv(OUTPUT_CSV, index=False, sep=";", decimal=",")
+# Atualizar o espelho local: nada é lido se a planilha não mudou desde a última execução;
+# senão, só as linhas novas/alteradas são convertidas e mescladas por 'id'
+resumo = atualizar_espelho(cliente, SHEET_ID, SHEET_NAME, ESPELHO_PATH, INSTANTANEO_PATH)
+print(f"Aba '{SHEET_NAME}': {resumo['situacao']} ({resumo['linhas']} linhas, {resumo['linhas_alteradas']} novas ou "
+      f"alteradas, {resumo['linhas_removidas']} removidas; {resumo['chamadas']} chamadas à API).")
 
-print(f" '{OUTPUT_CSV}' salvo com {len(df)} linhas da aba '{SHEET_NAME}'.")
+# Salvar (Parquet, ou CSV se o caminho terminar em .csv) só se algo mudou
+if resumo['alterado'] or not os.path.exists(OUTPUT_CSV):
+    df = ler_pacientes(ESPELHO_PATH)
+    salvar_pacientes(df, OUTPUT_CSV)
+    print(f" '{OUTPUT_CSV}' salvo com {len(df)} linhas da aba '{SHEET_NAME}'.")
+else:
+    print(f" '{OUTPUT_CSV}' já está atualizado.")
@@ -1,26 +1,22 @@
-import joblib
 import matplotlib.pyplot as plt
 import os
 import pandas as pd
 
+from pacote_modelo import carregar_pacote
+
 # Caminhos
-MODELO_PATH = "modelo_rf_v1.joblib"
-FEATURES_PATH = "features_v1.joblib"
+PACOTE_PATH = "pacote_rf_v1.joblib"
 OUTPUT_PATH = os.path.join("docs", "features_importance.png")
 
 # Criar pasta docs se não existir
 os.makedirs("docs", exist_ok=True)
 
-# Carregar modelo e lista de features
-modelo = joblib.load(MODELO_PATH)
-features = joblib.load(FEATURES_PATH)
-
-# Verificar se o modelo possui atributo de importância
-if not hasattr(modelo, "feature_importances_"):
-    raise AttributeError("O modelo carregado não possui atributo 'feature_importances_'.")
+# Carregar pacote do modelo (importâncias e lista de features, já conferidas entre si)
+pacote = carregar_pacote(PACOTE_PATH)
+features = pacote.features
 
 # Obter importâncias e ordenar
-importances = modelo.feature_importances_
+importances = pacote.importancias
 df_import = pd.DataFrame({
     "Feature": features,
     "Importância": importances
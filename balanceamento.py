@@ -0,0 +1,118 @@
+import sys
+import json
+import time
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score, roc_auc_score
+from imblearn.over_sampling import SMOTE
+from imblearn.under_sampling import RandomUnderSampler
+from imblearn.ensemble import BalancedRandomForestClassifier
+
+# Estratégias de desbalanceamento de classes para o RandomForest de '[2]'.
+# Cada estratégia é um reamostrador aplicado só no treino (ou None) mais a
+# classe e os parâmetros extras da floresta. '[2]' escolhe uma pelo nome;
+# 'comparar_estrategias' mede o custo (tempo, memória) e a qualidade de todas.
+
+
+def _smote(seed, n_jobs):
+    return SMOTE(random_state=seed)
+
+
+def _smote_paralelo(seed, n_jobs):
+    # Mesmo SMOTE (k=5), com a busca de vizinhos distribuída em 'n_jobs' núcleos
+    return SMOTE(random_state=seed, k_neighbors=NearestNeighbors(n_neighbors=6, n_jobs=n_jobs))
+
+
+def _subamostragem(seed, n_jobs):
+    return RandomUnderSampler(random_state=seed)
+
+
+# nome -> (fábrica do reamostrador ou None, classe da floresta, parâmetros extras da floresta)
+ESTRATEGIAS = {
+    'smote': (_smote, RandomForestClassifier, {}),
+    'smote_paralelo': (_smote_paralelo, RandomForestClassifier, {}),
+    'peso_classe': (None, RandomForestClassifier, {'class_weight': 'balanced'}),
+    'peso_classe_subamostra': (None, RandomForestClassifier, {'class_weight': 'balanced_subsample'}),
+    'bootstrap_balanceado': (None, BalancedRandomForestClassifier,
+                             {'sampling_strategy': 'all', 'replacement': True, 'bootstrap': False}),
+    'subamostragem': (_subamostragem, RandomForestClassifier, {}),
+}
+ESTRATEGIA_PADRAO = 'smote'
+
+
+def _estrategia(nome):
+    if nome not in ESTRATEGIAS:
+        raise ValueError(f"Estratégia '{nome}' inválida. Use uma de: {', '.join(ESTRATEGIAS)}.")
+    return ESTRATEGIAS[nome]
+
+
+def balancear(nome, X, y, seed=42, n_jobs=-1):
+    """Aplica o reamostrador da estratégia no treino; estratégias sem reamostragem devolvem (X, y)."""
+    fabrica, _, _ = _estrategia(nome)
+    if fabrica is None:
+        return X, y
+    return fabrica(seed, n_jobs).fit_resample(X, y)
+
+
+def criar_floresta(nome, seed=42, n_jobs=-1, **parametros):
+    """Floresta da estratégia com os parâmetros de '[2]' (n_estimators, max_depth, ...)."""
+    _, classe, extras = _estrategia(nome)
+    return classe(random_state=seed, n_jobs=n_jobs, **extras, **parametros)
+
+
+def comparar_estrategias(X_train, y_train, X_test, y_test, estrategias=None, seed=42, n_jobs=-1,
+                         arquivo_json=None, **parametros):
+    """
+    Treina uma floresta por estratégia e mede o custo do ajuste (reamostragem +
+    fit: tempo e pico de RSS) e a qualidade no teste (F1 e ROC AUC).
+    Retorna um DataFrame ordenado pelo tempo; opcionalmente grava em JSON.
+    """
+    from benchmark_treino import MedidorEtapa
+
+    parametros = {'n_estimators': 100, 'max_depth': 10, **parametros}
+    linhas = []
+    for nome in estrategias or list(ESTRATEGIAS):
+        medidas = {}
+        with MedidorEtapa(medidas, 'ajuste'):
+            X_fit, y_fit = balancear(nome, X_train, y_train, seed, n_jobs)
+            rf = criar_floresta(nome, seed, n_jobs, **parametros).fit(X_fit, y_fit)
+        proba = rf.predict_proba(X_test)[:, 1]
+        linhas.append({
+            'estrategia': nome,
+            'linhas_treino': len(y_fit),
+            'segundos': medidas['ajuste']['segundos'],
+            'acrescimo_rss_mib': medidas['ajuste']['acrescimo_rss_mib'],
+            'f1_teste': f1_score(y_test, (proba >= 0.5).astype(int)),
+            'roc_auc_teste': roc_auc_score(y_test, proba),
+        })
+        del X_fit, y_fit, rf
+
+    tabela = pd.DataFrame(linhas).sort_values('segundos').reset_index(drop=True)
+    print(tabela.to_markdown(index=False, floatfmt=".4f"))
+    if arquivo_json:
+        with open(arquivo_json, 'w', encoding='utf-8') as f:
+            json.dump({'parametros': parametros, 'resultados': linhas}, f, ensure_ascii=False, indent=2)
+    return tabela
+
+
+if __name__ == "__main__":
+    # python balanceamento.py [qtd]  — compara as estratégias numa coorte gerada
+    from sklearn.model_selection import train_test_split
+    from gerador_vetorizado import gerar_lote
+    from engenharia_features import adicionar_features, FEATURES_NUMERICAS, ALVO
+    from treino_incremental import ordem_features
+    from sklearn.preprocessing import StandardScaler
+
+    qtd = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = adicionar_features(gerar_lote(qtd, np.random.default_rng(42), incluir_nomes=False))
+    X = df[ordem_features()].astype('float64')
+    X = X.fillna(X.median())
+    X[FEATURES_NUMERICAS] = StandardScaler().fit_transform(X[FEATURES_NUMERICAS])
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, df[ALVO], test_size=0.3, random_state=42, stratify=df[ALVO])
+
+    inicio = time.perf_counter()
+    comparar_estrategias(X_train, y_train, X_test, y_test, arquivo_json="comparacao_balanceamento.json")
+    print(f"\nTotal: {time.perf_counter() - inicio:.1f} s ({qtd:,} pacientes)")
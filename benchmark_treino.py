@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import train_test_split
+from sklearn.ensemble import RandomForestClassifier
+from imblearn.over_sampling import SMOTE
+
+from formato_colunar import ler_pacientes
+from engenharia_features import adicionar_features, FEATURES_NUMERICAS, COLUNAS_SENSORES_BRUTAS, ALVO
+from gerador_streaming import gerar_para_disco
+
+# Suíte de benchmark do pipeline de treino de '[2] - analise_modelagem.py'.
+# Para cada tamanho de coorte, as etapas de '[2]' são executadas num processo
+# novo (picos de memória isolados; falta de memória vira erro registrado, não
+# queda da suíte) e cada etapa é medida em tempo e pico de RSS. O resultado
+# vai para um JSON, que pode ser comparado com o de outra versão.
+
+TAMANHOS_PADRAO = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+ETAPAS = ['carga', 'features', 'imputacao', 'scaler', 'split', 'smote', 'rf_fit', 'predict_treino', 'predict_teste']
+INTERVALO_AMOSTRAGEM_S = 0.005
+
+
+def _rss_bytes():
+    """RSS atual do processo (Linux: /proc/self/statm); None se indisponível."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MedidorEtapa:
+    """
+    Mede tempo e pico de RSS de um trecho. Uma thread amostra o RSS a cada
+    INTERVALO_AMOSTRAGEM_S; o pico é relatado em absoluto e como acréscimo
+    sobre o RSS no início da etapa.
+    """
+
+    def __init__(self, resultados, nome):
+        self.resultados = resultados
+        self.nome = nome
+        self._parar = threading.Event()
+
+    def _amostrar(self):
+        while not self._parar.wait(INTERVALO_AMOSTRAGEM_S):
+            rss = _rss_bytes()
+            if rss is not None and rss > self.pico:
+                self.pico = rss
+
+    def __enter__(self):
+        self.rss_inicio = _rss_bytes() or 0
+        self.pico = self.rss_inicio
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+        self._thread.start()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self.inicio
+        self._parar.set()
+        self._thread.join()
+        self.pico = max(self.pico, _rss_bytes() or 0)
+        self.resultados[self.nome] = {
+            'segundos': segundos,
+            'pico_rss_mib': self.pico / 2**20,
+            'acrescimo_rss_mib': (self.pico - self.rss_inicio) / 2**20,
+        }
+
+
+def _gerar_coorte(qtd, diretorio, seed, formato):
+    """Gera os dois arquivos lidos por '[2]' (proporção 500:1000), em lotes para limitar a memória."""
+    caminhos = [os.path.join(diretorio, f"pacientes_simulados_v3_literatura.{formato}"),
+                os.path.join(diretorio, f"novos_1000_pacientes.{formato}")]
+    qtd_primeiro = qtd // 3
+    for caminho, parte, semente in zip(caminhos, (qtd_primeiro, qtd - qtd_primeiro), (seed, seed + 1)):
+        gerar_para_disco(parte, caminho, tamanho_lote=250_000, rng=np.random.default_rng(semente),
+                         verbose=False, formato=formato)
+    return caminhos
+
+
+def executar_pipeline(qtd, seed=42, n_estimators=100, max_depth=10, n_jobs=-1, formato='parquet'):
+    """
+    Executa as etapas de '[2]' para uma coorte de 'qtd' pacientes e retorna
+    {etapa: {'segundos', 'pico_rss_mib', 'acrescimo_rss_mib'}}.
+    A geração dos dados (fora das etapas) não é medida. 'formato' escolhe
+    os arquivos lidos na etapa de carga: 'parquet' (atual) ou 'csv' (antigo).
+    """
+    r = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        caminhos = _gerar_coorte(qtd, tmp, seed, formato)
+
+        with MedidorEtapa(r, 'carga'):
+            df = pd.concat([ler_pacientes(c) for c in caminhos], ignore_index=True)
+
+    with MedidorEtapa(r, 'features'):
+        adicionar_features(df)
+
+    with MedidorEtapa(r, 'imputacao'):
+        df.fillna(df.median(numeric_only=True), inplace=True)
+
+    with MedidorEtapa(r, 'scaler'):
+        features_num = list(FEATURES_NUMERICAS)
+        scaler = StandardScaler()
+        df[features_num] = scaler.fit_transform(df[features_num])
+
+    with MedidorEtapa(r, 'split'):
+        X = df.drop(columns=['id', 'nome', 'sobrenome', *COLUNAS_SENSORES_BRUTAS, ALVO])
+        y = df[ALVO]
+        del df
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=seed, stratify=y)
+        del X, y
+
+    with MedidorEtapa(r, 'smote'):
+        X_train_bal, y_train_bal = SMOTE(random_state=seed).fit_resample(X_train, y_train)
+
+    with MedidorEtapa(r, 'rf_fit'):
+        rf = RandomForestClassifier(n_estimators=n_estimators, random_state=seed, n_jobs=n_jobs, max_depth=max_depth)
+        rf.fit(X_train_bal, y_train_bal)
+
+    with MedidorEtapa(r, 'predict_treino'):
+        rf.predict_proba(X_train_bal)
+
+    with MedidorEtapa(r, 'predict_teste'):
+        rf.predict_proba(X_test)
+    return r
+
+
+def _executar_tamanho(argumentos):
+    qtd, seed, n_estimators, max_depth, n_jobs, formato = argumentos
+    inicio = time.perf_counter()
+    etapas = executar_pipeline(qtd, seed, n_estimators, max_depth, n_jobs, formato)
+    return {
+        'n_pacientes': qtd,
+        'etapas': etapas,
+        'segundos_total': time.perf_counter() - inicio,
+        'gargalo': max(etapas, key=lambda e: etapas[e]['segundos']),
+        'pico_rss_mib': max(e['pico_rss_mib'] for e in etapas.values()),
+    }
+
+
+def _versao_codigo():
+    """Commit atual do repositório (para identificar a versão medida), se disponível."""
+    try:
+        saida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        return saida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def rodar_suite(tamanhos=TAMANHOS_PADRAO, arquivo_saida="benchmark_treino.json", seed=42,
+                n_estimators=100, max_depth=10, n_jobs=-1, formato='parquet', verbose=True):
+    """
+    Roda o pipeline para cada tamanho, cada um num processo novo, e grava o JSON.
+    Um tamanho que falhe (ex.: falta de memória) é registrado com 'erro' e a suíte continua.
+    """
+    relatorio = {
+        'versao_codigo': _versao_codigo(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'parametros': {'seed': seed, 'n_estimators': n_estimators, 'max_depth': max_depth,
+                       'n_jobs': n_jobs, 'formato': formato},
+        'resultados': [],
+    }
+    for qtd in tamanhos:
+        if verbose:
+            print(f"--- {qtd:,} pacientes ---")
+        try:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                resultado = executor.submit(_executar_tamanho, (qtd, seed, n_estimators, max_depth, n_jobs, formato)).result()
+        except (BrokenProcessPool, MemoryError) as e:
+            resultado = {'n_pacientes': qtd, 'erro': f"{type(e).__name__}: {e}"}
+        relatorio['resultados'].append(resultado)
+
+        if verbose:
+            if 'erro' in resultado:
+                print(f"Falhou: {resultado['erro']}")
+            else:
+                for etapa, m in resultado['etapas'].items():
+                    print(f"{etapa:>15}: {m['segundos']:9.3f} s | pico RSS {m['pico_rss_mib']:9.1f} MiB "
+                          f"(+{m['acrescimo_rss_mib']:.1f})")
+                print(f"Gargalo: {resultado['gargalo']} | total {resultado['segundos_total']:.1f} s")
+
+        # Grava a cada tamanho, para não perder o que já foi medido
+        with open(arquivo_saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    return relatorio
+
+
+def comparar_relatorios(arquivo_base, arquivo_novo, tolerancia=0.2):
+    """
+    Compara dois JSONs da suíte e lista as etapas que ficaram mais de
+    'tolerancia' (fração) mais lentas ou com maior acréscimo de memória.
+    Retorna a lista de regressões (dicts).
+    """
+    with open(arquivo_base, encoding='utf-8') as f:
+        base = {r['n_pacientes']: r for r in json.load(f)['resultados'] if 'erro' not in r}
+    with open(arquivo_novo, encoding='utf-8') as f:
+        novo = {r['n_pacientes']: r for r in json.load(f)['resultados'] if 'erro' not in r}
+
+    regressoes = []
+    for qtd in sorted(set(base) & set(novo)):
+        for etapa in ETAPAS:
+            antes, depois = base[qtd]['etapas'].get(etapa), novo[qtd]['etapas'].get(etapa)
+            if antes is None or depois is None:
+                continue
+            for metrica in ('segundos', 'acrescimo_rss_mib'):
+                # Ignora variações em valores muito pequenos (ruído de medição)
+                if antes[metrica] > 0.01 and depois[metrica] > antes[metrica] * (1 + tolerancia):
+                    regressoes.append({'n_pacientes': qtd, 'etapa': etapa, 'metrica': metrica,
+                                       'antes': antes[metrica], 'depois': depois[metrica]})
+    for r in regressoes:
+        print(f"Regressão: {r['n_pacientes']:,} pacientes | {r['etapa']} | {r['metrica']}: "
+              f"{r['antes']:.3f} -> {r['depois']:.3f}")
+    if not regressoes:
+        print("Nenhuma regressão acima da tolerância.")
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das etapas de treino de '[2]' por tamanho de coorte.")
+    parser.add_argument('tamanhos', nargs='*', type=int, default=TAMANHOS_PADRAO)
+    parser.add_argument('--saida', default="benchmark_treino.json")
+    parser.add_argument('--formato', choices=['parquet', 'csv'], default='parquet', help="Formato lido na etapa de carga")
+    parser.add_argument('--comparar-com', help="JSON de uma versão anterior para detectar regressões")
+    args = parser.parse_args()
+
+    rodar_suite(args.tamanhos, args.saida, formato=args.formato)
+    if args.comparar_com:
+        if comparar_relatorios(args.comparar_com, args.saida):
+            sys.exit(1)
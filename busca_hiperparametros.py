@@ -0,0 +1,203 @@
+import os
+import time
+import tempfile
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import train_test_split, StratifiedKFold
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score, roc_auc_score
+from imblearn.over_sampling import SMOTE
+
+from formato_colunar import ler_pacientes
+from engenharia_features import adicionar_features, FEATURES_NUMERICAS, ALVO
+from treino_incremental import ordem_features, ARQUIVOS_PADRAO
+from pacote_modelo import salvar_pacote, ARQUIVO_PACOTE
+
+# Busca de hiperparâmetros do RandomForest de '[2]' por "successive halving":
+# todas as configurações começam com poucas árvores; a cada rodada só a melhor
+# fração (1/eta) segue, com eta vezes mais árvores. As configurações fracas
+# param cedo. Os folds (já escalados e balanceados com SMOTE) são montados uma
+# única vez e gravados como .npy; os processos do pool abrem com mmap_mode='r',
+# compartilhando as mesmas páginas em vez de refazer o pré-processamento.
+# Os .npy ficam num diretório temporário de cada busca, apagado ao final:
+# uma busca com outros dados ou outra seed nunca reaproveita folds antigos.
+
+ESPACO_PADRAO = {
+    'max_depth': [6, 8, 10, 14, None],
+    'min_samples_leaf': [1, 2, 5, 10],
+    'max_features': ['sqrt', 'log2', 0.5],
+}
+
+
+def carregar_dados(caminhos=ARQUIVOS_PADRAO):
+    """
+    Carrega X/y como em '[2]' (features compartilhadas). Os ausentes ficam em
+    X: a mediana de imputação sai só do treino, depois da divisão.
+    Retorna (X, y, features).
+    """
+    df = pd.concat([ler_pacientes(c) for c in caminhos], ignore_index=True)
+    adicionar_features(df)
+    features = ordem_features()
+    return df[features].astype('float64'), df[ALVO].to_numpy(), features
+
+
+def preparar_folds(X_treino, y_treino, diretorio, n_folds=3, seed=42):
+    """
+    Divide o treino em 'n_folds' folds estratificados e grava, para cada um,
+    X/y de treino (scaler ajustado no fold + SMOTE) e de validação (só escalado).
+    Retorna a lista de caminhos-base dos folds.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    numericas = [X_treino.columns.get_loc(f) for f in FEATURES_NUMERICAS]
+    X_arr = X_treino.to_numpy(dtype=np.float64)
+    folds = []
+    for i, (idx_tr, idx_val) in enumerate(StratifiedKFold(n_folds, shuffle=True, random_state=seed).split(X_arr, y_treino)):
+        X_tr, X_val = X_arr[idx_tr].copy(), X_arr[idx_val].copy()
+        scaler = StandardScaler().fit(X_tr[:, numericas])
+        X_tr[:, numericas] = scaler.transform(X_tr[:, numericas])
+        X_val[:, numericas] = scaler.transform(X_val[:, numericas])
+        X_tr, y_tr = SMOTE(random_state=seed).fit_resample(X_tr, y_treino[idx_tr])
+
+        base = os.path.join(diretorio, f"fold_{i}")
+        np.save(f"{base}_X_tr.npy", X_tr.astype(np.float32))
+        np.save(f"{base}_y_tr.npy", y_tr.astype(np.int8))
+        np.save(f"{base}_X_val.npy", X_val.astype(np.float32))
+        np.save(f"{base}_y_val.npy", y_treino[idx_val].astype(np.int8))
+        folds.append(base)
+    return folds
+
+
+def _avaliar(tarefa):
+    """Treina uma configuração em todos os folds (abertos via memmap) e devolve métricas e tempo."""
+    id_config, params, n_estimators, folds, seed = tarefa
+    aucs, f1s = [], []
+    inicio = time.perf_counter()
+    for base in folds:
+        X_tr = np.load(f"{base}_X_tr.npy", mmap_mode='r')
+        y_tr = np.load(f"{base}_y_tr.npy", mmap_mode='r')
+        X_val = np.load(f"{base}_X_val.npy", mmap_mode='r')
+        y_val = np.load(f"{base}_y_val.npy", mmap_mode='r')
+        rf = RandomForestClassifier(n_estimators=n_estimators, random_state=seed, n_jobs=1, **params)
+        rf.fit(X_tr, y_tr)
+        proba = rf.predict_proba(X_val)[:, 1]
+        aucs.append(roc_auc_score(y_val, proba))
+        f1s.append(f1_score(y_val, (proba >= 0.5).astype(int)))
+    return {
+        'config': id_config,
+        **{k: ('None' if v is None else v) for k, v in params.items()},
+        'n_estimators': n_estimators,
+        'roc_auc': float(np.mean(aucs)),
+        'f1': float(np.mean(f1s)),
+        'segundos': time.perf_counter() - inicio,
+    }
+
+
+def sortear_configuracoes(espaco=ESPACO_PADRAO, n_configuracoes=27, seed=42):
+    """Sorteia 'n_configuracoes' combinações distintas do espaço (ou todas, se houver menos)."""
+    combinacoes = [dict(zip(espaco, valores)) for valores in itertools.product(*espaco.values())]
+    rng = np.random.default_rng(seed)
+    escolhidas = rng.permutation(len(combinacoes))[:n_configuracoes]
+    return [combinacoes[i] for i in sorted(escolhidas)]
+
+
+def successive_halving(configuracoes, folds, min_estimators=25, max_estimators=400, eta=3,
+                       processos=None, seed=42, verbose=True):
+    """
+    Executa o successive halving e retorna (tabela de resultados, melhores parâmetros, n_estimators).
+
+    Rodada r: cada configuração viva treina min_estimators * eta**r árvores
+    (limitado a max_estimators); as 1/eta melhores pelo ROC AUC médio seguem.
+    Para quando sobra uma configuração ou o orçamento máximo é atingido.
+    """
+    vivas = list(enumerate(configuracoes))
+    registros = []
+    rodada = 0
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        while True:
+            n_estimators = min(max_estimators, min_estimators * eta ** rodada)
+            tarefas = [(i, params, n_estimators, folds, seed) for i, params in vivas]
+            resultados = list(executor.map(_avaliar, tarefas))
+            for r in resultados:
+                r['rodada'] = rodada
+            resultados.sort(key=lambda r: r['roc_auc'], reverse=True)
+
+            ultima = len(vivas) == 1 or n_estimators >= max_estimators
+            n_seguem = len(vivas) if ultima else max(1, len(vivas) // eta)
+            for posicao, r in enumerate(resultados):
+                r['status'] = 'final' if ultima else ('promovida' if posicao < n_seguem else 'eliminada')
+            registros.extend(resultados)
+
+            if verbose:
+                print(f"Rodada {rodada}: {len(vivas)} configurações x {n_estimators} árvores | "
+                      f"melhor AUC {resultados[0]['roc_auc']:.4f}")
+            if ultima:
+                break
+            manter = {r['config'] for r in resultados[:n_seguem]}
+            vivas = [(i, params) for i, params in vivas if i in manter]
+            rodada += 1
+
+    tabela = pd.DataFrame(registros)
+    melhor = tabela[tabela['status'] == 'final'].sort_values('roc_auc', ascending=False).iloc[0]
+    return tabela, configuracoes[int(melhor['config'])], int(melhor['n_estimators'])
+
+
+def buscar(caminhos=ARQUIVOS_PADRAO, n_configuracoes=27, n_folds=3, processos=None, seed=42,
+           prefixo_artefatos="", arquivo_tabela="busca_hiperparametros.csv"):
+    """
+    Busca completa: prepara os folds uma vez, roda o successive halving,
+    re-treina a melhor configuração em todo o treino (scaler + SMOTE, como
+    em '[2]'), avalia no teste e salva os artefatos e a tabela de resultados.
+    """
+    X, y, features = carregar_dados(caminhos)
+    X_treino, X_teste, y_treino, y_teste = train_test_split(
+        X, y, test_size=0.3, random_state=seed, stratify=y)
+    # Medianas só do treino (como em '[2]'): são elas que vão para o pacote
+    medianas = X_treino.median()
+    X_treino = X_treino.fillna(medianas)
+    X_teste = X_teste.fillna(medianas)
+
+    configuracoes = sortear_configuracoes(n_configuracoes=n_configuracoes, seed=seed)
+    with tempfile.TemporaryDirectory(prefix="folds_") as diretorio:
+        inicio = time.perf_counter()
+        folds = preparar_folds(X_treino, y_treino, diretorio, n_folds, seed)
+        print(f"Folds preparados e gravados em {time.perf_counter() - inicio:.1f} s.")
+        tabela, melhores_params, n_estimators = successive_halving(configuracoes, folds, processos=processos,
+                                                                   seed=seed)
+
+    # --- Re-treino da melhor configuração ---
+    scaler = StandardScaler()
+    X_treino = X_treino.copy()
+    X_teste = X_teste.copy()
+    X_treino[FEATURES_NUMERICAS] = scaler.fit_transform(X_treino[FEATURES_NUMERICAS])
+    X_teste[FEATURES_NUMERICAS] = scaler.transform(X_teste[FEATURES_NUMERICAS])
+    X_bal, y_bal = SMOTE(random_state=seed).fit_resample(X_treino, y_treino)
+    rf = RandomForestClassifier(n_estimators=n_estimators, random_state=seed, n_jobs=-1, **melhores_params)
+    rf.fit(X_bal, y_bal)
+    proba = rf.predict_proba(X_teste)[:, 1]
+
+    print("\n" + "=" * 30)
+    print("MELHOR CONFIGURAÇÃO")
+    print("=" * 30)
+    print(f"{melhores_params} | n_estimators={n_estimators}")
+    print(f"F1 teste:      {f1_score(y_teste, (proba >= 0.5).astype(int)):.4f}")
+    print(f"ROC AUC teste: {roc_auc_score(y_teste, proba):.4f}")
+    print("\n--- Resultados por configuração e rodada ---")
+    print(tabela.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+    joblib.dump(rf, f'{prefixo_artefatos}modelo_rf_v1.joblib')
+    joblib.dump(scaler, f'{prefixo_artefatos}scaler_v1.joblib')
+    joblib.dump(pd.Index(features), f'{prefixo_artefatos}features_v1.joblib')
+    joblib.dump(list(FEATURES_NUMERICAS), f'{prefixo_artefatos}numeric_features_v1.joblib')
+    salvar_pacote(rf, scaler, features, FEATURES_NUMERICAS, f'{prefixo_artefatos}{ARQUIVO_PACOTE}',
+                  imputacao=medianas)
+    tabela.to_csv(arquivo_tabela, index=False, sep=';', decimal=',')
+    print(f"\nArtefatos da melhor configuração salvos; tabela em '{arquivo_tabela}'.")
+    return tabela, rf
+
+
+if __name__ == "__main__":
+    buscar()
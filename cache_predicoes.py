@@ -0,0 +1,130 @@
+import os
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import joblib
+
+# Cache persistente de previsões para execuções repetidas (ex.: '[4.1]', que
+# pontua a planilha inteira a cada execução, com quase nenhum paciente novo).
+# A chave é um hash do vetor de features já pré-processado, em float32 (o que
+# a floresta realmente compara), com o identificador do modelo como chave do
+# hash: vetores iguais dão exatamente a mesma probabilidade. O cache guarda o
+# identificador do modelo e é descartado quando o modelo muda; acima de
+# 'max_entradas' os pacientes usados há mais tempo saem primeiro (LRU).
+# Na mesma chave fica, opcionalmente, o texto dos principais fatores de risco
+# (explicacoes.principais_fatores), que também só depende do vetor e do modelo.
+
+ARQUIVO_CACHE = ".cache/predicoes.joblib"
+MAX_ENTRADAS = 500_000
+
+
+class CachePredicoes:
+
+    def __init__(self, pacote, caminho=ARQUIVO_CACHE, max_entradas=MAX_ENTRADAS):
+        self.caminho = caminho
+        self.max_entradas = max_entradas
+        self.modelo = pacote.identificador
+        self._chave_hash = bytes.fromhex(self.modelo)[:32]
+        self.entradas = OrderedDict()   # chave (16 bytes) -> probabilidade
+        self.textos_fatores = {}        # chave -> principais fatores (só das chaves em 'entradas')
+        self.acertos = 0
+        self.faltas = 0
+        self.fatores_calculados = 0
+        self.invalidado = False
+        if os.path.exists(caminho):
+            conteudo = joblib.load(caminho)
+            if conteudo.get('modelo') == self.modelo:
+                # Gravado como arrays (do menos ao mais recente): bem mais rápido que um dict serializado
+                chaves = conteudo['chaves'].tobytes()
+                self.entradas = OrderedDict(
+                    (chaves[i * 16:(i + 1) * 16], p) for i, p in enumerate(conteudo['proba'].tolist()))
+                fatores = conteudo.get('fatores')   # caches antigos não têm
+                if fatores is not None:
+                    self.textos_fatores = {chaves[i * 16:(i + 1) * 16]: t
+                                           for i, t in enumerate(fatores.tolist()) if t is not None}
+            else:
+                self.invalidado = True  # outro modelo: as previsões antigas não valem
+
+    def chaves(self, X):
+        """Chave de cada linha de X (hash BLAKE2b do vetor float32, com o modelo como chave)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return [hashlib.blake2b(linha.tobytes(), digest_size=16, key=self._chave_hash).digest() for linha in X]
+
+    def pontuar(self, X, modelo, chaves=None):
+        """
+        Probabilidade da classe 1 para cada linha de X. Só as linhas ausentes
+        do cache são enviadas a 'modelo.predict_proba' (numa única chamada).
+        'chaves' (de 'self.chaves(X)') evita recalcular os hashes.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if chaves is None:
+            chaves = self.chaves(X)
+        proba = np.empty(len(chaves))
+        faltando = []
+        for i, chave in enumerate(chaves):
+            valor = self.entradas.get(chave)
+            if valor is None:
+                faltando.append(i)
+            else:
+                proba[i] = valor
+                self.entradas.move_to_end(chave)
+        self.acertos += len(chaves) - len(faltando)
+        self.faltas += len(faltando)
+
+        if faltando:
+            proba[faltando] = modelo.predict_proba(X[faltando])[:, 1]
+            for i in faltando:
+                self.entradas[chaves[i]] = float(proba[i])
+        while len(self.entradas) > self.max_entradas:
+            chave, _ = self.entradas.popitem(last=False)
+            self.textos_fatores.pop(chave, None)
+        return proba
+
+    def fatores(self, X, calcular, chaves=None):
+        """
+        Principais fatores de risco de cada linha de X. Só as linhas sem texto
+        no cache são passadas a 'calcular' (X dessas linhas -> textos, numa
+        única chamada); os textos novos ficam nas chaves já pontuadas.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if chaves is None:
+            chaves = self.chaves(X)
+        textos = np.empty(len(chaves), dtype=object)
+        faltando = []
+        for i, chave in enumerate(chaves):
+            texto = self.textos_fatores.get(chave)
+            if texto is None:
+                faltando.append(i)
+            else:
+                textos[i] = texto
+        if faltando:
+            textos[faltando] = calcular(X[faltando])
+            for i in faltando:
+                if chaves[i] in self.entradas:
+                    self.textos_fatores[chaves[i]] = textos[i]
+        self.fatores_calculados = len(faltando)
+        return textos
+
+    def taxa_acerto(self):
+        total = self.acertos + self.faltas
+        return self.acertos / total if total else 0.0
+
+    def resumo(self):
+        texto = (f"Cache de previsões: {self.acertos} acertos, {self.faltas} enviados ao modelo "
+                 f"(taxa de acerto {self.taxa_acerto():.1%}, {len(self.entradas)} entradas)")
+        if self.invalidado:
+            texto += " — modelo mudou, cache anterior descartado"
+        return texto
+
+    def salvar(self):
+        """Grava o cache (arquivo temporário + rename, para não deixar um cache pela metade)."""
+        os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+        temporario = self.caminho + '.tmp'
+        conteudo = {
+            'modelo': self.modelo,
+            'chaves': np.frombuffer(b''.join(self.entradas.keys()), dtype=np.uint8).reshape(-1, 16),
+            'proba': np.fromiter(self.entradas.values(), dtype=np.float64, count=len(self.entradas)),
+            'fatores': np.array([self.textos_fatores.get(chave) for chave in self.entradas], dtype=object),
+        }
+        joblib.dump(conteudo, temporario)
+        os.replace(temporario, self.caminho)
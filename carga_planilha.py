@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+import time
+
+from formato_colunar import ler_pacientes_em_blocos, para_exportacao, contar_pacientes
+from sincronizacao_planilha import (hash_linha, normalizar_celula, linhas_para_envio, salvar_instantaneo,
+                                    _ultima_coluna)
+from cliente_planilhas import AbaProtegida
+
+# Carga completa de uma coorte numa aba do Google Sheets, em blocos e com
+# retomada, sem deixar a aba vazia ou pela metade em caso de falha:
+#   1. o arquivo (Parquet ou CSV) é lido em blocos de LINHAS_POR_CHAMADA linhas,
+#      sem carregar a coorte inteira;
+#   2. os blocos vão para uma aba temporária ('<aba>__carga', criada já do
+#      tamanho exato), um 'batch_update' por bloco, alguns em paralelo;
+#   3. depois de cada grupo de blocos, um ponto de controle (JSON) guarda
+#      quantas linhas já estão na aba temporária: uma carga interrompida
+#      continua dali, desde que o arquivo e a aba temporária sejam os mesmos;
+#   4. no fim, um único 'batch_update' do documento apaga a aba antiga e dá
+#      o nome (e a posição) dela à temporária — a troca é atômica.
+# Até a troca, a aba original fica intacta. Colunas acrescentadas na aba
+# antiga por outros scripts (ex.: 'risco_modelo_rf' de '[4.1]') não são
+# copiadas: '[4.1]' as recalcula na próxima execução.
+
+SUFIXO_TEMPORARIA = '__carga'
+LINHAS_POR_CHAMADA = 5_000      # ~165 mil células com as 33 colunas do esquema (< MAX_CELULAS_POR_CHAMADA)
+CHAMADAS_SIMULTANEAS = 4
+
+
+def impressao_digital(caminho):
+    """Identifica a versão do arquivo (ou das partes de um diretório Parquet): nome, tamanho e data."""
+    if os.path.isdir(caminho):
+        arquivos = sorted(os.path.join(raiz, nome) for raiz, _, nomes in os.walk(caminho) for nome in nomes)
+    else:
+        arquivos = [caminho]
+    return [[os.path.relpath(a, caminho) if a != caminho else os.path.basename(a),
+             os.path.getsize(a), os.stat(a).st_mtime_ns] for a in arquivos]
+
+
+def carregar_ponto_controle(caminho):
+    if not caminho or not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def salvar_ponto_controle(caminho, estado):
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(estado, arquivo)
+    os.replace(temporario, caminho)
+
+
+def enviar_em_blocos(cliente, planilha_id, nome_aba, arquivo, ponto_controle, caminho_instantaneo=None,
+                     linhas_por_chamada=LINHAS_POR_CHAMADA, chamadas_simultaneas=CHAMADAS_SIMULTANEAS,
+                     value_input_option='RAW', verbose=True):
+    """
+    Substitui o conteúdo da aba 'nome_aba' pela coorte de 'arquivo' (ver o
+    comentário do módulo). 'cliente' é um ClientePlanilhas. Com
+    'caminho_instantaneo', grava também o instantâneo usado pelo envio
+    incremental de '[5]' (enviar_tabela). Retorna um resumo da carga.
+    """
+    inicio_tempo = time.perf_counter()
+    documento = cliente.documento(planilha_id)
+    abas = {aba.title: aba for aba in cliente.chamar('leitura', documento.worksheets)}
+    temporaria = nome_aba + SUFIXO_TEMPORARIA
+    digital = impressao_digital(arquivo)
+
+    estado = carregar_ponto_controle(ponto_controle)
+    retomada = (estado is not None and estado['arquivo'] == digital and temporaria in abas
+                and abas[temporaria].id == estado['aba_id'])
+    if retomada:
+        linhas_por_chamada = estado['linhas_por_chamada']
+        aba_nova = AbaProtegida(abas[temporaria], cliente)
+        if verbose:
+            print(f"Retomando a carga: {estado['linhas_enviadas']:,} de {estado['total']:,} linhas já enviadas.")
+    else:
+        if temporaria in abas:   # sobra de uma carga de outro arquivo
+            cliente.chamar('escrita', documento.del_worksheet, abas[temporaria], idempotente=False)
+        estado = None
+    ja_enviadas = estado['linhas_enviadas'] if retomada else 0
+
+    hashes, ids = [], []
+    onda = []          # (linha da planilha, valores) a enviar juntos
+    chamadas = 0
+    linha = 0          # linhas de dados lidas do arquivo até aqui
+
+    def enviar_onda():
+        nonlocal chamadas
+        if not onda:
+            return
+        ultima = _ultima_coluna(len(estado['cabecalho']))
+        cliente.em_paralelo(*[
+            lambda inicio=inicio, valores=valores: aba_nova.batch_update(
+                [{'range': f'A{inicio}:{ultima}{inicio + len(valores) - 1}', 'values': valores}],
+                value_input_option=value_input_option)
+            for inicio, valores in onda])
+        chamadas += len(onda)
+        onda.clear()
+        estado['linhas_enviadas'] = linha
+        salvar_ponto_controle(ponto_controle, estado)
+        if verbose:
+            print(f"  {linha:,}/{estado['total']:,} linhas na aba temporária "
+                  f"({time.perf_counter() - inicio_tempo:.1f} s)")
+
+    for bloco in ler_pacientes_em_blocos(arquivo, linhas_por_chamada):
+        bloco = para_exportacao(bloco)
+        if estado is None:
+            # Primeiro bloco de uma carga nova: aba temporária já do tamanho final
+            cabecalho = bloco.columns.tolist()
+            total = contar_pacientes(arquivo)
+            aba_nova = AbaProtegida(cliente.chamar('escrita', documento.add_worksheet, temporaria, total + 1,
+                                                   len(cabecalho), idempotente=False), cliente)
+            estado = {'arquivo': digital, 'aba_id': aba_nova.id, 'cabecalho': cabecalho, 'total': total,
+                      'linhas_por_chamada': linhas_por_chamada, 'linhas_enviadas': 0}
+            # Gravado já aqui: se o primeiro grupo de blocos falhar, a retomada reaproveita a aba temporária
+            salvar_ponto_controle(ponto_controle, estado)
+        if linha == 0 and ja_enviadas == 0:
+            onda.append((1, [estado['cabecalho']]))   # cabeçalho vai com o primeiro grupo (também na retomada do zero)
+        linhas = bloco.values.tolist()
+        hashes += [hash_linha(l) for l in linhas]
+        ids += [normalizar_celula(l[0]) for l in linhas]
+        pular = max(ja_enviadas - linha, 0)
+        if pular < len(linhas):
+            onda.append((linha + pular + 2, linhas_para_envio(linhas[pular:])))
+        linha += len(linhas)
+        if len(onda) >= chamadas_simultaneas:
+            enviar_onda()
+    if estado is None:
+        raise ValueError(f"'{arquivo}' não tem pacientes.")
+    enviar_onda()
+
+    # Troca atômica: apaga a aba antiga e dá o nome e a posição dela à temporária, numa só requisição
+    antiga = abas.get(nome_aba)
+    propriedades, campos = {'sheetId': aba_nova.id, 'title': nome_aba}, 'title'
+    pedidos = []
+    if antiga is not None:
+        pedidos.append({'deleteSheet': {'sheetId': antiga.id}})
+        propriedades['index'], campos = antiga.index, 'title,index'
+    pedidos.append({'updateSheetProperties': {'properties': propriedades, 'fields': campos}})
+    cliente.chamar('escrita', documento.batch_update, {'requests': pedidos}, idempotente=False)
+    cliente.esquecer_abas(planilha_id)
+
+    if caminho_instantaneo:
+        salvar_instantaneo(caminho_instantaneo, estado['cabecalho'], None, hashes=hashes, ids=ids)
+    os.remove(ponto_controle)
+    return {'linhas': linha, 'linhas_enviadas': linha - ja_enviadas, 'retomada': retomada,
+            'chamadas_escrita': chamadas + 1, 'segundos': time.perf_counter() - inicio_tempo}
+
+
+# --- Medição offline ---
+
+def medir_carga(qtd=50_000, latencia_s=0.3, latencia_por_celula_s=2e-6, limite_celulas=1_000_000):
+    """
+    Compara, contra o ClienteFalso (dormindo a latência simulada), o '[5]'
+    original (clear + um único update) com a carga em blocos (sequencial e
+    em paralelo) e com uma carga interrompida na metade e retomada.
+    'limite_celulas' simula o limite de tamanho de uma requisição da API.
+    """
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from gerador_vetorizado import gerar_lote
+    from formato_colunar import salvar_pacientes
+    from planilha_falsa import ClienteFalso, ErroRequisicao, ErroServidor
+    from cliente_planilhas import ClientePlanilhas
+
+    chave, nome = 'planilha', 'Pacientes_simulados'
+    antiga = [['id', 'idade'], ['P0', 50]]
+    resultados = []
+    opcoes = {'latencia_s': latencia_s, 'latencia_por_celula_s': latencia_por_celula_s}
+
+    def novo_falso(limite=None, **extras):
+        return ClienteFalso({chave: {'Resumo': [['x']], nome: antiga}}, max_celulas_por_requisicao=limite,
+                            **opcoes, **extras)
+
+    def anotar(cenario, segundos, falso, linhas_enviadas, situacao):
+        aba = falso.documentos[chave]._por_titulo(nome)
+        resultados.append({'cenario': cenario, 'segundos': segundos,
+                           'linhas/s': linhas_enviadas / segundos if segundos else 0.0,
+                           'escritas': falso.api.escritas_aceitas,
+                           'linhas na aba': max(aba.row_count - 1, 0), 'situacao': situacao})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivo = os.path.join(tmp, 'coorte.parquet')
+        salvar_pacientes(gerar_lote(qtd, np.random.default_rng(3)), arquivo)
+        controle = os.path.join(tmp, 'carga.json')
+        df = para_exportacao(pd.read_parquet(arquivo))
+        valores = [df.columns.tolist()] + linhas_para_envio(df.values.tolist())
+
+        # '[5]' original: clear() + update() com tudo
+        for limite in (None, limite_celulas):
+            falso = novo_falso(limite)
+            aba = falso.documentos[chave]._por_titulo(nome)
+            inicio = time.perf_counter()
+            try:
+                aba.clear()
+                aba.update(valores, 'A1')
+                situacao = 'ok'
+            except ErroRequisicao:
+                situacao = 'falhou depois do clear: aba vazia'
+            titulo = 'clear + update único' + (f' (limite {limite:,} células)' if limite else '')
+            anotar(titulo, time.perf_counter() - inicio, falso, qtd if situacao == 'ok' else 0, situacao)
+
+        # Carga em blocos, sequencial e em paralelo
+        for simultaneas in (1, CHAMADAS_SIMULTANEAS):
+            falso = novo_falso(limite_celulas)
+            cliente = ClientePlanilhas(conectar=lambda: falso, semente=1)
+            resumo = enviar_em_blocos(cliente, chave, nome, arquivo, controle, chamadas_simultaneas=simultaneas,
+                                      verbose=False)
+            cliente.fechar()
+            ordem = [a.title for a in falso.documentos[chave].worksheets()]
+            anotar(f'em blocos, {simultaneas} chamada(s) simultânea(s)', resumo['segundos'], falso,
+                   resumo['linhas_enviadas'], f"ok, abas {ordem}")
+
+        # Interrompida na metade (a conexão cai) e retomada
+        escritas = -(-qtd // LINHAS_POR_CHAMADA)
+        falso = novo_falso(limite_celulas, interromper_apos=1 + escritas // 2)   # +1: criação da aba temporária
+        cliente = ClientePlanilhas(conectar=lambda: falso, semente=1, tentativas=2, espera_base_s=0.01)
+        inicio = time.perf_counter()
+        try:
+            enviar_em_blocos(cliente, chave, nome, arquivo, controle, verbose=False)
+        except ErroServidor:
+            pass
+        estado = carregar_ponto_controle(controle)   # None se a queda veio antes da aba temporária
+        enviadas = estado['linhas_enviadas'] if estado else 0
+        anotar('em blocos, interrompida', time.perf_counter() - inicio, falso, enviadas,
+               f'aba original intacta; {enviadas:,} linhas no ponto de controle')
+        falso.api.interromper_apos = None
+        falso.api.escritas_aceitas = 0
+        resumo = enviar_em_blocos(cliente, chave, nome, arquivo, controle, verbose=False)
+        cliente.fechar()
+        anotar('em blocos, retomada', resumo['segundos'], falso, resumo['linhas_enviadas'],
+               f"ok, {resumo['linhas_enviadas']:,} linhas reenviadas")
+        conferencia = falso.documentos[chave]._por_titulo(nome).get_all_values()
+        iguais = [[normalizar_celula(v) for v in l] for l in valores] == conferencia
+
+    tabela = pd.DataFrame(resultados)
+    print(f"--- {qtd:,} pacientes x {len(valores[0])} colunas, latência {latencia_s * 1e3:.0f} ms "
+          f"+ {latencia_por_celula_s * 1e6:.0f} µs/célula ---")
+    print(tabela.to_markdown(index=False, floatfmt=".1f"))
+    print(f"Aba final idêntica ao arquivo depois da retomada: {iguais}")
+    return tabela
+
+
+if __name__ == "__main__":
+    medir_carga(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
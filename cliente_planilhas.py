@@ -0,0 +1,344 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+import requests
+import gspread
+from gspread.exceptions import WorksheetNotFound
+
+# Camada única de acesso ao Google Sheets usada por '[4.1]', '[5]' e '[6]':
+#   - uma sessão autorizada por processo e por conjunto de escopos
+#     ('obter_cliente'), com documentos e abas em cache (a lista de abas de um
+#     documento é lida uma vez, em vez de uma leitura de metadados por aba);
+#   - cotas por minuto respeitadas do lado do cliente, com um balde de fichas
+#     para leituras e outro para escritas, compartilhados entre as threads;
+#   - 429 e 5xx (e falhas de conexão) repetidos com espera exponencial e
+#     jitter; 'append_rows' não é idempotente e só é repetido em 429;
+#   - chamadas independentes em paralelo num pool de threads ('em_paralelo',
+#     'em_segundo_plano'), ex.: ler a aba enquanto o modelo é carregado.
+# 'conectar' permite trocar o gspread por um backend local (planilha_falsa.ClienteFalso),
+# com latência e falhas injetadas, para testar tudo sem rede.
+
+ESCOPOS_LEITURA = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+ESCOPOS_EDICAO = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+
+COTA_LEITURA = 60           # requisições por minuto por usuário (padrão da API do Sheets)
+COTA_ESCRITA = 60
+PERIODO_COTA_S = 60
+TENTATIVAS = 6              # total de tentativas por chamada
+ESPERA_BASE_S = 1.0
+ESPERA_MAX_S = 32.0
+MAX_PARALELO = 4
+CODIGOS_TRANSITORIOS = {429, 500, 502, 503, 504}
+
+# Métodos da aba (gspread.Worksheet) que fazem uma requisição, por tipo de cota
+LEITURAS = {'get_all_values', 'get_all_records', 'get_values', 'get', 'batch_get', 'row_values', 'col_values',
+            'acell', 'cell'}
+ESCRITAS = {'update', 'batch_update', 'batch_clear', 'update_cell', 'update_cells', 'append_row', 'append_rows',
+            'clear', 'resize', 'add_rows', 'add_cols', 'delete_rows', 'insert_rows'}
+NAO_IDEMPOTENTES = {'append_row', 'append_rows', 'add_rows', 'add_cols', 'insert_rows', 'delete_rows'}
+
+
+def codigo_http(erro):
+    """Status HTTP de um erro da API (gspread.APIError ou dos backends falsos), ou None."""
+    resposta = getattr(erro, 'response', None)
+    codigo = getattr(resposta, 'status_code', None)
+    return codigo if codigo is not None else getattr(erro, 'code', None)
+
+
+def transitorio(erro, idempotente=True):
+    """Vale a pena repetir? 429 sempre; 5xx e falhas de conexão só se repetir não duplica nada."""
+    codigo = codigo_http(erro)
+    if codigo == 429:
+        return True
+    if not idempotente:
+        return False
+    return codigo in CODIGOS_TRANSITORIOS or isinstance(
+        erro, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class BaldeFichas:
+    """
+    Balde de fichas (token bucket) seguro entre threads: até 'rajada' chamadas
+    imediatas e depois reposição contínua. A taxa é (limite - rajada) / período,
+    então nenhuma janela de 'periodo_s' passa de 'limite' chamadas.
+    """
+
+    def __init__(self, limite, periodo_s=PERIODO_COTA_S, rajada=None):
+        if limite < 2:
+            raise ValueError(f"Limite de {limite} chamadas por período: use pelo menos 2.")
+        self.rajada = max(1, min(limite - 1, rajada if rajada is not None else limite // 6))
+        self.taxa = (limite - self.rajada) / periodo_s
+        self.fichas = float(self.rajada)
+        self.espera_total_s = 0.0
+        self._ultimo = time.monotonic()
+        self._trava = threading.Lock()
+
+    def retirar(self):
+        """Bloqueia até haver uma ficha e a consome."""
+        while True:
+            with self._trava:
+                agora = time.monotonic()
+                self.fichas = min(self.rajada, self.fichas + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                espera = (1 - self.fichas) / self.taxa
+                self.espera_total_s += espera
+            time.sleep(espera)
+
+
+class AbaProtegida:
+    """
+    Envolve uma aba (gspread.Worksheet ou PlanilhaFalsa): os métodos que fazem
+    requisições passam pelo balde de fichas e pelas repetições do cliente;
+    o resto é repassado sem mudança.
+    """
+
+    def __init__(self, aba, cliente):
+        self._aba = aba
+        self._cliente = cliente
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._aba, nome)
+        if not callable(atributo) or nome not in LEITURAS | ESCRITAS:
+            return atributo
+        tipo = 'leitura' if nome in LEITURAS else 'escrita'
+
+        def chamada(*args, **kwargs):
+            return self._cliente.chamar(tipo, atributo, *args, idempotente=nome not in NAO_IDEMPOTENTES, **kwargs)
+        chamada.__name__ = nome
+        return chamada
+
+    def em_paralelo(self, *tarefas):
+        return self._cliente.em_paralelo(*tarefas)
+
+
+class ClientePlanilhas:
+    """
+    Cliente do Google Sheets compartilhado. 'conectar' é uma função sem
+    argumentos que devolve um cliente do gspread (ou ClienteFalso); por padrão,
+    autoriza a conta de serviço de 'credenciais' com 'escopos'.
+    """
+
+    def __init__(self, credenciais=None, escopos=ESCOPOS_EDICAO, conectar=None, cota_leitura=COTA_LEITURA,
+                 cota_escrita=COTA_ESCRITA, periodo_cota_s=PERIODO_COTA_S, tentativas=TENTATIVAS,
+                 espera_base_s=ESPERA_BASE_S, espera_max_s=ESPERA_MAX_S, max_paralelo=MAX_PARALELO, semente=None):
+        self.credenciais = credenciais
+        self.escopos = list(escopos)
+        self._conectar = conectar or self._autorizar
+        self.baldes = {'leitura': BaldeFichas(cota_leitura, periodo_cota_s),
+                       'escrita': BaldeFichas(cota_escrita, periodo_cota_s)}
+        self.tentativas = tentativas
+        self.espera_base_s = espera_base_s
+        self.espera_max_s = espera_max_s
+        self.max_paralelo = max_paralelo
+        self._sorteio = random.Random(semente)
+        self._sessao = None
+        self._documentos = {}       # planilha_id -> Future do documento (ver _em_cache)
+        self._abas = {}             # planilha_id -> Future de {título: aba}
+        self._pool = None
+        self._trava = threading.RLock()
+        self.chamadas = 0
+        self.repeticoes = 0
+
+    def _autorizar(self):
+        from google.oauth2.service_account import Credentials
+        return gspread.authorize(Credentials.from_service_account_file(self.credenciais, scopes=self.escopos))
+
+    def conectar(self):
+        """Autoriza a sessão (uma vez só); chamado sozinho no primeiro uso."""
+        with self._trava:
+            if self._sessao is None:
+                self._sessao = self._conectar()
+            return self._sessao
+
+    # --- Chamadas com cota e repetição ---
+
+    def chamar(self, tipo, funcao, *args, idempotente=True, **kwargs):
+        """Executa 'funcao' como uma requisição do 'tipo' ('leitura'/'escrita'), com cota e repetições."""
+        for tentativa in range(self.tentativas):
+            self.baldes[tipo].retirar()
+            try:
+                resultado = funcao(*args, **kwargs)
+                with self._trava:
+                    self.chamadas += 1
+                return resultado
+            except Exception as erro:
+                if tentativa == self.tentativas - 1 or not transitorio(erro, idempotente):
+                    raise
+                with self._trava:
+                    self.repeticoes += 1
+                    teto = min(self.espera_max_s, self.espera_base_s * 2 ** tentativa)
+                    espera = self._sorteio.uniform(teto / 2, teto)   # jitter: threads não voltam juntas
+                time.sleep(espera)
+
+    # --- Documentos e abas ---
+
+    def _em_cache(self, cache, chave, carregar):
+        """
+        Valor de 'cache[chave]', carregado uma única vez por 'carregar()'. A
+        chamada remota é feita fora da trava (uma espera de cota ou de repetição
+        não segura as outras threads); quem pedir a mesma chave enquanto isso
+        espera pelo Future da primeira thread em vez de repetir a chamada.
+        """
+        with self._trava:
+            futuro = cache.get(chave)
+            carregando = futuro is None
+            if carregando:
+                futuro = cache[chave] = Future()
+        if carregando:
+            try:
+                futuro.set_result(carregar())
+            except BaseException as erro:
+                with self._trava:
+                    if cache.get(chave) is futuro:
+                        del cache[chave]    # a próxima chamada tenta de novo
+                futuro.set_exception(erro)
+        return futuro.result()
+
+    def documento(self, planilha_id):
+        return self._em_cache(self._documentos, planilha_id,
+                              lambda: self.chamar('leitura', self.conectar().open_by_key, planilha_id))
+
+    def aba(self, planilha_id, nome):
+        """Aba 'nome' (AbaProtegida). A lista de abas do documento é lida uma vez e fica em cache."""
+        abas = self._em_cache(self._abas, planilha_id, lambda: {
+            a.title: a for a in self.chamar('leitura', self.documento(planilha_id).worksheets)})
+        if nome not in abas:
+            raise WorksheetNotFound(nome)
+        return AbaProtegida(abas[nome], self)
+
+    def esquecer_abas(self, planilha_id):
+        """Descarta a lista de abas em cache (depois de criar ou apagar abas)."""
+        with self._trava:
+            self._abas.pop(planilha_id, None)
+
+    # --- Concorrência ---
+
+    def _executor(self):
+        with self._trava:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.max_paralelo, thread_name_prefix='planilhas')
+            return self._pool
+
+    def em_segundo_plano(self, funcao, *args, **kwargs):
+        """Inicia 'funcao' numa thread do pool e devolve o Future (ex.: ler a aba enquanto carrega o modelo)."""
+        return self._executor().submit(funcao, *args, **kwargs)
+
+    def em_paralelo(self, *tarefas):
+        """Executa as funções (sem argumentos) ao mesmo tempo; resultados na ordem, primeiro erro propagado."""
+        if len(tarefas) <= 1:
+            return [tarefa() for tarefa in tarefas]
+        futuros = [self._executor().submit(tarefa) for tarefa in tarefas]
+        return [futuro.result() for futuro in futuros]
+
+    def resumo(self):
+        return {'chamadas': self.chamadas, 'repeticoes': self.repeticoes,
+                'espera_cota_s': sum(b.espera_total_s for b in self.baldes.values())}
+
+    def fechar(self):
+        with self._trava:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+_clientes = {}
+_trava_clientes = threading.Lock()
+
+
+def obter_cliente(credenciais, escopos=ESCOPOS_EDICAO, **opcoes):
+    """Cliente compartilhado do processo para (credenciais, escopos): uma sessão autorizada só."""
+    chave = (credenciais, tuple(escopos))
+    with _trava_clientes:
+        if chave not in _clientes:
+            _clientes[chave] = ClientePlanilhas(credenciais, escopos, **opcoes)
+        return _clientes[chave]
+
+
+# --- Medição offline (planilha_falsa, latência e falhas injetadas) ---
+
+def medir_cliente(latencia_s=0.05, abas=4, escritas=8, chamadas_cota=40, taxa_erro=0.2):
+    """
+    Compara, contra o ClienteFalso (dormindo a latência de verdade):
+    abertura de várias abas e escritas independentes em sequência x pelo
+    ClientePlanilhas; rajada acima da cota sem x com balde de fichas; e
+    leituras com falhas 503 injetadas, que o cliente repete até passar.
+    """
+    import pandas as pd
+    from planilha_falsa import ClienteFalso, ErroCota
+
+    chave = 'planilha'
+    documentos = {chave: {f'Aba{i}': [['id', 'valor']] + [[j, j] for j in range(100)] for i in range(abas)}}
+    nomes = list(documentos[chave])
+    resultados = []
+
+    def medir(cenario, modo, falso, funcao, cliente=None):
+        falso.api.zerar_medidas()
+        inicio = time.perf_counter()
+        erro = ''
+        try:
+            funcao()
+        except ErroCota:
+            erro = '429'
+        resumo = falso.api.resumo()
+        resultados.append({'cenario': cenario, 'modo': modo, 'segundos': time.perf_counter() - inicio,
+                           'requisicoes': resumo['chamadas'] + sum(resumo['recusadas'].values()),
+                           'recusadas': sum(resumo['recusadas'].values()),
+                           'repeticoes': cliente.repeticoes if cliente else 0, 'erro': erro})
+
+    def novo_cliente(falso, **opcoes):
+        return ClientePlanilhas(conectar=lambda: falso, semente=1, **opcoes)
+
+    # 1. Abrir as abas e ler todas
+    falso = ClienteFalso(documentos, latencia_s=latencia_s)
+    medir('abrir e ler abas', 'gspread em sequência', falso,
+          lambda: [falso.open_by_key(chave).worksheet(n).get_all_values() for n in nomes])
+    cliente = novo_cliente(falso)
+    medir('abrir e ler abas', 'cliente (cache + paralelo)', falso,
+          lambda: cliente.em_paralelo(*[lambda n=n: cliente.aba(chave, n).get_all_values() for n in nomes]), cliente)
+
+    # 2. Escritas independentes (intervalos disjuntos)
+    aba_falsa = falso.open_by_key(chave).worksheet(nomes[0])
+    dados = [[{'range': f'B{i + 2}', 'values': [[i * 10]]}] for i in range(escritas)]
+    medir('escritas independentes', 'gspread em sequência', falso,
+          lambda: [aba_falsa.batch_update(d) for d in dados])
+    aba = cliente.aba(chave, nomes[0])
+    medir('escritas independentes', 'cliente (paralelo)', falso,
+          lambda: aba.em_paralelo(*[lambda d=d: aba.batch_update(d) for d in dados]), cliente)
+
+    # 3. Rajada acima da cota (cota de 20 leituras a cada 2 s)
+    opcoes_cota = {'cota_por_minuto': 20, 'periodo_cota_s': 2.0, 'latencia_s': 0.005}
+    falso = ClienteFalso(documentos, **opcoes_cota)
+    aba_falsa = falso.open_by_key(chave).worksheet(nomes[0])
+    medir(f'{chamadas_cota} leituras, cota 20/2 s', 'sem controle', falso,
+          lambda: [aba_falsa.row_values(1) for _ in range(chamadas_cota)])
+    falso = ClienteFalso(documentos, **opcoes_cota)
+    cliente = novo_cliente(falso, cota_leitura=20, periodo_cota_s=2.0)
+    aba = cliente.aba(chave, nomes[0])
+    medir(f'{chamadas_cota} leituras, cota 20/2 s', 'cliente (balde de fichas)', falso,
+          lambda: cliente.em_paralelo(*[lambda: aba.row_values(1) for _ in range(chamadas_cota)]), cliente)
+
+    # 4. Falhas transitórias (503) injetadas
+    falso = ClienteFalso(documentos, latencia_s=0.005, cota_por_minuto=10_000, taxa_erro=taxa_erro, semente=3)
+    cliente = novo_cliente(falso, cota_leitura=10_000, espera_base_s=0.01)
+    medir(f'{chamadas_cota} leituras, {taxa_erro:.0%} de 503', 'cliente (repetição com jitter)', falso,
+          lambda: [cliente.aba(chave, nomes[0]).get_all_values() for _ in range(chamadas_cota)], cliente)
+    cliente.fechar()
+
+    tabela = pd.DataFrame(resultados)
+    print(f"--- ClienteFalso, latência {latencia_s * 1e3:.0f} ms por requisição ---")
+    print(tabela.to_markdown(index=False, floatfmt=".2f"))
+    return tabela
+
+
+if __name__ == "__main__":
+    medir_cliente()
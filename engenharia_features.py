@@ -0,0 +1,176 @@
+import time
+import numpy as np
+import pandas as pd
+
+# Engenharia de features única, usada pelo treino ('[2]') e por todos os
+# caminhos de pontuação ('[4.0]', '[4.1]', ...). Trabalha direto sobre os
+# arrays NumPy das colunas, sem DataFrames intermediários.
+
+MAPA_SEXO = {'M': 0, 'F': 1, 'm': 0, 'f': 1}
+
+# Feature derivada -> (coluna do pé esquerdo, coluna do pé direito, operação)
+FEATURES_DERIVADAS = {
+    'pressao_pico_media': ('pressao_pico_esq_kpa', 'pressao_pico_dir_kpa', 'media'),
+    'pressao_assimetria_kpa': ('pressao_pico_esq_kpa', 'pressao_pico_dir_kpa', 'assimetria'),
+    'pressao_integral_media': ('pressao_integral_esq_kpa_s', 'pressao_integral_dir_kpa_s', 'media'),
+    'temperatura_media': ('temperatura_esq_c', 'temperatura_dir_c', 'media'),
+    'umidade_media': ('umidade_esq_perc', 'umidade_dir_perc', 'media'),
+}
+
+# Colunas brutas substituídas pelas features derivadas (removidas de X no treino)
+COLUNAS_SENSORES_BRUTAS = [
+    'pressao_pico_esq_kpa', 'pressao_pico_dir_kpa',
+    'pressao_integral_esq_kpa_s', 'pressao_integral_dir_kpa_s',
+    'temperatura_esq_c', 'temperatura_dir_c',
+    'umidade_esq_perc', 'umidade_dir_perc'
+]
+
+# Features numéricas (escaladas) e categóricas (já são 0/1) usadas pelo modelo
+FEATURES_NUMERICAS = [
+    'idade', 'tempo_diabetes_anos', 'hba1c_perc', 'imc', 'velocidade_marcha_m_s',
+
+    # Features UMI adicionadas
+    'contagem_passos', 'aceleracao_vertical_rms', 'orientacao_pe_graus',
+
+    # Features de engenharia existentes
+    'pressao_pico_media', 'pressao_integral_media',
+    'temperatura_media', 'temp_assimetria_c', 'umidade_media',
+    'pressao_assimetria_kpa'
+]
+
+FEATURES_CATEGORICAS = [
+    'sexo', 'neuropatia_s_n', 'deformidade_s_n', 'ulcera_previa_s_n',
+    'amputacao_previa_s_n', 'dap_s_n', 'retinopatia_s_n', 'nefropatia_s_n',
+    'has_s_n', 'tabagismo_s_n', 'alcool_s_n', 'atividade_fisica_s_n'
+]
+
+ALVO = 'risco_ulcera_calc'
+
+
+def _como_array(valores):
+    """Converte para array float (object/texto vira NaN onde não for numérico)."""
+    arr = np.asarray(valores)
+    if arr.dtype.kind in 'fiub':
+        return arr.astype(np.result_type(arr.dtype, np.float32), copy=False)
+    return pd.to_numeric(arr, errors='coerce')
+
+
+def _media_par(a, b):
+    """Média de dois vetores ignorando NaN (como '.mean(axis=1)' do pandas)."""
+    soma = np.where(np.isnan(a), 0, a) + np.where(np.isnan(b), 0, b)
+    contagem = (~np.isnan(a)).astype(a.dtype) + (~np.isnan(b))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return soma / contagem
+
+
+def codificar_sexo(valores):
+    """
+    Converte 'sexo' para numérico (M=0, F=1; minúsculas aceitas).
+    Qualquer outro valor (ou ausente) vira NaN. Retorna array float64.
+    """
+    if isinstance(getattr(valores, 'dtype', None), pd.CategoricalDtype):
+        # Em colunas categóricas basta traduzir as categorias e indexar pelos códigos
+        categorias = valores.cat.categories
+        tabela = np.array([MAPA_SEXO.get(c, np.nan) for c in categorias] + [np.nan], dtype=np.float64)
+        return tabela[valores.cat.codes.to_numpy()]  # código -1 (ausente) cai no NaN final
+
+    arr = np.asarray(valores, dtype=object)
+    saida = np.full(len(arr), np.nan)
+    for rotulo, codigo in MAPA_SEXO.items():
+        saida[arr == rotulo] = codigo
+    return saida
+
+
+def calcular_features(colunas):
+    """
+    Modo em lote: calcula as features derivadas a partir de um mapeamento
+    coluna -> valores (DataFrame, dict de arrays, ...).
+    Retorna um dict {feature: np.ndarray}. Levanta KeyError se faltar coluna.
+    """
+    saida = {}
+    for nome, (esq, dir_, operacao) in FEATURES_DERIVADAS.items():
+        a = _como_array(colunas[esq])
+        b = _como_array(colunas[dir_])
+        saida[nome] = _media_par(a, b) if operacao == 'media' else np.abs(a - b)
+    return saida
+
+
+def adicionar_features(df):
+    """
+    Aplica no DataFrame (in-place) a codificação de 'sexo' e as features derivadas.
+    Retorna o próprio DataFrame. Levanta KeyError se faltar coluna de sensor.
+    """
+    if 'sexo' in df.columns:
+        df['sexo'] = codificar_sexo(df['sexo'])
+    for nome, valores in calcular_features(df).items():
+        df[nome] = valores
+    return df
+
+
+def _float_ou_nan(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def features_registro(registro):
+    """
+    Caminho rápido para um único paciente (dict coluna -> valor), em Python puro.
+
+    Retorna um novo dict com 'sexo' codificado e as features derivadas
+    adicionadas, com a mesma semântica do modo em lote (NaN ignorado nas médias).
+    """
+    saida = dict(registro)
+    if 'sexo' in saida:
+        saida['sexo'] = float(MAPA_SEXO.get(saida['sexo'], float('nan')))
+    for nome, (esq, dir_, operacao) in FEATURES_DERIVADAS.items():
+        a = _float_ou_nan(registro[esq])
+        b = _float_ou_nan(registro[dir_])
+        if operacao == 'assimetria':
+            saida[nome] = abs(a - b)
+        elif a != a:  # NaN
+            saida[nome] = b
+        elif b != b:
+            saida[nome] = a
+        else:
+            saida[nome] = (a + b) * 0.5
+    return saida
+
+
+def _features_pandas(df):
+    """Implementação antiga (DataFrames de duas colunas + '.mean(axis=1)'), só para comparação."""
+    df['sexo'] = df['sexo'].map({'M': 0, 'F': 1})
+    df['pressao_pico_media'] = df[['pressao_pico_esq_kpa', 'pressao_pico_dir_kpa']].mean(axis=1)
+    df['pressao_assimetria_kpa'] = (df['pressao_pico_esq_kpa'] - df['pressao_pico_dir_kpa']).abs()
+    df['pressao_integral_media'] = df[['pressao_integral_esq_kpa_s', 'pressao_integral_dir_kpa_s']].mean(axis=1)
+    df['temperatura_media'] = df[['temperatura_esq_c', 'temperatura_dir_c']].mean(axis=1)
+    df['umidade_media'] = df[['umidade_esq_perc', 'umidade_dir_perc']].mean(axis=1)
+    return df
+
+
+if __name__ == "__main__":
+    from gerador_vetorizado import gerar_lote
+
+    df = gerar_lote(1_000_000, np.random.default_rng(42), incluir_nomes=False)
+
+    inicio = time.perf_counter()
+    _features_pandas(df.copy())
+    t_pandas = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    adicionar_features(df.copy())
+    t_vetor = time.perf_counter() - inicio
+    print(f"Lote (1M linhas): pandas {t_pandas:.3f} s | arrays {t_vetor:.3f} s")
+
+    registro = df.iloc[0].to_dict()
+    n = 10_000
+    inicio = time.perf_counter()
+    for _ in range(200):
+        _features_pandas(pd.DataFrame([registro]))
+    t_pandas = (time.perf_counter() - inicio) / 200
+    inicio = time.perf_counter()
+    for _ in range(n):
+        features_registro(registro)
+    t_registro = (time.perf_counter() - inicio) / n
+    print(f"Registro único: pandas {t_pandas * 1e6:.0f} µs | caminho rápido {t_registro * 1e6:.1f} µs")
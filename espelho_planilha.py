@@ -0,0 +1,189 @@
+import os
+import sys
+import time
+import pandas as pd
+from gspread.exceptions import APIError
+
+from formato_colunar import aplicar_esquema, ler_pacientes, salvar_pacientes
+from sincronizacao_planilha import (hash_linha, normalizar_celula, carregar_instantaneo, salvar_instantaneo,
+                                    RENDERIZACAO)
+
+# Espelho local de uma aba do Google Sheets (ex.: 'Pacientes_reais' em '[6]'):
+# um Parquet com os tipos do esquema, indexado pela coluna 'id', e um
+# instantâneo com a revisão da planilha, o cabeçalho, os ids e um hash por linha.
+#   - Sem alterações: a data da última modificação da planilha (Drive,
+#     'modifiedTime') é a mesma do instantâneo -> nenhuma célula é lida.
+#   - Com alterações: a aba é lida numa única chamada e só as linhas novas ou
+#     modificadas (pelo hash, comparando por 'id', não pela posição) são
+#     tipadas e mescladas ao espelho; ids que sumiram da aba saem dele.
+# A API do Sheets não tem revisão por linha: quando a planilha muda, não há
+# como saber quais linhas mudaram sem lê-las. Sem acesso aos metadados do
+# Drive (escopo), a revisão fica vazia e toda execução lê a aba, mas o
+# espelho só é regravado quando o conteúdo muda.
+# Com o cabeçalho alterado, ids vazios ou repetidos, o espelho é refeito inteiro.
+
+COLUNA_ID = 'id'
+
+
+def revisao_planilha(cliente, documento):
+    """'modifiedTime' do Drive (muda a cada edição em qualquer aba) ou None se não for possível lê-lo."""
+    try:
+        return cliente.chamar('leitura', documento.get_lastUpdateTime)
+    except APIError:
+        return None   # ex.: credencial sem o escopo 'drive.metadata.readonly'
+
+
+def tipar_linhas(cabecalho, linhas):
+    """Linhas cruas da planilha -> DataFrame com os tipos do esquema (vazios viram ausentes)."""
+    largura = len(cabecalho)
+    df = pd.DataFrame([list(linha) + [''] * (largura - len(linha)) for linha in linhas], columns=cabecalho,
+                      dtype=object)
+    df = df.replace('', None)
+    if COLUNA_ID in df.columns:
+        df[COLUNA_ID] = [normalizar_celula(v) for v in df[COLUNA_ID]]
+    return aplicar_esquema(df)
+
+
+def _mesclar(caminho_espelho, cabecalho, linhas, ids, alteradas):
+    """Espelho atual sem os ids alterados/removidos + linhas alteradas tipadas, na ordem da aba."""
+    base = ler_pacientes(caminho_espelho)
+    ids_alterados = {ids[i] for i in alteradas}
+    base = base[base[COLUNA_ID].astype(str).isin(set(ids) - ids_alterados)]
+    novas = tipar_linhas(cabecalho, [linhas[i] for i in alteradas])
+    # Uma nova passada de tipos unifica colunas que vieram diferentes (ex.: categorias, inteiros com ausentes)
+    df = aplicar_esquema(pd.concat([base, novas], ignore_index=True))
+    posicao = pd.Series(range(len(ids)), index=ids)
+    return df.iloc[posicao[df[COLUNA_ID].astype(str)].argsort()].reset_index(drop=True)
+
+
+def atualizar_espelho(cliente, planilha_id, nome_aba, caminho_espelho, caminho_instantaneo, forcar=False):
+    """
+    Atualiza o espelho (Parquet em 'caminho_espelho') da aba 'nome_aba' pelo
+    ClientePlanilhas 'cliente' (ver o comentário do módulo). Retorna um resumo
+    com 'situacao' ('sem alterações', 'incremental' ou 'completo'), 'alterado'
+    (se o espelho foi regravado) e as contagens de linhas e chamadas.
+    """
+    chamadas_antes = cliente.chamadas
+    documento = cliente.documento(planilha_id)
+    revisao = revisao_planilha(cliente, documento)
+    instantaneo = carregar_instantaneo(caminho_instantaneo)
+    existe = os.path.exists(caminho_espelho)
+
+    def resumo(situacao, alterado, linhas, alteradas=0, removidas=0):
+        return {'situacao': situacao, 'alterado': alterado, 'linhas': linhas, 'linhas_alteradas': alteradas,
+                'linhas_removidas': removidas, 'revisao': revisao, 'chamadas': cliente.chamadas - chamadas_antes}
+
+    if (not forcar and existe and instantaneo is not None and revisao is not None
+            and instantaneo['revisao'] == revisao):
+        return resumo('sem alterações', False, len(instantaneo['ids']))
+
+    valores = cliente.aba(planilha_id, nome_aba).get_all_values(value_render_option=RENDERIZACAO)
+    cabecalho = [normalizar_celula(c) for c in valores[0]] if valores else []
+    linhas = valores[1:]
+    hashes = [hash_linha(list(linha) + [''] * (len(cabecalho) - len(linha))) for linha in linhas]
+    j_id = cabecalho.index(COLUNA_ID) if COLUNA_ID in cabecalho else None
+    ids = [normalizar_celula(linha[j_id]) if j_id < len(linha) else '' for linha in linhas] if j_id is not None else []
+    por_id = j_id is not None and '' not in ids and len(set(ids)) == len(ids)
+
+    if (not forcar and existe and por_id and instantaneo is not None
+            and instantaneo['cabecalho'] == cabecalho):
+        anteriores = dict(zip(instantaneo['ids'], instantaneo['hashes']))
+        alteradas = [i for i, (id_linha, h) in enumerate(zip(ids, hashes)) if anteriores.get(id_linha) != h]
+        removidas = len(set(anteriores) - set(ids))
+        if not alteradas and not removidas and instantaneo['ids'] == ids:
+            salvar_instantaneo(caminho_instantaneo, cabecalho, None, hashes=hashes, ids=ids, revisao=revisao)
+            return resumo('sem alterações', False, len(linhas))
+        df = _mesclar(caminho_espelho, cabecalho, linhas, ids, alteradas)
+        situacao = 'incremental'
+    else:
+        df = tipar_linhas(cabecalho, linhas)
+        alteradas, removidas, situacao = range(len(linhas)), 0, 'completo'
+
+    os.makedirs(os.path.dirname(caminho_espelho) or '.', exist_ok=True)
+    temporario = caminho_espelho + '.tmp.parquet'
+    salvar_pacientes(df, temporario)
+    os.replace(temporario, caminho_espelho)
+    # Instantâneo por último: se algo falhar antes, a próxima execução refaz a mescla
+    salvar_instantaneo(caminho_instantaneo, cabecalho, None, hashes=hashes,
+                       ids=ids if j_id is not None else [''] * len(linhas), revisao=revisao)
+    return resumo(situacao, True, len(linhas), len(alteradas), removidas)
+
+
+# --- Medição offline ---
+
+def medir_espelho(qtd=20_000, fracao_alterada=0.01, novas=100, removidas=20, seed=42):
+    """
+    Compara, contra o ClienteFalso (tempo da API simulado, sem dormir), o
+    '[6]' original (get_all_records + CSV a cada execução) com o espelho:
+    primeira execução, execução sem alterações, e depois de alterar
+    'fracao_alterada' das linhas, acrescentar 'novas' e remover 'removidas'.
+    """
+    import tempfile
+    import numpy as np
+    from gerador_vetorizado import gerar_lote
+    from formato_colunar import para_exportacao
+    from planilha_falsa import ClienteFalso
+    from cliente_planilhas import ClientePlanilhas
+    from gspread.utils import rowcol_to_a1
+
+    rng = np.random.default_rng(seed)
+    df = para_exportacao(gerar_lote(qtd + novas, rng))
+    valores = [df.columns.tolist()] + df.values.tolist()
+    chave, nome = 'planilha', 'Pacientes_reais'
+    falso = ClienteFalso({chave: {nome: valores[:qtd + 1]}}, dormir=False)
+    aba = falso.documentos[chave]._por_titulo(nome)
+    cliente = ClientePlanilhas(conectar=lambda: falso)
+    resultados = []
+
+    def medir(cenario, funcao):
+        falso.api.zerar_medidas()
+        inicio = time.perf_counter()
+        situacao = funcao()
+        medidas = falso.api.resumo()
+        resultados.append({'cenario': cenario, 'chamadas': medidas['chamadas'],
+                           'celulas lidas': medidas['celulas_lidas'], 'API (s simulados)': medidas['tempo_api_s'],
+                           'local (s)': time.perf_counter() - inicio, 'situacao': situacao})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        espelho = os.path.join(tmp, 'espelho.parquet')
+        instantaneo = os.path.join(tmp, 'espelho.joblib')
+
+        def original():
+            registros = cliente.aba(chave, nome).get_all_records()
+            salvar_pacientes(pd.DataFrame(registros), os.path.join(tmp, 'original.csv'))
+            return f'{len(registros):,} linhas regravadas'
+
+        def com_espelho():
+            r = atualizar_espelho(cliente, chave, nome, espelho, instantaneo)
+            return (f"{r['situacao']}: {r['linhas_alteradas']:,} linhas tipadas, {r['linhas_removidas']} removidas"
+                    + ('' if r['alterado'] else ', espelho não regravado'))
+
+        medir('original (get_all_records + CSV)', original)
+        medir('espelho, 1ª execução', com_espelho)
+        medir('espelho, sem alterações', com_espelho)
+
+        # Edições na planilha: células alteradas, linhas removidas no meio e novas no fim
+        alterar = rng.choice(np.arange(removidas, qtd), int(qtd * fracao_alterada), replace=False)
+        coluna = valores[0].index('hba1c_perc') + 1
+        aba.batch_update([{'range': rowcol_to_a1(i + 2, coluna), 'values': [[round(float(rng.uniform(5, 12)), 1)]]}
+                          for i in alterar])
+        aba._celulas[1:removidas + 1] = []   # como 'delete_rows'
+        aba._documento._modificado()
+        aba.append_rows(valores[qtd + 1:])
+        medir(f'espelho, {len(alterar)} alteradas + {novas} novas - {removidas} removidas', com_espelho)
+        medir('original (get_all_records + CSV)', original)
+
+        mesclado = ler_pacientes(espelho)
+        completo = tipar_linhas(*(lambda v: (v[0], v[1:]))(aba.get_all_values()))
+        iguais = mesclado.equals(completo)
+    cliente.fechar()
+
+    tabela = pd.DataFrame(resultados)
+    print(f"--- {qtd:,} pacientes x {len(valores[0])} colunas (API: 300 ms + 2 µs/célula) ---")
+    print(tabela.to_markdown(index=False, floatfmt=".2f"))
+    print(f"Espelho mesclado idêntico a uma tipagem completa da aba: {iguais}")
+    return tabela
+
+
+if __name__ == "__main__":
+    medir_espelho(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,113 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from pacote_modelo import carregar_pacote, ARQUIVO_PACOTE
+from pontuacao import matriz_features
+
+# Explicação por paciente do risco dado pela floresta: a probabilidade de alto
+# risco é decomposta pelos caminhos percorridos nas árvores (contribuições por
+# caminho): em cada nó, a variação da proporção de alto risco entre o nó e o
+# filho escolhido vai para a feature do nó. Com a média entre as árvores,
+#     probabilidade = base (proporção média na raiz) + soma das contribuições
+# exatamente, para cada paciente. O cálculo é a mesma descida vetorizada da
+# FlorestaCompilada (todas as linhas x árvores por nível) com um 'bincount'
+# por nível, então explicar um lote custa pouco mais do que pontuá-lo.
+
+COLUNA_FATORES = 'fatores_risco_rf'
+QTD_FATORES = 3
+
+
+def explicar(X, pacote, classe=1):
+    """
+    Contribuições de cada feature para a probabilidade de 'classe', com X já
+    pré-processado (saída de 'matriz_features'). Retorna (base, DataFrame n x features).
+    """
+    base, contribuicoes = pacote.floresta.contribuicoes(X, classe)
+    return base, pd.DataFrame(contribuicoes, columns=pacote.features)
+
+
+def principais_fatores(contribuicoes, quantidade=QTD_FATORES):
+    """
+    Texto curto por paciente com as 'quantidade' features de maior contribuição
+    em valor absoluto, em pontos percentuais de probabilidade
+    (ex.: 'ulcera_previa_s_n +18.2; hba1c_perc +6.0; idade -2.1').
+    """
+    features = np.asarray(contribuicoes.columns)
+    valores = contribuicoes.to_numpy()
+    quantidade = min(quantidade, valores.shape[1])
+    if not len(valores) or not quantidade:
+        return np.full(len(valores), '', dtype=object)
+    absolutos = np.abs(valores)
+    candidatos = np.argpartition(-absolutos, quantidade - 1, axis=1)[:, :quantidade]
+    ordem = np.take_along_axis(candidatos, np.argsort(-np.take_along_axis(absolutos, candidatos, axis=1), axis=1),
+                               axis=1)
+    nomes = features[ordem]
+    pontos = np.take_along_axis(valores, ordem, axis=1) * 100
+    return np.array(['; '.join(f"{n} {p:+.1f}" for n, p in zip(linha_nomes, linha_pontos) if abs(p) >= 0.05)
+                     for linha_nomes, linha_pontos in zip(nomes.tolist(), pontos.tolist())], dtype=object)
+
+
+# --- Medição ---
+
+def _explicar_por_linha(floresta, X, classe=1):
+    """Referência: um paciente e uma árvore por vez, em Python (como um explicador por linha)."""
+    coluna = int(np.flatnonzero(floresta.classes == classe)[0])
+    X = np.asarray(X, dtype=np.float32)
+    saida = np.zeros(X.shape)
+    for i, x in enumerate(X):
+        for raiz in floresta.raizes:
+            no = int(raiz)
+            for _ in range(floresta.profundidade):
+                filho = int(floresta.esquerda[no])
+                if filho == no:
+                    break
+                valor = x[floresta.feature[no]]
+                filho += bool(valor > floresta.limiar[no] or (valor != valor and floresta.nan_direita[no]))
+                saida[i, floresta.feature[no]] += floresta.valor[filho, coluna] - floresta.valor[no, coluna]
+                no = filho
+    return saida / floresta.n_arvores
+
+
+def medir_explicacoes(qtd=100_000, caminho_pacote=ARQUIVO_PACOTE, amostra_por_linha=200):
+    """Vazão da explicação em lote x pontuação x explicador por linha, e conferência da soma."""
+    from gerador_vetorizado import gerar_lote
+
+    pacote = carregar_pacote(caminho_pacote)
+    floresta = pacote.floresta
+    X = matriz_features(gerar_lote(qtd, np.random.default_rng(11), incluir_nomes=False), pacote)
+
+    inicio = time.perf_counter()
+    proba = floresta.predict_proba(X)[:, 1]
+    t_pontuar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    base, contribuicoes = explicar(X, pacote)
+    t_explicar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    fatores = principais_fatores(contribuicoes)
+    t_fatores = time.perf_counter() - inicio
+
+    amostra = X[:amostra_por_linha]
+    inicio = time.perf_counter()
+    referencia = _explicar_por_linha(floresta, amostra)
+    t_linha = (time.perf_counter() - inicio) / len(amostra)
+
+    erro_soma = np.abs(base + contribuicoes.to_numpy().sum(axis=1) - proba).max()
+    erro_ref = np.abs(contribuicoes.to_numpy()[:len(amostra)] - referencia).max()
+    print(f"--- {qtd:,} pacientes, {floresta.n_arvores} árvores, profundidade {floresta.profundidade} ---")
+    print(f"Pontuação (predict_proba):     {t_pontuar:7.2f} s  ({qtd / t_pontuar:,.0f} pacientes/s)")
+    print(f"Contribuições em lote:         {t_explicar:7.2f} s  ({qtd / t_explicar:,.0f} pacientes/s)")
+    print(f"Texto dos {QTD_FATORES} principais fatores:  {t_fatores:7.2f} s")
+    print(f"Explicador por linha (Python): {t_linha * 1e3:7.2f} ms/paciente "
+          f"(~{t_linha * qtd:,.0f} s para {qtd:,}; {t_linha * qtd / t_explicar:,.0f}x mais lento)")
+    print(f"Base: {base:.4f} | erro máximo de base + soma - probabilidade: {erro_soma:.1e} | "
+          f"diferença para o explicador por linha: {erro_ref:.1e}")
+    print(f"Exemplo: risco {proba[0]:.2f} <- {fatores[0]}")
+    return t_explicar
+
+
+if __name__ == "__main__":
+    medir_explicacoes(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,315 @@
+import time
+import numpy as np
+import pandas as pd
+
+# Motor de inferência "compilado" para o RandomForest de '[2]'.
+# As árvores do sklearn são achatadas em arrays contíguos (feature, limiar,
+# filho esquerdo, valor das folhas), com índices globais de nós. Os nós de
+# cada árvore são renumerados em largura, de modo que o filho direito é
+# sempre 'esquerda + 1': um passo da descida é só 'no = esquerda[no] + (x > limiar)'.
+# A avaliação percorre todas as árvores para um lote de linhas de uma vez,
+# em NumPy puro; as folhas apontam para si mesmas, então basta repetir o
+# passo 'profundidade' vezes.
+#
+# Os limiares são guardados em float32, arredondados para baixo: como o sklearn
+# compara X em float32 com limiares float64, 'x <= limiar64' equivale
+# exatamente a 'x <= limiar32' e as probabilidades não mudam.
+
+#
+# Modo compacto ('compactar'): os mesmos arrays em tipos estreitos (índices
+# int16/uint8, proporções em float32), para hosts com muitos processos de
+# pontuação em que a memória, e não a CPU, é o limite.
+
+ELEMENTOS_POR_BLOCO = 65_536    # pares (linha, árvore) avaliados por vez
+
+
+class FlorestaCompilada:
+    """
+    Floresta achatada em arrays. 'predict_proba' e 'predict' seguem a
+    interface do RandomForestClassifier (mesma ordem de 'classes').
+    """
+
+    def __init__(self, feature, limiar, esquerda, nan_direita, valor, raizes,
+                 profundidade, classes, features=None):
+        self.feature = feature              # int32 (n_nós,)   — 0 nas folhas
+        self.limiar = limiar                # float32 (n_nós,) — vai à direita se x > limiar (+inf nas folhas)
+        self.esquerda = esquerda            # int32 (n_nós,)   — filho direito = esquerda + 1; folhas apontam para si
+        self.nan_direita = nan_direita      # bool (n_nós,)    — valores ausentes vão à direita
+        self.valor = valor                  # float64 (n_nós, n_classes) — proporções nas folhas
+        self.raizes = raizes                # int32 (n_árvores,)
+        self.profundidade = int(profundidade)
+        self.classes = np.asarray(classes)
+        self.features = None if features is None else list(features)
+
+    @property
+    def n_arvores(self):
+        return len(self.raizes)
+
+    @property
+    def n_nos(self):
+        return len(self.feature)
+
+    @property
+    def compacta(self):
+        return self.valor.dtype == np.float32
+
+    def compactar(self):
+        """
+        Cópia em tipos estreitos: índices de nós no menor inteiro com sinal que
+        comporta a floresta (int16 até 32 767 nós), feature em uint8 (até 256
+        colunas) e proporções dos nós em float32. Os limiares já são float32,
+        então os caminhos percorridos não mudam; só as proporções são arredondadas.
+        """
+        return FlorestaCompilada(
+            feature=self.feature.astype(np.min_scalar_type(max(int(self.feature.max(initial=0)), 1))),
+            limiar=np.asarray(self.limiar, dtype=np.float32),
+            esquerda=self.esquerda.astype(np.min_scalar_type(-max(self.n_nos, 1))),
+            nan_direita=np.asarray(self.nan_direita, dtype=bool),
+            valor=self.valor.astype(np.float32),
+            raizes=np.asarray(self.raizes, dtype=np.int32),
+            profundidade=self.profundidade,
+            classes=self.classes,
+            features=self.features,
+        )
+
+    def bytes_por_arvore(self):
+        total = sum(a.nbytes for a in (self.feature, self.limiar, self.esquerda, self.nan_direita, self.valor))
+        return total / self.n_arvores
+
+    def _matriz(self, X):
+        """Converte X para float32 (como o sklearn) na ordem de features do treino."""
+        if isinstance(X, pd.DataFrame):
+            if self.features is not None and list(X.columns) != self.features:
+                faltando = [f for f in self.features if f not in X.columns]
+                if faltando:
+                    raise ValueError(f"Features ausentes em X: {faltando}")
+                X = X[self.features]
+            X = X.to_numpy(dtype=np.float32)
+        else:
+            X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.n_nos and X.shape[1] <= int(self.feature.max()):
+            raise ValueError(f"X tem {X.shape[1]} colunas; o modelo usa pelo menos {int(self.feature.max()) + 1}.")
+        return np.ascontiguousarray(X)
+
+    def folhas(self, X):
+        """Índice global da folha atingida por cada (linha, árvore); shape (n, n_árvores)."""
+        X = self._matriz(X)
+        saida = np.empty((len(X), self.n_arvores), dtype=np.int32)
+        for inicio, nos, _ in self._descer(X):
+            saida[inicio:inicio + len(nos)] = nos
+        return saida
+
+    def contribuicoes(self, X, classe=1):
+        """
+        Decomposição da probabilidade de 'classe' pelos caminhos das árvores:
+        retorna (base, contribuições (n, n_colunas)), com
+        predict_proba(X)[:, classe] == base + contribuições.sum(axis=1).
+        Em cada nó do caminho, a variação da proporção da classe entre o nó e o
+        filho escolhido é atribuída à feature do nó; a média é entre as árvores.
+        """
+        indice = np.flatnonzero(self.classes == classe)
+        if not len(indice):
+            raise ValueError(f"Classe {classe!r} não está em {list(self.classes)}.")
+        valor = np.ascontiguousarray(self.valor[:, indice[0]])
+        X = self._matriz(X)
+        saida = np.empty(X.shape)
+        for inicio, _, soma in self._descer(X, valor):
+            saida[inicio:inicio + len(soma)] = soma
+        return float(valor[self.raizes].mean()), saida / self.n_arvores
+
+    def _descer(self, X, valor=None):
+        """
+        Desce todas as linhas de X (já em float32) por todas as árvores, nível a
+        nível, bloco a bloco. Gera (início, folhas do bloco (n, n_árvores), soma):
+        'soma' (n, n_colunas) só é calculada se 'valor' (um número por nó) for
+        dado — soma, por linha e feature, das variações de 'valor' ao longo dos
+        caminhos (as folhas apontam para si: variação 0).
+        As folhas do bloco ficam num buffer reaproveitado: copie se for guardar.
+        """
+        n_linhas, n_colunas = X.shape
+        n_arv = self.n_arvores
+        linhas_bloco = max(1, ELEMENTOS_POR_BLOCO // n_arv)
+
+        # Buffers reaproveitados entre níveis e blocos (nos tipos dos arrays da floresta)
+        tamanho = min(n_linhas, linhas_bloco) * n_arv
+        nos = np.empty(tamanho, dtype=self.esquerda.dtype)
+        feature = np.empty(tamanho, dtype=self.feature.dtype)
+        posicao = np.empty(tamanho, dtype=np.int32)
+        x = np.empty(tamanho, dtype=np.float32)
+        limiar = np.empty(tamanho, dtype=np.float32)
+        direita = np.empty(tamanho, dtype=bool)
+        if valor is not None:
+            valor_no = np.empty(tamanho, dtype=valor.dtype)
+            valor_filho = np.empty(tamanho, dtype=valor.dtype)
+
+        for inicio in range(0, n_linhas, linhas_bloco):
+            bloco = X[inicio:inicio + linhas_bloco]
+            n = len(bloco)
+            k = n * n_arv
+            plano = bloco.ravel()
+            tem_nan = np.isnan(plano).any()
+            deslocamento = np.repeat(np.arange(n, dtype=np.int32) * n_colunas, n_arv)
+            nn, ff, pp, xx, ll, dd = nos[:k], feature[:k], posicao[:k], x[:k], limiar[:k], direita[:k]
+            nn.reshape(n, n_arv)[:] = self.raizes
+            soma = None
+            if valor is not None:
+                vn, vf = valor_no[:k], valor_filho[:k]
+                np.take(valor, nn, out=vn)
+                soma = np.zeros(n * n_colunas)
+            for _ in range(self.profundidade):
+                np.take(self.feature, nn, out=ff)
+                np.add(ff, deslocamento, out=pp)
+                np.take(plano, pp, out=xx)
+                np.take(self.limiar, nn, out=ll)
+                np.greater(xx, ll, out=dd)
+                if tem_nan:
+                    dd |= np.isnan(xx) & np.take(self.nan_direita, nn)
+                np.take(self.esquerda, nn, out=nn)
+                nn += dd
+                if valor is not None:
+                    # 'pp' já é o índice (linha, feature do nó) no bloco achatado
+                    np.take(valor, nn, out=vf)
+                    np.subtract(vf, vn, out=vn)
+                    soma += np.bincount(pp, weights=vn, minlength=n * n_colunas)
+                    vn, vf = vf, vn
+            yield inicio, nn.reshape(n, n_arv), None if soma is None else soma.reshape(n, n_colunas)
+
+    def predict_proba(self, X):
+        X = self._matriz(X)
+        saida = np.empty((len(X), len(self.classes)))
+        for inicio, nos, _ in self._descer(X):
+            saida[inicio:inicio + len(nos)] = self.valor[nos].mean(axis=1)
+        return saida
+
+    def predict(self, X):
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _ordem_largura(arvore):
+    """Nova numeração dos nós (em largura), com os dois filhos de cada nó em posições consecutivas."""
+    esquerda, direita = arvore.children_left, arvore.children_right
+    novo = np.empty(arvore.node_count, dtype=np.int64)
+    novo[0] = 0
+    proximo = 1
+    nivel = np.array([0])
+    while len(nivel):
+        internos = nivel[esquerda[nivel] != -1]
+        posicoes = proximo + 2 * np.arange(len(internos))
+        novo[esquerda[internos]] = posicoes
+        novo[direita[internos]] = posicoes + 1
+        proximo += 2 * len(internos)
+        nivel = np.concatenate([esquerda[internos], direita[internos]])
+    return novo
+
+
+def _limiar_float32(limiar):
+    """Maior float32 <= limiar (float64), para comparar em float32 sem mudar o resultado."""
+    l32 = limiar.astype(np.float32)
+    acima = l32.astype(np.float64) > limiar
+    l32[acima] = np.nextafter(l32[acima], np.float32(-np.inf))
+    return l32
+
+
+def compilar_floresta(modelo):
+    """Achata um RandomForestClassifier (uma saída) numa FlorestaCompilada."""
+    arvores = [est.tree_ for est in modelo.estimators_]
+    if not arvores:
+        raise ValueError("O modelo não tem árvores treinadas.")
+    if arvores[0].n_outputs != 1:
+        raise ValueError("Apenas modelos com uma saída são suportados.")
+
+    tamanhos = np.array([t.node_count for t in arvores], dtype=np.int64)
+    if tamanhos.sum() > np.iinfo(np.int32).max:
+        raise ValueError("Floresta grande demais para índices int32.")
+    raizes = np.concatenate([[0], np.cumsum(tamanhos)[:-1]])
+
+    partes = {'feature': [], 'limiar': [], 'esquerda': [], 'nan_direita': [], 'valor': []}
+    for t, base in zip(arvores, raizes):
+        novo = _ordem_largura(t)
+        ordem = np.argsort(novo)                    # ordem[i] = nó original na posição i
+        folha = t.children_left[ordem] == -1
+        partes['feature'].append(np.where(folha, 0, t.feature[ordem]))
+        partes['limiar'].append(np.where(folha, np.inf, t.threshold[ordem]))
+        filho = novo[np.maximum(t.children_left[ordem], 0)]
+        partes['esquerda'].append(base + np.where(folha, np.arange(t.node_count), filho))
+        nan_esquerda = getattr(t, 'missing_go_to_left', None)
+        if nan_esquerda is None:
+            partes['nan_direita'].append(~folha)    # sem informação: NaN segue a comparação (vai à direita)
+        else:
+            partes['nan_direita'].append(~nan_esquerda[ordem].astype(bool) & ~folha)
+        valor = t.value[ordem, 0, :].astype(np.float64)
+        soma = valor.sum(axis=1, keepdims=True)
+        partes['valor'].append(np.divide(valor, soma, out=np.zeros_like(valor), where=soma > 0))
+
+    return FlorestaCompilada(
+        feature=np.concatenate(partes['feature']).astype(np.int32),
+        limiar=_limiar_float32(np.concatenate(partes['limiar']).astype(np.float64)),
+        esquerda=np.concatenate(partes['esquerda']).astype(np.int32),
+        nan_direita=np.concatenate(partes['nan_direita']),
+        valor=np.concatenate(partes['valor']),
+        raizes=raizes.astype(np.int32),
+        profundidade=max(t.max_depth for t in arvores),
+        classes=modelo.classes_,
+        features=getattr(modelo, 'feature_names_in_', None),
+    )
+
+
+def comparar_com_sklearn(caminho_modelo='modelo_rf_v1.joblib', caminho_scaler='scaler_v1.joblib',
+                         caminho_features='features_v1.joblib', caminho_numericas='numeric_features_v1.joblib',
+                         qtd=1_000_000, repeticoes_linha=200):
+    """
+    Compara o motor compilado com 'predict_proba' do sklearn: diferença máxima
+    das probabilidades, latência de uma linha e vazão em 'qtd' linhas geradas
+    pelo gerador vetorizado (pré-processadas como em '[4.0]').
+    """
+    import pickle
+    import joblib
+    from gerador_vetorizado import gerar_lote
+    from engenharia_features import adicionar_features
+
+    modelo = joblib.load(caminho_modelo)
+    scaler = joblib.load(caminho_scaler)
+    features = joblib.load(caminho_features)
+    numericas = joblib.load(caminho_numericas)
+
+    inicio = time.perf_counter()
+    floresta = compilar_floresta(modelo)
+    t_compilar = time.perf_counter() - inicio
+
+    df = adicionar_features(gerar_lote(qtd, np.random.default_rng(7), incluir_nomes=False))
+    X = df[features].astype('float64')
+    X[numericas] = scaler.transform(X[numericas])
+
+    linha = X.iloc[:1]
+    modelo.predict_proba(linha)
+    floresta.predict_proba(linha)
+    inicio = time.perf_counter()
+    for _ in range(repeticoes_linha):
+        modelo.predict_proba(linha)
+    t_linha_sk = (time.perf_counter() - inicio) / repeticoes_linha
+    inicio = time.perf_counter()
+    for _ in range(repeticoes_linha):
+        floresta.predict_proba(linha)
+    t_linha_comp = (time.perf_counter() - inicio) / repeticoes_linha
+
+    inicio = time.perf_counter()
+    p_sk = modelo.predict_proba(X)
+    t_lote_sk = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    p_comp = floresta.predict_proba(X)
+    t_lote_comp = time.perf_counter() - inicio
+
+    print(f"Floresta: {floresta.n_arvores} árvores, {floresta.n_nos:,} nós, profundidade {floresta.profundidade} "
+          f"(compilada em {t_compilar * 1e3:.0f} ms)")
+    print(f"Memória por árvore: sklearn {len(pickle.dumps(modelo)) / floresta.n_arvores / 1024:.1f} KiB (pickle) | "
+          f"compilado {floresta.bytes_por_arvore() / 1024:.1f} KiB")
+    print(f"Diferença máxima de probabilidade: {np.abs(p_sk - p_comp).max():.2e}")
+    print(f"Linha única: sklearn {t_linha_sk * 1e3:8.2f} ms | compilado {t_linha_comp * 1e3:8.3f} ms")
+    print(f"{qtd:,} linhas: sklearn {t_lote_sk:8.2f} s ({qtd / t_lote_sk:,.0f} linhas/s) | "
+          f"compilado {t_lote_comp:8.2f} s ({qtd / t_lote_comp:,.0f} linhas/s)")
+
+
+if __name__ == "__main__":
+    comparar_com_sklearn()
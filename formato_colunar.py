@@ -0,0 +1,246 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset
+import pyarrow.parquet as pq
+
+# Formato colunar (Parquet) para as coortes de pacientes.
+# O esquema (ordem das colunas) vem de 'features.txt'; os tipos são compactos:
+# flags '_s_n' e alvo em int8, 'sexo' como category, sensores em float32.
+# CSV (';' e ',' decimal) continua disponível apenas para exportação.
+
+ARQUIVO_ESQUEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "features.txt")
+
+TIPOS_INTEIROS = {
+    'idade': 'int16',
+    'tempo_diabetes_anos': 'int16',
+    'contagem_passos': 'int32',
+    'risco_ulcera_calc': 'int8',
+}
+COLUNAS_TEXTO = ['id']
+COLUNAS_CATEGORICAS = {
+    'sexo': ['M', 'F'],
+    'nome': None,
+    'sobrenome': None,
+}
+
+
+def ler_esquema(caminho=ARQUIVO_ESQUEMA):
+    """Lê 'features.txt' e retorna a lista ordenada de colunas."""
+    colunas = []
+    with open(caminho, encoding='utf-8') as f:
+        for linha in f:
+            if ':' in linha:
+                colunas.append(linha.split(':', 1)[0].strip())
+    return colunas
+
+
+def tipo_da_coluna(coluna):
+    """Tipo compacto de uma coluna do esquema."""
+    if coluna in COLUNAS_TEXTO:
+        return 'string'
+    if coluna in COLUNAS_CATEGORICAS:
+        return 'category'
+    if coluna.endswith('_s_n'):
+        return 'int8'
+    return TIPOS_INTEIROS.get(coluna, 'float32')
+
+
+COLUNAS_ESQUEMA = ler_esquema()
+TIPOS_ESQUEMA = {coluna: tipo_da_coluna(coluna) for coluna in COLUNAS_ESQUEMA}
+
+
+def _converter_coluna(serie, tipo):
+    if tipo == 'string':
+        return serie.astype('string')
+    if tipo == 'category':
+        categorias = COLUNAS_CATEGORICAS.get(serie.name)
+        if categorias is not None:
+            if not (isinstance(serie.dtype, pd.CategoricalDtype) and list(serie.cat.categories) == categorias):
+                # Planilhas e CSVs trazem 'm', 'f' ou ' M': sem normalizar, viram ausentes
+                serie = serie.astype('string').str.strip().str.upper()
+            return pd.Categorical(serie, categories=categorias)
+        return serie.astype('category')
+
+    numerica = pd.to_numeric(serie, errors='coerce')
+    if numerica.isna().sum() > serie.isna().sum():
+        # Valores não numéricos (ex.: 'S'/'N' vindos de planilha): mantém o texto
+        return serie.astype('string')
+    if tipo.startswith('int') and numerica.isna().any():
+        # Inteiros com ausentes ficam em float32 para continuar aceitando NaN
+        return numerica.astype('float32')
+    return numerica.astype(tipo)
+
+
+def aplicar_esquema(df):
+    """
+    Converte 'df' para os tipos compactos do esquema e ordena as colunas
+    como em 'features.txt'. Colunas fora do esquema são mantidas ao final.
+    """
+    saida = {}
+    for coluna in COLUNAS_ESQUEMA:
+        if coluna in df.columns:
+            saida[coluna] = _converter_coluna(df[coluna], TIPOS_ESQUEMA[coluna])
+    for coluna in df.columns:
+        if coluna not in saida:
+            saida[coluna] = df[coluna]
+    return pd.DataFrame(saida, index=df.index)
+
+
+def para_exportacao(df):
+    """
+    Converte os tipos compactos de volta para tipos "largos" de exportação.
+
+    float32 vira float64 pelo texto mais curto (8.8, e não 8.800000190734863),
+    e category/string viram object — útil para enviar linhas ao Google Sheets.
+    """
+    saida = df.copy()
+    for coluna in saida.columns:
+        serie = saida[coluna]
+        if serie.dtype == 'float32':
+            saida[coluna] = serie.astype(str).astype('float64')
+        elif isinstance(serie.dtype, (pd.CategoricalDtype, pd.StringDtype)):
+            saida[coluna] = serie.astype(object)
+    return saida
+
+
+def _eh_parquet(caminho):
+    return os.path.isdir(caminho) or caminho.endswith('.parquet')
+
+
+def salvar_pacientes(df, caminho):
+    """
+    Salva uma coorte. '.csv' grava o CSV de exportação (';' e ',' decimal);
+    qualquer outro caminho grava Parquet com o esquema compacto.
+    """
+    if caminho.endswith('.csv'):
+        df.to_csv(caminho, index=False, sep=';', decimal=',')
+    else:
+        aplicar_esquema(df).to_parquet(caminho, index=False)
+
+
+def ler_pacientes(caminho, colunas=None):
+    """
+    Lê uma coorte de um arquivo/diretório Parquet ou de um CSV de exportação.
+
+    Um diretório é lido como dataset particionado (todas as partes em ordem).
+    CSVs são convertidos para o esquema compacto após a leitura.
+    """
+    if _eh_parquet(caminho):
+        return pd.read_parquet(caminho, columns=colunas)
+    df = pd.read_csv(caminho, sep=';', decimal=',', usecols=colunas)
+    return aplicar_esquema(df)
+
+
+def ler_pacientes_em_blocos(caminho, tamanho_bloco=250_000, colunas=None):
+    """
+    Lê uma coorte em blocos de até 'tamanho_bloco' linhas (DataFrames com o esquema compacto).
+
+    Parquet (arquivo ou diretório particionado) é lido por lotes de registros;
+    CSV é lido com 'chunksize'. A memória fica limitada ao tamanho do bloco.
+    """
+    if _eh_parquet(caminho):
+        dataset = pa.dataset.dataset(caminho, format='parquet')
+        for lote in dataset.to_batches(columns=colunas, batch_size=tamanho_bloco):
+            if lote.num_rows:
+                yield lote.to_pandas()
+    else:
+        for bloco in pd.read_csv(caminho, sep=';', decimal=',', usecols=colunas, chunksize=tamanho_bloco):
+            yield aplicar_esquema(bloco)
+
+
+def contar_pacientes(caminho):
+    """
+    Número de pacientes sem carregar a coorte: metadados do Parquet, ou
+    contagem de quebras de linha do CSV (em blocos de bytes), menos o cabeçalho.
+    """
+    if _eh_parquet(caminho):
+        return pa.dataset.dataset(caminho, format='parquet').count_rows()
+    linhas, ultimo = 0, b'\n'
+    with open(caminho, 'rb') as arquivo:
+        while bloco := arquivo.read(1 << 20):
+            linhas += bloco.count(b'\n')
+            ultimo = bloco[-1:]
+    if ultimo != b'\n':
+        linhas += 1     # última linha sem quebra
+    return max(linhas - 1, 0)
+
+
+class EscritorParquet:
+    """Grava lotes sucessivos como row groups de um único arquivo Parquet."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._escritor = None
+
+    def escrever(self, df):
+        tabela = pa.Table.from_pandas(aplicar_esquema(df), preserve_index=False)
+        if self._escritor is None:
+            self._escritor = pq.ParquetWriter(self.caminho, tabela.schema)
+        else:
+            tabela = tabela.cast(self._escritor.schema)
+        self._escritor.write_table(tabela)
+
+    def fechar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+            self._escritor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def converter_csv(caminho_csv, destino, tamanho_lote=500_000):
+    """Converte um CSV de exportação em Parquet, lendo em blocos para limitar a memória."""
+    with EscritorParquet(destino) as escritor:
+        for bloco in pd.read_csv(caminho_csv, sep=';', decimal=',', chunksize=tamanho_lote):
+            escritor.escrever(bloco)
+
+
+def comparar_formatos(qtd=1_000_000):
+    """
+    Compara tempo de carga e memória de uma coorte em CSV (int64/float64/object)
+    e em Parquet com o esquema compacto.
+    """
+    import tempfile
+    from gerador_vetorizado import gerar_lote
+
+    df = gerar_lote(qtd, np.random.default_rng(42))
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho_csv = os.path.join(tmp, "coorte.csv")
+        caminho_parquet = os.path.join(tmp, "coorte.parquet")
+        salvar_pacientes(df, caminho_csv)
+        salvar_pacientes(df, caminho_parquet)
+
+        inicio = time.perf_counter()
+        df_csv = pd.read_csv(caminho_csv, sep=';', decimal=',')
+        t_csv = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        df_parquet = ler_pacientes(caminho_parquet)
+        t_parquet = time.perf_counter() - inicio
+
+        tamanho_csv = os.path.getsize(caminho_csv)
+        tamanho_parquet = os.path.getsize(caminho_parquet)
+
+    mem_csv = df_csv.memory_usage(deep=True).sum()
+    mem_parquet = df_parquet.memory_usage(deep=True).sum()
+    print(f"--- {qtd:,} pacientes ---")
+    print(f"CSV:     carga {t_csv:7.2f} s | memória {mem_csv / 2**20:8.1f} MiB | disco {tamanho_csv / 2**20:8.1f} MiB")
+    print(f"Parquet: carga {t_parquet:7.2f} s | memória {mem_parquet / 2**20:8.1f} MiB | disco {tamanho_parquet / 2**20:8.1f} MiB")
+    print(f"Ganho:   carga {t_csv / t_parquet:5.1f}x | memória {mem_csv / mem_parquet:5.1f}x")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        # python formato_colunar.py entrada.csv saida.parquet
+        converter_csv(sys.argv[1], sys.argv[2])
+        print(f"'{sys.argv[1]}' convertido para '{sys.argv[2]}'.")
+    else:
+        comparar_formatos()
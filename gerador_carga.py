@@ -0,0 +1,108 @@
+import json
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+import numpy as np
+
+from gerador_vetorizado import gerar_lote
+from formato_colunar import para_exportacao
+
+# Gerador de carga local para 'servidor_pontuacao.py': N clientes concorrentes,
+# cada um com uma conexão persistente, enviando pedidos de um paciente (ou de
+# um pequeno lote). Mede a latência de cada pedido no cliente e a vazão total.
+
+
+def _registros(qtd, seed=7):
+    df = para_exportacao(gerar_lote(qtd, np.random.default_rng(seed)))
+    return df.drop(columns=['risco_ulcera_calc']).to_dict('records')
+
+
+def _cliente(host, porta, corpos, latencias, erros):
+    conexao = http.client.HTTPConnection(host, porta, timeout=30)
+    for corpo in corpos:
+        inicio = time.perf_counter()
+        try:
+            conexao.request('POST', '/pontuar', body=corpo, headers={'Content-Type': 'application/json'})
+            resposta = conexao.getresponse()
+            resposta.read()
+        except (OSError, http.client.HTTPException) as e:
+            erros.append(type(e).__name__)
+            conexao.close()  # reconecta no próximo pedido
+            continue
+        latencias.append(time.perf_counter() - inicio)
+        if resposta.status != 200:
+            erros.append(resposta.status)
+    conexao.close()
+
+
+def gerar_carga(url="http://127.0.0.1:8765", concorrencia=16, pedidos_por_cliente=200, pacientes_por_pedido=1):
+    """
+    Dispara 'concorrencia' clientes e retorna um dict com percentis de latência
+    (ms), vazão (pedidos/s e pacientes/s) e as métricas reportadas pelo servidor.
+    """
+    alvo = urlparse(url)
+    total = concorrencia * pedidos_por_cliente
+    registros = _registros(min(total * pacientes_por_pedido, 50_000))
+    corpos = []
+    for i in range(total):
+        inicio = (i * pacientes_por_pedido) % max(1, len(registros) - pacientes_por_pedido)
+        trecho = registros[inicio:inicio + pacientes_por_pedido]
+        corpos.append(json.dumps(trecho[0] if pacientes_por_pedido == 1 else trecho, ensure_ascii=False).encode('utf-8'))
+
+    latencias, erros = [], []
+    threads = [
+        threading.Thread(target=_cliente, args=(alvo.hostname, alvo.port, corpos[c::concorrencia], latencias, erros))
+        for c in range(concorrencia)
+    ]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    segundos = time.perf_counter() - inicio
+
+    conexao = http.client.HTTPConnection(alvo.hostname, alvo.port, timeout=30)
+    conexao.request('GET', '/metricas')
+    metricas_servidor = json.loads(conexao.getresponse().read())
+    conexao.close()
+
+    latencias = np.array(latencias) * 1e3
+    resultado = {
+        'concorrencia': concorrencia,
+        'pedidos': len(latencias) + len(erros),
+        'erros': len(erros),
+        'p50_ms': float(np.percentile(latencias, 50)),
+        'p90_ms': float(np.percentile(latencias, 90)),
+        'p99_ms': float(np.percentile(latencias, 99)),
+        'pedidos_por_s': len(latencias) / segundos,
+        'pacientes_por_s': len(latencias) * pacientes_por_pedido / segundos,
+        'servidor': metricas_servidor,
+    }
+    print(f"Concorrência {concorrencia:3d} | {resultado['pedidos']} pedidos ({resultado['erros']} erros) | "
+          f"p50 {resultado['p50_ms']:6.1f} ms | p90 {resultado['p90_ms']:6.1f} ms | p99 {resultado['p99_ms']:6.1f} ms | "
+          f"{resultado['pedidos_por_s']:7.0f} pedidos/s | "
+          f"{metricas_servidor['pacientes_por_lote']:.1f} pacientes/lote (acumulado no servidor)")
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga local contra o serviço de pontuação.")
+    parser.add_argument('--url', default="http://127.0.0.1:8765")
+    parser.add_argument('--concorrencia', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--pedidos', type=int, default=200, help="Pedidos por cliente")
+    parser.add_argument('--pacientes-por-pedido', type=int, default=1)
+    parser.add_argument('--iniciar-servidor', action='store_true',
+                        help="Sobe o serviço neste processo (pacote padrão) antes de gerar a carga")
+    args = parser.parse_args()
+
+    if args.iniciar_servidor:
+        from pacote_modelo import carregar_pacote
+        from servidor_pontuacao import criar_servidor
+
+        servidor = criar_servidor(carregar_pacote(), urlparse(args.url).port)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    for concorrencia in args.concorrencia:
+        gerar_carga(args.url, concorrencia, args.pedidos, args.pacientes_por_pedido)
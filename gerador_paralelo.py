@@ -0,0 +1,174 @@
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from gerador_vetorizado import largura_id_para
+import pyarrow.parquet as pq
+
+from gerador_streaming import EstatisticasVerificacao, EscritorLotes, gerar_em_lotes, caminho_parte
+from formato_colunar import EscritorParquet
+
+
+def planejar_shards(qtd, n_shards):
+    """
+    Divide 'qtd' pacientes em 'n_shards' trechos contíguos.
+
+    Retorna uma lista de (indice, inicio, quantidade); os primeiros shards
+    recebem um paciente a mais quando a divisão não é exata. Com menos
+    pacientes do que shards, os shards vazios (sempre os últimos) são
+    omitidos: um shard vazio não grava parte nenhuma.
+    """
+    base, resto = divmod(qtd, n_shards)
+    shards = []
+    inicio = 0
+    for indice in range(n_shards):
+        n = base + (1 if indice < resto else 0)
+        if n == 0:
+            break
+        shards.append((indice, inicio, n))
+        inicio += n
+    return shards
+
+
+def _gerar_shard(tarefa):
+    """Gera um shard com sua própria SeedSequence e grava em 'parte_xxxxx.<formato>'."""
+    indice, inicio, n, semente, largura, diretorio, tamanho_lote, incluir_nomes, formato = tarefa
+    rng = np.random.default_rng(semente)
+    caminho = caminho_parte(diretorio, indice, formato)
+
+    estatisticas = EstatisticasVerificacao()
+    lotes = gerar_em_lotes(n, tamanho_lote, rng, incluir_nomes, inicio_id=inicio, largura_id=largura)
+    with EscritorLotes(caminho, formato) as escritor:
+        for lote in lotes:
+            escritor.escrever(lote)
+            estatisticas.atualizar(lote)
+    return caminho, estatisticas
+
+
+def juntar_partes(partes, destino, formato='parquet'):
+    """
+    Junta as partes (na ordem dada) num único arquivo.
+
+    Em Parquet os row groups de cada parte são copiados para um só arquivo;
+    em CSV os arquivos são concatenados mantendo um só cabeçalho.
+    """
+    if formato == 'parquet':
+        with EscritorParquet(destino) as escritor:
+            for parte in partes:
+                arquivo = pq.ParquetFile(parte)
+                for i in range(arquivo.num_row_groups):
+                    escritor.escrever(arquivo.read_row_group(i).to_pandas())
+        return
+
+    with open(destino, 'wb') as saida:
+        for i, parte in enumerate(partes):
+            with open(parte, 'rb') as entrada:
+                if i > 0:
+                    entrada.readline()  # pula o cabeçalho
+                shutil.copyfileobj(entrada, saida)
+
+
+def gerar_paralelo(qtd, diretorio, n_shards=None, seed=42, processos=None,
+                   tamanho_lote=100_000, incluir_nomes=True, arquivo_unico=None, verbose=True,
+                   formato='parquet'):
+    """
+    Gera 'qtd' pacientes distribuídos em shards por um pool de processos.
+
+    Cada shard recebe um filho de 'np.random.SeedSequence(seed).spawn(n_shards)'
+    e um trecho contíguo de ids ('PAC_xxxx', com largura ajustada ao total).
+    Como cada shard só depende da sua semente e do seu trecho, o resultado
+    é idêntico para o mesmo 'seed', 'n_shards' e 'tamanho_lote', qualquer
+    que seja o número de processos ou a ordem em que eles terminam.
+
+    Cada shard grava 'parte_xxxxx.<formato>' em 'diretorio' (o diretório já é
+    um dataset Parquet particionado); com 'arquivo_unico' as partes são
+    juntadas em ordem num único arquivo.
+    Retorna o objeto EstatisticasVerificacao agregado.
+    """
+    if processos is None:
+        processos = os.cpu_count() or 1
+    if n_shards is None:
+        n_shards = processos
+    os.makedirs(diretorio, exist_ok=True)
+
+    largura = largura_id_para(qtd)
+    # Os filhos da SeedSequence não dependem de quantos são gerados: omitir os
+    # shards vazios (qtd < n_shards) não muda as sementes dos demais
+    sementes = np.random.SeedSequence(seed).spawn(n_shards)
+    tarefas = [
+        (indice, inicio, n, sementes[indice], largura, diretorio, tamanho_lote, incluir_nomes, formato)
+        for indice, inicio, n in planejar_shards(qtd, n_shards)
+    ]
+    n_shards = len(tarefas)
+
+    estatisticas = EstatisticasVerificacao()
+    partes = []
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        # 'map' devolve os resultados na ordem das tarefas
+        for caminho, estatisticas_shard in executor.map(_gerar_shard, tarefas):
+            partes.append(caminho)
+            estatisticas.mesclar(estatisticas_shard)
+
+    if arquivo_unico:
+        juntar_partes(partes, arquivo_unico, formato)
+
+    if verbose:
+        print(f"{qtd} pacientes gerados em {n_shards} shards ({processos} processos) em '{diretorio}'.")
+        estatisticas.imprimir()
+    return estatisticas
+
+
+def verificar_determinismo(casos=((3, 4), (10, 32), (50_000, 8)), seed=42, lista_processos=(1, 4)):
+    """
+    Confere que, para cada (qtd, n_shards) de 'casos' — inclusive com menos
+    pacientes do que shards —, a coorte juntada sai completa (ids únicos e em
+    ordem) e idêntica com qualquer número de processos.
+    """
+    import tempfile
+    import pandas as pd
+
+    for qtd, n_shards in casos:
+        coortes = []
+        for processos in lista_processos:
+            with tempfile.TemporaryDirectory() as tmp:
+                destino = os.path.join(tmp, 'coorte.parquet')
+                gerar_paralelo(qtd, os.path.join(tmp, 'partes'), n_shards=n_shards, seed=seed,
+                               processos=processos, arquivo_unico=destino, verbose=False)
+                coortes.append(pd.read_parquet(destino))
+        primeira = coortes[0]
+        assert len(primeira) == qtd and primeira['id'].is_unique and primeira['id'].is_monotonic_increasing, \
+            f"qtd={qtd}, n_shards={n_shards}: coorte incompleta ou fora de ordem"
+        for processos, coorte in zip(lista_processos[1:], coortes[1:]):
+            assert coorte.equals(primeira), f"qtd={qtd}, n_shards={n_shards}: {processos} processos deram outra coorte"
+        print(f"qtd={qtd:>7,} n_shards={n_shards:>3}: idêntica com {list(lista_processos)} processos")
+
+
+def medir_escalonamento(qtd=2_000_000, lista_processos=(1, 2, 4, 8, 16, 32), n_shards=32, seed=42):
+    """
+    Mede o tempo de parede para diferentes números de processos.
+
+    'n_shards' fica fixo para que todas as execuções produzam exatamente
+    os mesmos dados; só muda quantos processos os executam.
+    """
+    import tempfile
+
+    resultados = []
+    for processos in lista_processos:
+        with tempfile.TemporaryDirectory() as tmp:
+            inicio = time.perf_counter()
+            gerar_paralelo(qtd, tmp, n_shards=n_shards, seed=seed, processos=processos,
+                           incluir_nomes=False, verbose=False)
+            segundos = time.perf_counter() - inicio
+        resultados.append((processos, segundos))
+        speedup = resultados[0][1] / segundos
+        print(f"{processos:>3} processos: {segundos:8.2f} s  speedup {speedup:5.2f}x  eficiência {speedup / processos * 100:5.1f}%")
+    return resultados
+
+
+if __name__ == "__main__":
+    gerar_paralelo(1_000_000, "pacientes_paralelo", n_shards=32,
+                   arquivo_unico="pacientes_paralelo.parquet")
+    print("\n--- Escalonamento ---")
+    medir_escalonamento()
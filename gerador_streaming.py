@@ -0,0 +1,161 @@
+import os
+import contextlib
+import numpy as np
+
+from gerador_vetorizado import gerar_lote, largura_id_para, TEMP_LIMIAR_ASSIMETRIA_C
+from formato_colunar import EscritorParquet, salvar_pacientes
+
+
+class EstatisticasVerificacao:
+    """
+    Acumula as estatísticas de verificação do gerador v3 a partir de totais
+    parciais, lote a lote, sem precisar manter ou recarregar o arquivo inteiro.
+    """
+
+    def __init__(self, limiar_assimetria_c=TEMP_LIMIAR_ASSIMETRIA_C):
+        self.limiar_assimetria_c = limiar_assimetria_c
+        self.qtd = 0
+        self.total_risco = 0
+        self.soma_assimetria_risco = 0.0
+        self.contagem_assimetria_risco = 0
+        self.soma_pressao_risco = 0.0
+        self.soma_pressao_normal = 0.0
+
+    def atualizar(self, df):
+        risco = df['risco_ulcera_calc'].to_numpy() == 1
+        assimetria = df['temp_assimetria_c'].to_numpy()
+        pressao = df['pressao_pico_esq_kpa'].to_numpy()
+
+        self.qtd += len(df)
+        self.total_risco += int(risco.sum())
+        self.soma_assimetria_risco += float(assimetria[risco].sum())
+        self.contagem_assimetria_risco += int((assimetria[risco] > self.limiar_assimetria_c).sum())
+        self.soma_pressao_risco += float(pressao[risco].sum())
+        self.soma_pressao_normal += float(pressao[~risco].sum())
+
+    def mesclar(self, outra):
+        """Soma os totais de outra instância (ex.: estatísticas de outro shard)."""
+        self.qtd += outra.qtd
+        self.total_risco += outra.total_risco
+        self.soma_assimetria_risco += outra.soma_assimetria_risco
+        self.contagem_assimetria_risco += outra.contagem_assimetria_risco
+        self.soma_pressao_risco += outra.soma_pressao_risco
+        self.soma_pressao_normal += outra.soma_pressao_normal
+        return self
+
+    def imprimir(self):
+        """Imprime o mesmo relatório de '[1] - gerar_pacientes_realistas_v3.py'."""
+        qtd, total_risco = self.qtd, self.total_risco
+        print("\n--- Verificação da Simulação (v3) ---")
+        if qtd == 0:
+            return
+        print(f"Pacientes de Alto Risco ('risco_ulcera_calc' = 1): {total_risco} / {qtd} ({(total_risco/qtd)*100:.1f}%)")
+
+        if total_risco > 0:
+            media_assimetria_risco = self.soma_assimetria_risco / total_risco
+            contagem = self.contagem_assimetria_risco
+            print(f"  - Média da Assimetria de Temp. (Alto Risco): {media_assimetria_risco:.2f}°C")
+            print(f"  - Pacientes de Alto Risco com Assimetria Crítica (> {self.limiar_assimetria_c}°C): {contagem} ({(contagem/total_risco)*100:.1f}%)")
+
+        total_normal = qtd - total_risco
+        media_pressao_risco = self.soma_pressao_risco / total_risco if total_risco else float('nan')
+        media_pressao_normal = self.soma_pressao_normal / total_normal if total_normal else float('nan')
+        print(f"Média Pico Pressão (Alto Risco): {media_pressao_risco:.2f} kPa")
+        print(f"Média Pico Pressão (Baixo Risco): {media_pressao_normal:.2f} kPa")
+
+
+def gerar_em_lotes(qtd, tamanho_lote=100_000, rng=None, incluir_nomes=True,
+                   inicio_id=0, largura_id=None, nomes_por_sexo=False):
+    """
+    Gera 'qtd' pacientes como uma sequência de DataFrames de até 'tamanho_lote' linhas.
+
+    Os ids continuam entre lotes ('PAC_0001' ... ) e a largura é fixada pelo
+    total, para que todos os lotes tenham o mesmo formato. 'inicio_id' e
+    'largura_id' permitem gerar um trecho de uma coorte maior.
+    """
+    if rng is None:
+        rng = np.random.default_rng(42)
+    largura = largura_id if largura_id is not None else largura_id_para(qtd)
+
+    for inicio in range(0, qtd, tamanho_lote):
+        n = min(tamanho_lote, qtd - inicio)
+        yield gerar_lote(n, rng, inicio=inicio_id + inicio, largura_id=largura,
+                         incluir_nomes=incluir_nomes, nomes_por_sexo=nomes_por_sexo)
+
+
+def caminho_parte(diretorio, indice, formato='parquet'):
+    """Nome do arquivo da parte 'indice' no modo 'partes'."""
+    return os.path.join(diretorio, f"parte_{indice:05d}.{formato}")
+
+
+class EscritorLotes:
+    """Anexa lotes a um único arquivo: row groups em Parquet ou linhas em CSV."""
+
+    def __init__(self, caminho, formato='parquet'):
+        self.caminho = caminho
+        self.formato = formato
+        self._parquet = EscritorParquet(caminho) if formato == 'parquet' else None
+        self._primeiro = True
+
+    def escrever(self, df):
+        if self._parquet is not None:
+            self._parquet.escrever(df)
+        else:
+            # CSV de exportação com separador ; e decimal , (comum no Brasil)
+            df.to_csv(self.caminho, index=False, sep=';', decimal=',',
+                      mode='w' if self._primeiro else 'a', header=self._primeiro)
+        self._primeiro = False
+
+    def fechar(self):
+        if self._parquet is not None:
+            self._parquet.fechar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def gerar_para_disco(qtd, destino, tamanho_lote=100_000, modo='anexar', rng=None,
+                     incluir_nomes=True, verbose=True, formato='parquet'):
+    """
+    Gera 'qtd' pacientes em lotes e grava cada lote assim que é produzido.
+
+    modo='anexar': 'destino' é um único arquivo (em Parquet, um row group por lote;
+    em CSV, o cabeçalho só é escrito no primeiro lote).
+    modo='partes': 'destino' é um diretório com 'parte_00000.<formato>', 'parte_00001.<formato>', ...
+    formato: 'parquet' (esquema compacto de features.txt) ou 'csv' (exportação).
+
+    A memória fica limitada ao tamanho do lote. As estatísticas de verificação
+    são calculadas com totais parciais e impressas ao final.
+    Retorna o objeto EstatisticasVerificacao.
+    """
+    if modo not in ('anexar', 'partes'):
+        raise ValueError(f"Modo '{modo}' inválido. Use 'anexar' ou 'partes'.")
+    if formato not in ('parquet', 'csv'):
+        raise ValueError(f"Formato '{formato}' inválido. Use 'parquet' ou 'csv'.")
+    if modo == 'partes':
+        os.makedirs(destino, exist_ok=True)
+
+    estatisticas = EstatisticasVerificacao()
+    anexar = EscritorLotes(destino, formato) if modo == 'anexar' else contextlib.nullcontext()
+    with anexar as escritor:
+        for indice, lote in enumerate(gerar_em_lotes(qtd, tamanho_lote, rng, incluir_nomes)):
+            if modo == 'anexar':
+                escritor.escrever(lote)
+            else:
+                salvar_pacientes(lote, caminho_parte(destino, indice, formato))
+            estatisticas.atualizar(lote)
+            if verbose:
+                print(f"Lote {indice + 1}: {estatisticas.qtd} / {qtd} pacientes gravados.")
+
+    if verbose:
+        print(f"'{destino}' gerado com {qtd} pacientes.")
+        estatisticas.imprimir()
+    return estatisticas
+
+
+if __name__ == "__main__":
+    # Coorte grande com memória constante: 1 milhão de pacientes em partes de 100 mil
+    gerar_para_disco(1_000_000, "pacientes_streaming", tamanho_lote=100_000, modo='partes')
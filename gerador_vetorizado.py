@@ -0,0 +1,321 @@
+import time
+import importlib.util
+import numpy as np
+import pandas as pd
+import warnings
+
+from identidades import sortear_identidades
+
+# Ignorar FutureWarnings do pandas que podem aparecer com certas versões do numpy/pandas
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+# Mesmos parâmetros de '[1] - gerar_pacientes_realistas_v3.py', expostos em nível de módulo
+# para que o motor vetorizado (e os modos de lote/paralelo) compartilhem uma única fonte.
+
+# --- PARÂMETROS DEMOGRÁFICOS E CLÍNICOS BASE ---
+IDADE_MEDIA = 58
+IDADE_STD = 15
+TEMPO_DIABETES_MEDIA = 15
+IMC_MEDIA = 30.0
+IMC_STD = 5.0
+HBA1C_MEDIA = 8.8
+HBA1C_STD = 1.8
+
+# --- PARÂMETROS CLÍNICOS E DE RISCO (Probabilidades) ---
+P_NEUROPATIA = 0.50
+P_DEFORMIDADE = 0.30
+P_ULCERA_PREVIA = 0.25
+P_AMPUTACAO_PREVIA = 0.08
+P_DAP = 0.35
+P_RETINOPATIA = 0.30
+P_NEFROPATIA = 0.25
+P_HAS = 0.60
+P_TABAGISMO = 0.25
+P_ALCOOL = 0.15
+P_ATIVIDADE_FISICA = 0.40
+
+# --- PARÂMETROS FISIOLÓGICOS (SENSORES IN-SHOE) ---
+PRESSAO_BASE_MIN_KPA = 80
+PRESSAO_BASE_MAX_KPA = 400
+PRESSAO_INCREMENTO_RISCO_KPA = 300
+PRESSAO_STD_DEV_KPA = 100
+
+TEMP_MEDIA_NORMAL_C = 29.0
+TEMP_MEDIA_NEURO_C = 32.0
+TEMP_STD_DEV_C = 1.5
+TEMP_LIMIAR_ASSIMETRIA_C = 2.2
+PROB_ASSIMETRIA_COM_RISCO = 0.40
+
+HUMIDITY_RANGE_PERC = (30, 95)
+
+VELOCIDADE_MEDIA_M_S_BASE = 1.2
+VELOCIDADE_STD_M_S = 0.2
+STANCE_TIME_MEDIA_S = 0.8
+STANCE_TIME_STD_S = 0.1
+
+# Ordem das colunas (idêntica à do gerador original)
+COLUNAS_PERFIL = [
+    'id', 'nome', 'sobrenome', 'idade', 'sexo', 'tempo_diabetes_anos', 'hba1c_perc', 'imc',
+    'neuropatia_s_n', 'deformidade_s_n', 'ulcera_previa_s_n', 'amputacao_previa_s_n',
+    'dap_s_n', 'retinopatia_s_n', 'nefropatia_s_n', 'has_s_n',
+    'tabagismo_s_n', 'alcool_s_n', 'atividade_fisica_s_n', 'risco_ulcera_calc',
+    'velocidade_marcha_m_s',
+    # Colunas UMI
+    'contagem_passos', 'aceleracao_vertical_rms', 'orientacao_pe_graus'
+]
+COLUNAS_SENSORES = [
+    'pressao_pico_esq_kpa', 'pressao_pico_dir_kpa', 'pressao_integral_esq_kpa_s', 'pressao_integral_dir_kpa_s',
+    'temperatura_esq_c', 'temperatura_dir_c', 'temp_assimetria_c',
+    'umidade_esq_perc', 'umidade_dir_perc'
+]
+COLUNAS = COLUNAS_PERFIL + COLUNAS_SENSORES
+
+
+def _bernoulli(rng, p, qtd):
+    """Sorteia um vetor 0/1 (int64) com probabilidade 'p' de 1."""
+    return (rng.random(qtd) < p).astype(np.int64)
+
+
+def gerar_colunas(qtd, rng):
+    """
+    Sorteia todas as colunas numéricas de 'qtd' pacientes de uma só vez.
+
+    Reproduz a lógica do laço de 'gerar_pacientes_realistas' (v3), mas cada
+    variável é um vetor NumPy sorteado a partir de um 'np.random.Generator'.
+    As distribuições, arredondamentos e limites (clip) são os mesmos; a
+    sequência de números sorteados, naturalmente, não é.
+
+    Retorna um dict {coluna: np.ndarray} sem as colunas 'id', 'nome' e 'sobrenome'.
+    """
+    # --- PERFIL CLÍNICO DO PACIENTE ---
+    # astype(int64) trunca em direção a zero, como int() no gerador original
+    idade = np.clip(rng.normal(IDADE_MEDIA, IDADE_STD, qtd), 25, 95).astype(np.int64)
+    tempo_diabetes = np.clip(rng.exponential(TEMPO_DIABETES_MEDIA, qtd), 1, 60).astype(np.int64)
+    imc = np.round(np.clip(rng.normal(IMC_MEDIA, IMC_STD, qtd), 18.5, 50), 1)
+    hba1c = np.round(np.clip(rng.normal(HBA1C_MEDIA, HBA1C_STD, qtd), 5.0, 15.0), 1)
+
+    # Fatores de Risco
+    neuropatia = _bernoulli(rng, P_NEUROPATIA, qtd)
+    deformidade = _bernoulli(rng, P_DEFORMIDADE, qtd)
+    dap = _bernoulli(rng, P_DAP, qtd)
+    retinopatia = _bernoulli(rng, P_RETINOPATIA, qtd)
+    nefropatia = _bernoulli(rng, P_NEFROPATIA, qtd)
+
+    amputacao_previa = _bernoulli(rng, P_AMPUTACAO_PREVIA, qtd)
+    # Amputação prévia implica úlcera prévia
+    ulcera_previa = np.maximum(_bernoulli(rng, P_ULCERA_PREVIA, qtd), amputacao_previa)
+
+    has = _bernoulli(rng, P_HAS, qtd)
+    tabagismo = _bernoulli(rng, P_TABAGISMO, qtd)
+    alcool = _bernoulli(rng, P_ALCOOL, qtd)
+    atividade_fisica = _bernoulli(rng, P_ATIVIDADE_FISICA, qtd)
+
+    # --- LÓGICA DE RISCO DE ÚLCERA (CALCULADO) ---
+    # Baseado em Tavares et al. (2016)
+    pontos_risco = (
+        5 * ulcera_previa
+        + 3 * neuropatia
+        + 2 * deformidade
+        + 2 * amputacao_previa
+        + dap
+        + retinopatia
+        + nefropatia
+        + (hba1c > 9.0)
+        + (tempo_diabetes > 20)
+    )
+    risco_ulcera_calc = (pontos_risco >= 5).astype(np.int64)
+    alto_risco = risco_ulcera_calc == 1
+
+    # --- GERAÇÃO DE DADOS DA UMI ---
+    # Sorteia as duas populações e escolhe por paciente com np.where
+    contagem_passos = np.where(
+        alto_risco,
+        rng.normal(3000, 1000, qtd),
+        rng.normal(7000, 2000, qtd),
+    ).astype(np.int64)
+    aceleracao_vertical_rms = np.round(np.where(
+        alto_risco,
+        rng.normal(1.1, 0.2, qtd),
+        rng.normal(1.5, 0.3, qtd),
+    ), 2)
+    orientacao_pe_graus = np.round(np.where(
+        alto_risco,
+        rng.normal(8.0, 1.5, qtd),
+        rng.normal(5.0, 1.0, qtd),
+    ), 1)
+
+    contagem_passos = np.clip(contagem_passos, 500, 20000)
+    aceleracao_vertical_rms = np.clip(aceleracao_vertical_rms, 0.5, 3.0)
+    orientacao_pe_graus = np.clip(orientacao_pe_graus, 2.0, 15.0)
+
+    # --- GERAÇÃO DE DADOS DOS SENSORES ---
+
+    # 1. Velocidade da Marcha (m/s)
+    velocidade_media_m_s = VELOCIDADE_MEDIA_M_S_BASE - 0.2 * risco_ulcera_calc
+    velocidade_marcha_m_s = np.round(np.clip(rng.normal(velocidade_media_m_s, VELOCIDADE_STD_M_S), 0.5, 2.0), 2)
+
+    # 2. Pressão (Pico - kPa)
+    pressao_media = rng.uniform(PRESSAO_BASE_MIN_KPA, PRESSAO_BASE_MAX_KPA, qtd)
+    pressao_media += alto_risco * rng.uniform(50, PRESSAO_INCREMENTO_RISCO_KPA, qtd)
+    pressao_media *= 1 + (velocidade_marcha_m_s - VELOCIDADE_MEDIA_M_S_BASE) * 0.5
+
+    p_esq = np.round(np.clip(rng.normal(pressao_media, PRESSAO_STD_DEV_KPA), 40, 1500), 2)
+    p_dir = np.round(np.clip(rng.normal(pressao_media, PRESSAO_STD_DEV_KPA * 1.1), 40, 1500), 2)
+
+    # 3. Pressão (Integral - PTI)
+    # Tempo de apoio (stance time) é inversamente proporcional à velocidade
+    stance_time_media = STANCE_TIME_MEDIA_S / (velocidade_marcha_m_s / VELOCIDADE_MEDIA_M_S_BASE)
+    stance_time_esq = np.clip(rng.normal(stance_time_media, STANCE_TIME_STD_S), 0.5, 1.1)
+    stance_time_dir = np.clip(rng.normal(stance_time_media, STANCE_TIME_STD_S), 0.5, 1.1)
+    pti_esq = np.round(p_esq * stance_time_esq, 2)
+    pti_dir = np.round(p_dir * stance_time_dir, 2)
+
+    # 4. Temperatura (°C)
+    temp_media = np.where(neuropatia == 1, TEMP_MEDIA_NEURO_C, TEMP_MEDIA_NORMAL_C)
+    t_esq = np.round(np.clip(rng.normal(temp_media, TEMP_STD_DEV_C), 20.0, 37.0), 1)
+    t_dir = np.round(np.clip(rng.normal(temp_media, TEMP_STD_DEV_C), 20.0, 37.0), 1)
+
+    # Simula "Hot Spot" (Assimetria > 2.2°C) em parte dos pacientes de alto risco
+    hot_spot = alto_risco & (rng.random(qtd) < PROB_ASSIMETRIA_COM_RISCO)
+    diff = rng.uniform(TEMP_LIMIAR_ASSIMETRIA_C, TEMP_LIMIAR_ASSIMETRIA_C + 2.5, qtd)
+    aquece_dir = rng.random(qtd) < 0.5
+    t_dir_quente = np.round(np.clip(t_esq + diff, 20.0, 38.5), 1)
+    t_esq_quente = np.round(np.clip(t_dir + diff, 20.0, 38.5), 1)
+    t_dir = np.where(hot_spot & aquece_dir, t_dir_quente, t_dir)
+    t_esq = np.where(hot_spot & ~aquece_dir, t_esq_quente, t_esq)
+
+    temp_assimetria = np.round(np.abs(t_esq - t_dir), 1)
+
+    # 5. Umidade (%)
+    u_esq = np.round(rng.uniform(*HUMIDITY_RANGE_PERC, qtd), 1)
+    u_dir = np.round(rng.uniform(*HUMIDITY_RANGE_PERC, qtd), 1)
+
+    sexo = np.where(rng.random(qtd) < 0.5, 'M', 'F').astype(object)
+
+    return {
+        'idade': idade,
+        'sexo': sexo,
+        'tempo_diabetes_anos': tempo_diabetes,
+        'hba1c_perc': hba1c,
+        'imc': imc,
+        'neuropatia_s_n': neuropatia,
+        'deformidade_s_n': deformidade,
+        'ulcera_previa_s_n': ulcera_previa,
+        'amputacao_previa_s_n': amputacao_previa,
+        'dap_s_n': dap,
+        'retinopatia_s_n': retinopatia,
+        'nefropatia_s_n': nefropatia,
+        'has_s_n': has,
+        'tabagismo_s_n': tabagismo,
+        'alcool_s_n': alcool,
+        'atividade_fisica_s_n': atividade_fisica,
+        'risco_ulcera_calc': risco_ulcera_calc,
+        'velocidade_marcha_m_s': velocidade_marcha_m_s,
+        'contagem_passos': contagem_passos,
+        'aceleracao_vertical_rms': aceleracao_vertical_rms,
+        'orientacao_pe_graus': orientacao_pe_graus,
+        'pressao_pico_esq_kpa': p_esq,
+        'pressao_pico_dir_kpa': p_dir,
+        'pressao_integral_esq_kpa_s': pti_esq,
+        'pressao_integral_dir_kpa_s': pti_dir,
+        'temperatura_esq_c': t_esq,
+        'temperatura_dir_c': t_dir,
+        'temp_assimetria_c': temp_assimetria,
+        'umidade_esq_perc': u_esq,
+        'umidade_dir_perc': u_dir,
+    }
+
+
+def largura_id_para(qtd):
+    """Número de dígitos de 'PAC_xxxx' para 'qtd' pacientes (mínimo 4, como no v3)."""
+    return max(4, len(str(qtd)))
+
+
+def gerar_ids(inicio, qtd, largura=4):
+    """Gera os ids 'PAC_xxxx' de 'inicio + 1' até 'inicio + qtd'."""
+    numeros = np.arange(inicio + 1, inicio + qtd + 1)
+    return np.char.add('PAC_', np.char.zfill(numeros.astype(str), largura)).astype(object)
+
+
+def gerar_lote(qtd, rng=None, inicio=0, largura_id=4, incluir_nomes=True, nomes_por_sexo=False):
+    """
+    Gera um DataFrame com 'qtd' pacientes no mesmo esquema do gerador v3.
+
+    'rng' é um 'np.random.Generator' (padrão: np.random.default_rng(42)).
+    'inicio' desloca a numeração dos ids (útil para gerar em lotes).
+    Os nomes vêm dos pools de 'identidades' (sem chamadas ao Faker por linha);
+    com 'nomes_por_sexo=True' o primeiro nome acompanha a coluna 'sexo'.
+    Com 'incluir_nomes=False' as colunas 'nome'/'sobrenome' ficam vazias,
+    o que isola o custo do motor numérico.
+    """
+    if rng is None:
+        rng = np.random.default_rng(42)
+
+    colunas = gerar_colunas(qtd, rng)
+    colunas['id'] = gerar_ids(inicio, qtd, largura_id)
+
+    if incluir_nomes:
+        sexo = colunas['sexo'] if nomes_por_sexo else None
+        colunas['nome'], colunas['sobrenome'] = sortear_identidades(qtd, rng, sexo=sexo)
+    else:
+        colunas['nome'] = np.full(qtd, '', dtype=object)
+        colunas['sobrenome'] = np.full(qtd, '', dtype=object)
+
+    return pd.DataFrame(colunas, columns=COLUNAS)
+
+
+def _carregar_gerador_original():
+    """Importa '[1] - gerar_pacientes_realistas_v3.py' (nome de arquivo não importável)."""
+    spec = importlib.util.spec_from_file_location(
+        "gerar_pacientes_realistas_v3", "[1] - gerar_pacientes_realistas_v3.py")
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def comparar_throughput(tamanhos=(1_000, 10_000), tamanho_vetorizado_extra=(1_000_000,)):
+    """
+    Compara pacientes/s do laço original com o motor vetorizado.
+
+    A comparação principal roda o script '[1]' inteiro com cada motor: o mesmo
+    trabalho dos dois lados (com nomes e gravação do mesmo CSV; só o laço
+    imprime as estatísticas de verificação, que custam poucos ms).
+    À parte, linhas 'só geração' medem o motor vetorizado sem nomes e sem
+    escrita, para isolar a geração numérica (não comparáveis com o laço).
+    """
+    import os
+    import tempfile
+    import contextlib
+    import io
+
+    original = _carregar_gerador_original()
+    resultados = []
+
+    def anotar(qtd, motor, trabalho, segundos):
+        resultados.append({'qtd': qtd, 'motor': motor, 'trabalho': trabalho, 'segundos': segundos,
+                           'pacientes_s': qtd / segundos})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for qtd in tamanhos:
+            tempos = {}
+            for motor in ('laco', 'vetorizado'):
+                inicio = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    original.gerar_pacientes_realistas(qtd=qtd, file_path=os.path.join(tmp, f"{motor}.csv"),
+                                                       motor=motor)
+                tempos[motor] = time.perf_counter() - inicio
+                anotar(qtd, motor, 'script [1] (nomes + CSV)', tempos[motor])
+            resultados[-1]['speedup'] = tempos['laco'] / tempos['vetorizado']
+
+    for qtd in tuple(tamanhos) + tuple(tamanho_vetorizado_extra):
+        inicio = time.perf_counter()
+        gerar_lote(qtd, np.random.default_rng(42), incluir_nomes=False)
+        anotar(qtd, 'vetorizado', 'só geração (sem nomes, sem escrita)', time.perf_counter() - inicio)
+
+    return pd.DataFrame(resultados)
+
+
+if __name__ == "__main__":
+    print("--- Throughput: laço original vs. motor vetorizado ---")
+    df_bench = comparar_throughput()
+    print(df_bench.to_string(index=False, na_rep="", float_format=lambda v: f"{v:,.3f}"))
@@ -0,0 +1,120 @@
+import os
+import time
+import importlib
+import numpy as np
+
+# Cache em disco dos pools de nomes (um .npz por locale)
+DIRETORIO_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+_pools_em_memoria = {}
+
+
+def caminho_cache(locale='pt_BR', diretorio=DIRETORIO_CACHE):
+    return os.path.join(diretorio, f"identidades_{locale}.npz")
+
+
+def construir_pools(locale='pt_BR'):
+    """
+    Extrai as listas de nomes do provider de pessoas do Faker para o locale.
+
+    Lê os atributos da classe do provider diretamente (sem instanciar Faker),
+    nas mesmas listas usadas por 'first_name_male', 'first_name_female',
+    'first_name' e 'last_name'.
+    """
+    provider = importlib.import_module(f"faker.providers.person.{locale}").Provider
+    return {
+        'nomes_masculinos': np.array(provider.first_names_male),
+        'nomes_femininos': np.array(provider.first_names_female),
+        'nomes': np.array(provider.first_names),
+        'sobrenomes': np.array(provider.last_names),
+    }
+
+
+def carregar_pools(locale='pt_BR', diretorio=DIRETORIO_CACHE):
+    """
+    Devolve os pools de nomes do locale, construindo e salvando o cache na primeira vez.
+
+    Os pools ficam em memória (por processo) e em disco como arrays de texto
+    num .npz, que carrega sem pickle e sem importar o Faker.
+    Os arrays devolvidos são de dtype object, para que a indexação já produza
+    as colunas no formato do DataFrame.
+    """
+    if locale in _pools_em_memoria:
+        return _pools_em_memoria[locale]
+
+    caminho = caminho_cache(locale, diretorio)
+    if os.path.exists(caminho):
+        with np.load(caminho) as arquivo:
+            pools = {chave: arquivo[chave] for chave in arquivo.files}
+    else:
+        pools = construir_pools(locale)
+        os.makedirs(diretorio, exist_ok=True)
+        np.savez(caminho, **pools)
+
+    pools = {chave: valores.astype(object) for chave, valores in pools.items()}
+    _pools_em_memoria[locale] = pools
+    return pools
+
+
+def sortear_identidades(qtd, rng, sexo=None, pools=None):
+    """
+    Sorteia 'nome' e 'sobrenome' para um lote inteiro via vetores de índices.
+
+    Sem 'sexo', o primeiro nome vem do pool completo (como 'faker.first_name()').
+    Com 'sexo' (array de 'M'/'F'), o primeiro nome vem do pool correspondente
+    ao sexo de cada paciente. Retorna (nomes, sobrenomes) como arrays object.
+    """
+    if pools is None:
+        pools = carregar_pools()
+
+    sobrenomes = pools['sobrenomes'][rng.integers(0, len(pools['sobrenomes']), qtd)]
+
+    if sexo is None:
+        nomes = pools['nomes'][rng.integers(0, len(pools['nomes']), qtd)]
+    else:
+        masculino = np.asarray(sexo) == 'M'
+        idx_m = rng.integers(0, len(pools['nomes_masculinos']), qtd)
+        idx_f = rng.integers(0, len(pools['nomes_femininos']), qtd)
+        nomes = np.where(masculino, pools['nomes_masculinos'][idx_m], pools['nomes_femininos'][idx_f])
+
+    return nomes, sobrenomes
+
+
+def comparar_com_faker(tamanhos=(10_000, 100_000)):
+    """
+    Compara o tempo de gerar nomes linha a linha com Faker e pelos pools.
+
+    Mede também o custo de inicialização: instanciar 'Faker('pt_BR')' vs.
+    carregar os pools a partir do cache em disco.
+    """
+    from faker import Faker
+
+    inicio = time.perf_counter()
+    faker = Faker('pt_BR')
+    t_init_faker = time.perf_counter() - inicio
+
+    carregar_pools()  # garante que o cache em disco existe
+    _pools_em_memoria.clear()
+    inicio = time.perf_counter()
+    pools = carregar_pools()
+    t_init_pool = time.perf_counter() - inicio
+
+    print(f"Inicialização: Faker('pt_BR') {t_init_faker * 1000:.1f} ms | pools do cache {t_init_pool * 1000:.1f} ms")
+
+    rng = np.random.default_rng(42)
+    for qtd in tamanhos:
+        inicio = time.perf_counter()
+        [faker.first_name() for _ in range(qtd)]
+        [faker.last_name() for _ in range(qtd)]
+        t_faker = time.perf_counter() - inicio
+
+        sexo = np.where(rng.random(qtd) < 0.5, 'M', 'F')
+        inicio = time.perf_counter()
+        sortear_identidades(qtd, rng, sexo=sexo, pools=pools)
+        t_pool = time.perf_counter() - inicio
+
+        print(f"{qtd:>10,} nomes: Faker {t_faker:8.3f} s | pools {t_pool:8.4f} s | {t_faker / t_pool:8.1f}x")
+
+
+if __name__ == "__main__":
+    comparar_com_faker()
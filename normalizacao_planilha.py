@@ -0,0 +1,230 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from engenharia_features import MAPA_SEXO
+
+# Normalização vetorizada dos valores vindos de planilhas (Google Sheets,
+# CSV de exportação): cada coluna chega como uma mistura de números, textos
+# ('S', 'sim', '8,8'), vazios e None, e é convertida para um array float64
+# numa passada por coluna, sem 'apply' célula a célula:
+#   - numéricas: conversão direta para float64 quando só há números; havendo
+#     textos, só eles passam pelo pyarrow.compute (espaços, vírgula decimal,
+#     validação por regex e conversão em C). Todo texto passa pela regex:
+#     'nan', 'inf' ou '1_000' são inválidos, assim como '1.234,5' e '1,234.5'
+#     (ponto e vírgula juntos: não dá para saber qual é o separador decimal);
+#   - '_s_n' e 'sexo': pd.factorize agrupa os valores distintos (poucos) e só
+#     eles são traduzidos em Python; o resultado é indexado pelos códigos.
+# Células inválidas não interrompem nada: são devolvidas todas juntas num
+# relatório (coluna, linha da planilha, valor).
+
+VALORES_SIM = {'s', 'sim', '1', '1.0', 'true', 'y', 'yes'}
+VALORES_NAO = {'n', 'nao', 'não', '0', '0.0', 'false', 'no', ''}
+COLUNAS_TEXTO = ['id', 'nome', 'sobrenome']
+_TIPO = np.frompyfunc(type, 1, 1)
+REGEX_NUMERO = r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$'
+
+
+def tipo_da_coluna(coluna):
+    if coluna in COLUNAS_TEXTO:
+        return 'texto'
+    if coluna == 'sexo':
+        return 'sexo'
+    if coluna.endswith('_s_n'):
+        return 's_n'
+    return 'numerico'
+
+
+def _texto_para_numero(textos):
+    """Textos -> (float64, inválidos) com pyarrow.compute: espaços e vírgula decimal (ponto e vírgula juntos: inválido)."""
+    a = pc.utf8_trim_whitespace(pa.array(textos, type=pa.string(), from_pandas=True))
+    misto = pc.and_(pc.match_substring(a, ','), pc.match_substring(a, '.'))
+    a = pc.replace_substring(a, ',', '.')
+    valido = pc.fill_null(pc.and_(pc.match_substring_regex(a, REGEX_NUMERO), pc.invert(misto)), False)
+    numeros = pc.cast(pc.if_else(valido, a, pa.scalar(None, pa.string())), pa.float64())
+    invalidos = pc.fill_null(pc.and_(pc.invert(valido), pc.not_equal(a, '')), False)
+    return (numeros.to_numpy(zero_copy_only=False),
+            invalidos.to_numpy(zero_copy_only=False).astype(bool))
+
+
+def coagir_numerico(valores):
+    """
+    Valores mistos -> (array float64, máscara de células inválidas).
+    Aceita números, textos com ponto ou vírgula decimal ('8.8', '8,8') e
+    vazios (NaN, sem erro). Texto não numérico (inclusive 'nan', 'inf' e
+    separadores misturados, como '1.234,5') vira NaN e é marcado inválido.
+    """
+    if isinstance(getattr(valores, 'dtype', None), pd.StringDtype):
+        return _texto_para_numero(valores)   # coluna só de textos (já em arrow no pandas 3)
+    arr = np.asarray(valores)
+    if arr.dtype.kind in 'fiub':
+        return arr.astype(np.float64, copy=False), np.zeros(len(arr), dtype=bool)
+    arr = np.asarray(valores, dtype=object)
+    invalidos = np.zeros(len(arr), dtype=bool)
+    texto = _TIPO(arr) == str
+    if not texto.any():
+        return np.array(arr, dtype=np.float64), invalidos   # caminho comum: só números e None
+    numeros = np.empty(len(arr))
+    numeros[~texto] = np.array(arr[~texto], dtype=np.float64)
+    numeros[texto], invalidos[texto] = _texto_para_numero(arr[texto])
+    return numeros, invalidos
+
+
+def _traduzir_distintos(valores, traduzir):
+    """Aplica 'traduzir' (valor -> (float, válido)) só aos valores distintos e expande pelos códigos."""
+    if not isinstance(valores, pd.Series):
+        valores = np.asarray(valores, dtype=object)
+    codigos, distintos = pd.factorize(valores, use_na_sentinel=True)
+    traducoes = [traduzir(v) for v in distintos]
+    tabela = np.array([t[0] for t in traducoes] + [np.nan], dtype=np.float64)
+    valido = np.array([t[1] for t in traducoes] + [True], dtype=bool)
+    return tabela[codigos], ~valido[codigos]   # código -1 (ausente) cai na última posição
+
+
+def _s_n(valor):
+    if isinstance(valor, (bool, np.bool_)):
+        return float(valor), True
+    if isinstance(valor, (int, float, np.number)):
+        valido = valor in (0, 1)
+        return (float(valor) if valido else 0.0), valido
+    texto = str(valor).strip().lower()
+    if texto in VALORES_SIM:
+        return 1.0, True
+    return 0.0, texto in VALORES_NAO
+
+
+def coagir_s_n(valores):
+    """
+    Flags '_s_n' -> (array float64, inválidos). 0 e 1 ficam como estão;
+    'S'/'sim' (e também '1', 'true', 'y', 'yes') viram 1; 'N'/'não'/'0',
+    vazios e ausentes viram 0. Outros textos e números diferentes de 0/1
+    (ex.: 2) também viram 0, mas são marcados inválidos.
+    """
+    if getattr(valores, 'dtype', np.dtype(object)).kind in 'fiub':
+        saida = np.asarray(valores, dtype=np.float64).copy()
+        saida[np.isnan(saida)] = 0.0
+        invalidos = (saida != 0.0) & (saida != 1.0)
+        saida[invalidos] = 0.0
+        return saida, invalidos
+    saida, invalidos = _traduzir_distintos(valores, _s_n)
+    saida[np.isnan(saida)] = 0.0
+    return saida, invalidos
+
+
+def _sexo(valor):
+    texto = str(valor).strip()
+    if texto in MAPA_SEXO:
+        return float(MAPA_SEXO[texto]), True
+    return np.nan, texto == ''
+
+
+def coagir_sexo(valores):
+    """'sexo' -> (array float64 com M=0/F=1, inválidos). Vazio vira NaN sem erro; outros textos são inválidos."""
+    if isinstance(getattr(valores, 'dtype', None), pd.CategoricalDtype):
+        valores = valores.astype(object)
+    return _traduzir_distintos(valores, _sexo)
+
+
+COERSOES = {'numerico': coagir_numerico, 's_n': coagir_s_n, 'sexo': coagir_sexo}
+
+
+def normalizar_planilha(df, linha_inicial=2):
+    """
+    Converte todas as colunas de 'df' (valores crus da planilha) para os tipos
+    do modelo: float64 para numéricas, '_s_n' e 'sexo'; texto para id/nome.
+    Retorna (DataFrame normalizado, DataFrame de inválidos com coluna, linha e valor).
+    'linha_inicial' é a linha da planilha da primeira linha de 'df' (2: abaixo do cabeçalho).
+    """
+    saida = {}
+    invalidos = []
+    for coluna in df.columns:
+        tipo = tipo_da_coluna(coluna)
+        valores = df[coluna]
+        if tipo == 'texto':
+            saida[coluna] = valores.replace('', np.nan).to_numpy(dtype=object)
+            continue
+        saida[coluna], mascara = COERSOES[tipo](valores)
+        if mascara.any():
+            posicoes = np.flatnonzero(mascara)
+            invalidos.append(pd.DataFrame({'coluna': coluna, 'linha': posicoes + linha_inicial,
+                                           'valor': valores.to_numpy()[posicoes]}))
+    relatorio = (pd.concat(invalidos, ignore_index=True) if invalidos
+                 else pd.DataFrame({'coluna': [], 'linha': [], 'valor': []}))
+    return pd.DataFrame(saida, index=df.index), relatorio
+
+
+def resumir_invalidos(relatorio, exemplos=3):
+    """Uma linha por coluna: quantidade de células inválidas e alguns exemplos."""
+    linhas = []
+    for coluna, grupo in relatorio.groupby('coluna', sort=False):
+        amostra = ', '.join(f"L{l}={v!r}" for l, v in zip(grupo['linha'][:exemplos], grupo['valor'][:exemplos]))
+        linhas.append(f"{coluna}: {len(grupo)} célula(s) inválida(s) ({amostra}{', ...' if len(grupo) > exemplos else ''})")
+    return linhas
+
+
+# --- Comparação com o caminho antigo de '[4.1]' ---
+
+def _normalizar_como_antes(df):
+    """Pré-processamento de tipos original de '[4.1]' (coluna a coluna, com 'apply' nas '_s_n')."""
+    from engenharia_features import codificar_sexo
+
+    df = df.replace('', np.nan)
+    for col in [c for c in df.columns if c not in ['id', 'nome', 'sobrenome', 'sexo'] and not c.endswith('_s_n')]:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df['sexo'] = codificar_sexo(df['sexo'])
+    for col in [c for c in df.columns if c.endswith('_s_n')]:
+        df[col] = df[col].apply(lambda x: 1 if str(x).strip().lower() in ['s', 'sim'] else 0).astype(float)
+    return df
+
+
+def planilha_mista(qtd, seed=42):
+    """Coorte com valores como chegam de uma planilha: 'S'/'N'/'sim', vírgula decimal, vazios e alguns erros."""
+    from gerador_vetorizado import gerar_lote
+    from formato_colunar import para_exportacao
+
+    rng = np.random.default_rng(seed)
+    df = para_exportacao(gerar_lote(qtd, rng)).astype(object)
+    for coluna in df.columns:
+        tipo = tipo_da_coluna(coluna)
+        arr = df[coluna].to_numpy(copy=True)
+        if tipo == 's_n':
+            arr = np.where(arr == 1, rng.choice(np.array(['S', 'sim', ' s'], dtype=object), qtd),
+                           rng.choice(np.array(['N', 'não', ''], dtype=object), qtd))
+        elif tipo == 'numerico':
+            texto = rng.random(qtd) < 0.3
+            arr[texto] = [str(v).replace('.', ',') for v in arr[texto]]
+        arr[rng.random(qtd) < 0.005] = ''
+        arr[rng.random(qtd) < 0.0005] = '#N/A'
+        df[coluna] = arr
+    return df
+
+
+def comparar_normalizacao(qtd=1_000_000):
+    df = planilha_mista(qtd)
+
+    inicio = time.perf_counter()
+    antigo = _normalizar_como_antes(df.copy())
+    t_antigo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    novo, invalidos = normalizar_planilha(df)
+    t_novo = time.perf_counter() - inicio
+
+    colunas = [c for c in df.columns if tipo_da_coluna(c) != 'texto']
+    a = antigo[colunas].to_numpy(dtype=np.float64)
+    b = novo[colunas].to_numpy(dtype=np.float64)
+    diferentes = ~((a == b) | (np.isnan(a) & np.isnan(b)))
+    print(f"--- {qtd:,} linhas x {df.shape[1]} colunas ---")
+    print(f"Caminho antigo (to_numeric + apply): {t_antigo:7.2f} s")
+    print(f"Normalização vetorizada:             {t_novo:7.2f} s  ({t_antigo / t_novo:.1f}x)")
+    print(f"Células inválidas relatadas: {len(invalidos):,}")
+    print(f"Células diferentes do caminho antigo: {diferentes.sum():,} "
+          f"(vírgula decimal, que o caminho antigo transformava em NaN)")
+    return t_antigo, t_novo
+
+
+if __name__ == "__main__":
+    comparar_normalizacao(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
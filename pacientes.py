@@ -0,0 +1,193 @@
+import os
+import sys
+import time
+import argparse
+import importlib
+import subprocess
+
+# Ponto de entrada único do projeto:
+#   python pacientes.py [--sem-graficos] <subcomando> [opções]
+#
+# Só os módulos da biblioteca padrão são importados aqui; numpy, pandas,
+# sklearn, gspread, matplotlib... são carregados apenas pelo subcomando que
+# precisa deles. Os scripts numerados continuam sendo a implementação e são
+# executados como '__main__', como se fossem chamados diretamente.
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+# subcomando -> (script numerado ou None, módulos pesados que ele usa, nome em inglês)
+SUBCOMANDOS = {
+    'gerar': (None, ['numpy', 'pandas', 'pyarrow.parquet', 'gerador_streaming'], 'generate'),
+    'treinar': ('[2] - analise_modelagem.py',
+                ['pandas', 'sklearn.ensemble', 'imblearn.over_sampling', 'formato_colunar',
+                 'engenharia_features', 'pacote_modelo', 'balanceamento'], 'train'),
+    'prever': ('[4.0] - prever_novos_pacientes.py',
+               ['pandas', 'formato_colunar', 'engenharia_features', 'pacote_modelo'], 'predict'),
+    'pontuar-lote': (None, ['numpy', 'pandas', 'pyarrow.dataset', 'pacote_modelo', 'pontuacao_lotes'], 'score-batch'),
+    'pontuar-planilha': ('[4.1] - calcular_risco_planilha.py',
+                         ['pandas', 'gspread', 'google.oauth2.service_account', 'engenharia_features',
+                          'pacote_modelo', 'cliente_planilhas'], 'score-sheet'),
+    'upload': ('[5] - upload_pacientes_simulados.py',
+               ['pandas', 'gspread', 'google.oauth2.service_account', 'dotenv', 'formato_colunar',
+                'cliente_planilhas', 'carga_planilha'], None),
+    'download': ('[6] - baixar_pacientes_reais.py',
+                 ['pandas', 'gspread', 'google.oauth2.service_account', 'dotenv', 'formato_colunar',
+                  'cliente_planilhas', 'espelho_planilha'], None),
+    'importancia': ('[7] - gerar_importancia_features.py',
+                    ['pandas', 'matplotlib.pyplot', 'pacote_modelo'], 'importance'),
+}
+# Módulos extras quando os gráficos estão ligados
+MODULOS_GRAFICOS = {'treinar': ['seaborn', 'matplotlib.pyplot']}
+
+
+def _modulos(subcomando, sem_graficos):
+    _, modulos, _ = SUBCOMANDOS[subcomando]
+    if not sem_graficos:
+        modulos = modulos + MODULOS_GRAFICOS.get(subcomando, [])
+    return modulos
+
+
+def _importar(modulos):
+    for modulo in modulos:
+        importlib.import_module(modulo)
+
+
+def _executar_script(script):
+    import runpy
+    runpy.run_path(os.path.join(DIRETORIO, script), run_name='__main__')
+
+
+def _gerar(args):
+    """Gera uma coorte em disco: em lotes (1 processo) ou em shards paralelos."""
+    import numpy as np
+
+    if args.processos > 1:
+        import tempfile
+        from gerador_paralelo import gerar_paralelo
+
+        if os.path.splitext(args.destino)[1] in ('.parquet', '.csv'):
+            # Arquivo único: partes num diretório temporário, juntadas no destino
+            with tempfile.TemporaryDirectory() as tmp:
+                gerar_paralelo(args.qtd, tmp, seed=args.seed, processos=args.processos,
+                               tamanho_lote=args.tamanho_lote, arquivo_unico=args.destino, formato=args.formato)
+        else:
+            gerar_paralelo(args.qtd, args.destino, seed=args.seed, processos=args.processos,
+                           tamanho_lote=args.tamanho_lote, formato=args.formato)
+    else:
+        from gerador_streaming import gerar_para_disco
+        gerar_para_disco(args.qtd, args.destino, tamanho_lote=args.tamanho_lote,
+                         rng=np.random.default_rng(args.seed), formato=args.formato)
+
+
+def _treinar(args):
+    if args.modo == 'out-of-core':
+        from treino_incremental import treinar_out_of_core
+        treinar_out_of_core()
+    elif args.modo == 'busca':
+        from busca_hiperparametros import buscar
+        buscar()
+    else:
+        _executar_script(SUBCOMANDOS['treinar'][0])
+
+
+def medir_inicializacao(repeticoes=5, sem_graficos=True):
+    """
+    Mede, em processos novos, o tempo até cada subcomando estar pronto para
+    trabalhar (interpretador + imports do subcomando), com '--so-importar'.
+    Retorna {subcomando: segundos (mediana)}.
+    """
+    def medir(argumentos):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            saida = subprocess.run([sys.executable, os.path.abspath(__file__), *argumentos],
+                                   capture_output=True, text=True)
+            if saida.returncode != 0:
+                return None
+            tempos.append(time.perf_counter() - inicio)
+        return sorted(tempos)[len(tempos) // 2]
+
+    base = ['--sem-graficos'] if sem_graficos else []
+    resultados = {'--help': medir(['--help'])}
+    for subcomando in SUBCOMANDOS:
+        # 'gerar' e 'pontuar-lote' exigem argumentos posicionais; com '--so-importar' eles não são usados
+        extras = {'gerar': ['1', os.devnull], 'pontuar-lote': [os.devnull, os.devnull]}.get(subcomando, [])
+        resultados[subcomando] = medir(base + ['--so-importar', subcomando, *extras])
+    if sem_graficos:
+        resultados['treinar (com gráficos)'] = medir(['--so-importar', 'treinar'])
+
+    for nome, segundos in resultados.items():
+        texto = f"{segundos * 1e3:8.0f} ms" if segundos is not None else "   indisponível (dependência ausente)"
+        print(f"{nome:>24}: {texto}")
+    return resultados
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(prog="pacientes.py", description="Pé diabético: geração, treino e pontuação.")
+    parser.add_argument('--sem-graficos', action='store_true',
+                        help="Modo headless: nenhum gráfico é exibido (matplotlib com backend Agg)")
+    parser.add_argument('--so-importar', action='store_true', help=argparse.SUPPRESS)
+    sub = parser.add_subparsers(dest='subcomando', required=True)
+
+    for nome, (_, _, alias) in SUBCOMANDOS.items():
+        p = sub.add_parser(nome, aliases=[alias] if alias else [])
+        p.set_defaults(subcomando=nome)
+        if nome == 'gerar':
+            p.add_argument('qtd', type=int)
+            p.add_argument('destino', help="Arquivo (.parquet/.csv) ou diretório de partes")
+            p.add_argument('--formato', choices=['parquet', 'csv'], default='parquet')
+            p.add_argument('--processos', type=int, default=1)
+            p.add_argument('--seed', type=int, default=42)
+            p.add_argument('--tamanho-lote', type=int, default=100_000)
+        elif nome == 'pontuar-lote':
+            p.add_argument('entrada', help="Coorte em Parquet (arquivo ou diretório) ou CSV de exportação")
+            p.add_argument('saida', help="Resultados: '.csv' ou Parquet")
+            p.add_argument('--pacote', default='pacote_rf_v1.joblib')
+            p.add_argument('--processos', type=int, default=None, help="Padrão: todos os núcleos")
+            p.add_argument('--tamanho-bloco', type=int, default=100_000)
+            p.add_argument('--explicar', action='store_true',
+                           help="Grava também as contribuições de cada feature e os principais fatores de risco")
+        elif nome == 'treinar':
+            p.add_argument('--modo', choices=['padrao', 'out-of-core', 'busca'], default='padrao',
+                           help="padrao: '[2]'; out-of-core: treino em blocos; busca: hiperparâmetros")
+        elif nome == 'upload':
+            # Lido pelo próprio '[5]' em sys.argv
+            p.add_argument('--completo', action='store_true',
+                           help="Recarrega a aba inteira (em blocos, com retomada) em vez do envio incremental")
+
+    p = sub.add_parser('medir-inicializacao', aliases=['startup'])
+    p.set_defaults(subcomando='medir-inicializacao')
+    p.add_argument('--repeticoes', type=int, default=5)
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+
+    if args.subcomando == 'medir-inicializacao':
+        medir_inicializacao(args.repeticoes)
+        return
+
+    if args.sem_graficos:
+        # Vale também para os scripts executados e seus processos filhos
+        os.environ['PACIENTES_SEM_GRAFICOS'] = '1'
+        os.environ['MPLBACKEND'] = 'Agg'
+
+    _importar(_modulos(args.subcomando, args.sem_graficos))
+    if args.so_importar:
+        return
+
+    if args.subcomando == 'gerar':
+        _gerar(args)
+    elif args.subcomando == 'treinar':
+        _treinar(args)
+    elif args.subcomando == 'pontuar-lote':
+        from pontuacao_lotes import pontuar_arquivo
+        pontuar_arquivo(args.entrada, args.saida, args.pacote, args.tamanho_bloco, args.processos,
+                        explicar=args.explicar)
+    else:
+        _executar_script(SUBCOMANDOS[args.subcomando][0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+import os
+import sys
+import json
+import hashlib
+import subprocess
+import numpy as np
+import pandas as pd
+import joblib
+
+from floresta_compilada import compilar_floresta
+
+# Pacote único e versionado do modelo: pré-processamento (scaler), ordem das
+# features, floresta compilada, importâncias e um hash do esquema, num só
+# arquivo joblib sem compressão. Assim os arrays podem ser abertos com
+# 'mmap_mode' e vários processos de pontuação compartilham as mesmas páginas
+# em vez de cada um desserializar a própria cópia das árvores.
+# O pacote também guarda o valor de imputação de cada feature (a estatística
+# usada no treino), para que a pontuação preencha ausentes em tempo constante
+# por linha, sem depender do lote (ex.: a mediana do próprio arquivo).
+# Pacote compacto ('compactar'): floresta em tipos estreitos e o scaler como
+# dois arrays (EscalaCompacta), para que os processos de pontuação não
+# precisem importar o sklearn (~75 MiB por processo) só para desserializá-lo.
+# O pacote normal guarda também o RandomForest original: a floresta compilada
+# ganha em chamadas pequenas (uma linha: ~0,1 ms contra ~8 ms do sklearn), mas
+# em lotes grandes o sklearn é 2 a 5x mais rápido. 'PacoteModelo.predict_proba'
+# escolhe pelo tamanho do lote (LIMITE_COMPILADA); o pacote compacto, sem o
+# sklearn, usa sempre a compilada.
+
+ARQUIVO_PACOTE = "pacote_rf_v1.joblib"
+ARQUIVO_PACOTE_COMPACTO = "pacote_rf_v1_compacto.joblib"
+VERSAO_FORMATO = 1
+LIMITE_COMPILADA = 512          # até este número de linhas, a floresta compilada é a mais rápida
+
+# Os quatro artefatos avulsos gravados por '[2]'
+ARTEFATOS_AVULSOS = ('modelo_rf_v1.joblib', 'scaler_v1.joblib', 'features_v1.joblib', 'numeric_features_v1.joblib')
+
+
+class PacoteModelo:
+    """Conteúdo de um pacote carregado (ou prestes a ser salvo)."""
+
+    def __init__(self, versao, features, features_numericas, scaler, floresta, importancias, hash_esquema=None,
+                 imputacao=None, modelo=None):
+        self.versao = versao
+        self.features = list(features)
+        self.features_numericas = list(features_numericas)
+        self.scaler = scaler
+        self.floresta = floresta
+        self.importancias = importancias
+        self.hash_esquema = hash_esquema or calcular_hash_esquema(self)
+        self.imputacao = imputacao if imputacao is not None else imputacao_padrao(self)
+        self.modelo = modelo    # RandomForestClassifier original (None no pacote compacto e nos antigos)
+
+    @property
+    def classes(self):
+        return self.floresta.classes
+
+    @property
+    def compacto(self):
+        """Floresta em tipos estreitos: a pontuação monta X direto em float32."""
+        return self.floresta.compacta
+
+    def predict_proba(self, X):
+        """
+        Probabilidades na ordem de 'classes' (X escalado, na ordem de 'features').
+        Lotes de até LIMITE_COMPILADA linhas vão à floresta compilada; os
+        maiores, ao RandomForest original, quando o pacote o tiver.
+        """
+        n = 1 if np.ndim(X) == 1 else len(X)
+        if self.modelo is None or n <= LIMITE_COMPILADA:
+            return self.floresta.predict_proba(X)
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features]
+        elif getattr(self.modelo, 'feature_names_in_', None) is not None:
+            # Sem copiar: só evita o aviso de "X sem nomes de features" do sklearn
+            X = pd.DataFrame(np.asarray(X, dtype=np.float32), columns=self.features, copy=False)
+        return self.modelo.predict_proba(X)
+
+    def predict(self, X):
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+    def imputar(self, X):
+        """
+        Preenche ausentes com os valores de imputação do treino (X sem escalar,
+        na ordem de 'features'). DataFrame: devolve uma cópia; array float: no lugar.
+        """
+        if isinstance(X, pd.DataFrame):
+            return X.fillna(pd.Series(self.imputacao, index=self.features))
+        ausentes = np.isnan(X)
+        if ausentes.any():
+            X[ausentes] = np.broadcast_to(self.imputacao, X.shape)[ausentes]
+        return X
+
+    @property
+    def identificador(self):
+        """Impressão digital do modelo treinado (muda a cada novo treino, ao contrário do hash do esquema)."""
+        if getattr(self, '_identificador', None) is None:
+            self._identificador = calcular_identificador(self)
+        return self._identificador
+
+
+class EscalaCompacta:
+    """
+    Parâmetros de um StandardScaler já ajustado, sem depender do sklearn:
+    mesmos atributos usados na pontuação e 'transform' com o mesmo resultado.
+    """
+
+    def __init__(self, mean_, scale_, feature_names_in_=None, with_mean=True, with_std=True):
+        self.mean_ = None if mean_ is None else np.asarray(mean_, dtype=np.float64)
+        self.scale_ = None if scale_ is None else np.asarray(scale_, dtype=np.float64)
+        self.feature_names_in_ = None if feature_names_in_ is None else np.asarray(feature_names_in_, dtype=object)
+        self.with_mean = with_mean
+        self.with_std = with_std
+        referencia = self.mean_ if self.mean_ is not None else self.scale_
+        self.n_features_in_ = len(referencia) if referencia is not None else len(self.feature_names_in_)
+
+    @classmethod
+    def de_scaler(cls, scaler):
+        return cls(getattr(scaler, 'mean_', None), getattr(scaler, 'scale_', None),
+                   getattr(scaler, 'feature_names_in_', None),
+                   getattr(scaler, 'with_mean', True), getattr(scaler, 'with_std', True))
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        if self.with_mean and self.mean_ is not None:
+            X -= self.mean_
+        if self.with_std and self.scale_ is not None:
+            X /= self.scale_
+        return X
+
+
+def calcular_hash_esquema(pacote):
+    """SHA-256 da descrição das entradas/saídas do modelo (features, numéricas, classes, nós)."""
+    descricao = {
+        'features': pacote.features,
+        'features_numericas': pacote.features_numericas,
+        'classes': [str(c) for c in pacote.floresta.classes],
+        'n_arvores': pacote.floresta.n_arvores,
+        'n_nos': pacote.floresta.n_nos,
+    }
+    return hashlib.sha256(json.dumps(descricao, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def imputacao_padrao(pacote):
+    """
+    Valores de imputação quando o pacote não traz os do treino (pacotes antigos):
+    a média do scaler nas features numéricas (0 depois de escalar) e 0 nas demais.
+    """
+    valores = np.zeros(len(pacote.features))
+    media = getattr(pacote.scaler, 'mean_', None)
+    if media is not None:
+        for f, m in zip(pacote.features_numericas, media):
+            valores[pacote.features.index(f)] = m
+    return valores
+
+
+def _vetor_imputacao(imputacao, features):
+    """dict/Series feature -> valor (ou array na ordem de 'features') -> array float64."""
+    if imputacao is None:
+        return None
+    if isinstance(imputacao, (dict, pd.Series)):
+        faltando = [f for f in features if f not in imputacao]
+        if faltando:
+            raise ValueError(f"Valores de imputação ausentes para: {faltando}")
+        return np.array([float(imputacao[f]) for f in features])
+    return np.asarray(imputacao, dtype=np.float64)
+
+
+def calcular_identificador(pacote):
+    """SHA-256 da versão, do esquema, dos parâmetros do scaler e dos arrays da floresta."""
+    h = hashlib.sha256(f"{pacote.versao}|{pacote.hash_esquema}".encode('utf-8'))
+    floresta = pacote.floresta
+    for array in (pacote.imputacao, getattr(pacote.scaler, 'mean_', None), getattr(pacote.scaler, 'scale_', None),
+                  floresta.feature, floresta.limiar, floresta.esquerda, floresta.nan_direita,
+                  floresta.valor, floresta.raizes):
+        if array is not None:
+            h.update(np.ascontiguousarray(array).tobytes())
+    return h.hexdigest()
+
+
+def _validar(pacote):
+    """Confere se scaler, floresta e listas de features correspondem entre si."""
+    faltando = [f for f in pacote.features_numericas if f not in pacote.features]
+    if faltando:
+        raise ValueError(f"Features numéricas fora da lista de features: {faltando}")
+    n_scaler = getattr(pacote.scaler, 'n_features_in_', len(pacote.features_numericas))
+    if n_scaler != len(pacote.features_numericas):
+        raise ValueError(f"O scaler espera {n_scaler} colunas, mas há {len(pacote.features_numericas)} features numéricas.")
+    nomes_scaler = getattr(pacote.scaler, 'feature_names_in_', None)
+    if nomes_scaler is not None and list(nomes_scaler) != pacote.features_numericas:
+        raise ValueError("As colunas do scaler não correspondem às features numéricas.")
+    if pacote.floresta.features is not None and pacote.floresta.features != pacote.features:
+        raise ValueError("A ordem de features do modelo não corresponde à lista de features.")
+    if pacote.floresta.n_nos and int(pacote.floresta.feature.max()) >= len(pacote.features):
+        raise ValueError("O modelo usa mais features do que as listadas.")
+    if len(pacote.importancias) != len(pacote.features):
+        raise ValueError("O número de importâncias não corresponde ao número de features.")
+    if len(pacote.imputacao) != len(pacote.features) or np.isnan(pacote.imputacao).any():
+        raise ValueError("Os valores de imputação não correspondem às features (ou contêm NaN).")
+
+
+def salvar_pacote(modelo, scaler, features, features_numericas, caminho=ARQUIVO_PACOTE, versao='v1',
+                  imputacao=None, compacto=False):
+    """
+    Compila o RandomForest e grava o pacote em 'caminho'.
+    'imputacao': valor usado no treino para preencher ausentes de cada feature
+    (dict/Series por nome, ou array na ordem de 'features'); sem ele, vale
+    'imputacao_padrao'. 'compacto': grava a versão de 'compactar_pacote'.
+    Levanta ValueError se os artefatos não forem consistentes entre si.
+    """
+    features = list(features)
+    pacote = PacoteModelo(versao, features, features_numericas, scaler,
+                          compilar_floresta(modelo), np.asarray(modelo.feature_importances_, dtype=np.float64),
+                          imputacao=_vetor_imputacao(imputacao, features), modelo=modelo)
+    if compacto:
+        pacote = compactar_pacote(pacote)
+    gravar_pacote(pacote, caminho)
+    return pacote
+
+
+def compactar_pacote(pacote):
+    """Cópia do pacote com a floresta em tipos estreitos e o scaler como EscalaCompacta (sem o RandomForest)."""
+    return PacoteModelo(pacote.versao, pacote.features, pacote.features_numericas,
+                        EscalaCompacta.de_scaler(pacote.scaler), pacote.floresta.compactar(),
+                        np.asarray(pacote.importancias, dtype=np.float64),
+                        imputacao=np.array(pacote.imputacao, dtype=np.float64))
+
+
+def gravar_pacote(pacote, caminho):
+    """Confere e grava um PacoteModelo já montado."""
+    _validar(pacote)
+    conteudo = {
+        'versao_formato': VERSAO_FORMATO,
+        'versao': pacote.versao,
+        'hash_esquema': pacote.hash_esquema,
+        'features': pacote.features,
+        'features_numericas': pacote.features_numericas,
+        'scaler': pacote.scaler,
+        'floresta': pacote.floresta,
+        'importancias': pacote.importancias,
+        'imputacao': pacote.imputacao,
+        'modelo': pacote.modelo,
+    }
+    joblib.dump(conteudo, caminho)  # sem compressão: necessário para mmap_mode
+
+
+def carregar_pacote(caminho=ARQUIVO_PACOTE, mmap_mode='r'):
+    """
+    Carrega um pacote. Com mmap_mode='r' (padrão), os arrays da floresta são
+    mapeados do arquivo, somente leitura e compartilhados entre processos.
+    Levanta ValueError se a versão do formato ou o hash do esquema não baterem.
+    """
+    conteudo = joblib.load(caminho, mmap_mode=mmap_mode)
+    if conteudo.get('versao_formato') != VERSAO_FORMATO:
+        raise ValueError(f"Formato de pacote {conteudo.get('versao_formato')} não suportado (esperado {VERSAO_FORMATO}).")
+    pacote = PacoteModelo(conteudo['versao'], conteudo['features'], conteudo['features_numericas'],
+                          conteudo['scaler'], conteudo['floresta'], conteudo['importancias'],
+                          imputacao=conteudo.get('imputacao'),  # pacotes antigos: imputacao_padrao
+                          modelo=conteudo.get('modelo'))        # pacotes antigos: só a compilada
+    if pacote.hash_esquema != conteudo['hash_esquema']:
+        raise ValueError(f"Hash do esquema não confere em '{caminho}': o pacote está corrompido ou foi alterado.")
+    _validar(pacote)
+    return pacote
+
+
+def converter_artefatos(prefixo="", caminho=None):
+    """Gera o pacote a partir dos quatro artefatos avulsos já existentes (com 'prefixo')."""
+    modelo, scaler, features, numericas = (joblib.load(f'{prefixo}{nome}') for nome in ARTEFATOS_AVULSOS)
+    return salvar_pacote(modelo, scaler, features, numericas, caminho or f'{prefixo}{ARQUIVO_PACOTE}')
+
+
+_CODIGO_AVULSOS = """
+import time, joblib
+import sklearn.ensemble, sklearn.preprocessing
+from floresta_compilada import compilar_floresta
+inicio = time.perf_counter()
+modelo, scaler, features, numericas = (joblib.load(n) for n in {arquivos!r})
+floresta = compilar_floresta(modelo)
+print(time.perf_counter() - inicio, {memoria})
+"""
+
+_CODIGO_PACOTE = """
+import time
+import sklearn.ensemble, sklearn.preprocessing
+from pacote_modelo import carregar_pacote
+inicio = time.perf_counter()
+pacote = carregar_pacote({caminho!r})
+print(time.perf_counter() - inicio, {memoria})
+"""
+
+# RssAnon (memória privada) do processo, em KiB; -1 fora do Linux
+_MEMORIA = ("next((int(l.split()[1]) for l in open('/proc/self/status') if l.startswith('RssAnon')), -1) "
+            "if __import__('os').path.exists('/proc/self/status') else -1")
+
+
+def _medir_processo(codigo):
+    ambiente = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [os.path.dirname(os.path.abspath(__file__)), os.environ.get('PYTHONPATH')])))
+    saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True, env=ambiente)
+    return [float(v) for v in saida.stdout.split()]
+
+
+def comparar_carga(prefixo="", repeticoes=5):
+    """
+    Partida a frio: em processos novos, mede o tempo de carga dos quatro
+    artefatos avulsos (mais a compilação da floresta, como em '[4.0]') e do
+    pacote (mmap), além da memória privada do processo (RssAnon). As
+    bibliotecas são importadas antes de iniciar o cronômetro.
+    """
+    caminho = f'{prefixo}{ARQUIVO_PACOTE}'
+    if not os.path.exists(caminho):
+        converter_artefatos(prefixo, caminho)
+    arquivos = [f'{prefixo}{nome}' for nome in ARTEFATOS_AVULSOS]
+
+    resultados = {}
+    for nome, codigo in [
+        ('4 arquivos', _CODIGO_AVULSOS.format(arquivos=arquivos, memoria=_MEMORIA)),
+        ('pacote (mmap)', _CODIGO_PACOTE.format(caminho=caminho, memoria=_MEMORIA)),
+    ]:
+        medidas = [_medir_processo(codigo)[-2:] for _ in range(repeticoes)]
+        resultados[nome] = (np.median([m[0] for m in medidas]), np.median([m[1] for m in medidas]))
+
+    tamanho_avulsos = sum(os.path.getsize(a) for a in arquivos)
+    print(f"Disco: 4 arquivos {tamanho_avulsos / 1024:.0f} KiB | pacote {os.path.getsize(caminho) / 1024:.0f} KiB")
+    for nome, (segundos, memoria) in resultados.items():
+        texto_memoria = f" | memória privada do processo {memoria / 1024:.1f} MiB" if memoria >= 0 else ""
+        print(f"{nome:>14}: carga {segundos * 1e3:7.1f} ms{texto_memoria}")
+    return pd.DataFrame(resultados, index=['segundos', 'rss_anon_kib']).T
+
+
+_CODIGO_PONTUACAO = """
+import sys, time
+import pandas as pd
+from pacote_modelo import carregar_pacote
+from pontuacao_lotes import pontuar_bloco
+pacote = carregar_pacote({caminho!r})
+ocioso = {memoria}
+df = pd.read_parquet({entrada!r})
+pontuar_bloco(df.iloc[:1000], pacote)
+inicio = time.perf_counter()
+resultado = pontuar_bloco(df, pacote)
+segundos = time.perf_counter() - inicio
+resultado[['Prob_Alto_Risco']].to_parquet({saida!r})
+print(int('sklearn' in sys.modules), ocioso, {pico}, segundos)
+"""
+
+# VmRSS / VmHWM (memória residente atual / pico) do processo, em KiB
+_RESIDENTE = "next(int(l.split()[1]) for l in open('/proc/self/status') if l.startswith('VmRSS'))"
+_PICO = "next(int(l.split()[1]) for l in open('/proc/self/status') if l.startswith('VmHWM'))"
+TOLERANCIA_COMPACTO = 1e-6
+
+
+def comparar_compacto(caminho=ARQUIVO_PACOTE, caminho_compacto=ARQUIVO_PACOTE_COMPACTO, qtd=100_000, repeticoes=3):
+    """
+    Processo de pontuação (como um trabalhador de 'pontuacao_lotes') com o
+    pacote normal x o compacto: memória residente depois de carregar o pacote
+    (processo ocioso) e no pico de um bloco de 'qtd' pacientes, vazão e a maior
+    diferença de probabilidade (deve ficar abaixo de TOLERANCIA_COMPACTO).
+    """
+    import tempfile
+    from gerador_vetorizado import gerar_lote
+
+    if not os.path.exists(caminho_compacto):
+        gravar_pacote(compactar_pacote(carregar_pacote(caminho)), caminho_compacto)
+
+    resultados, probabilidades = {}, {}
+    with tempfile.TemporaryDirectory() as tmp:
+        entrada = os.path.join(tmp, 'coorte.parquet')
+        gerar_lote(qtd, np.random.default_rng(5)).to_parquet(entrada)
+        for nome, arquivo in [('normal', caminho), ('compacto', caminho_compacto)]:
+            saida = os.path.join(tmp, f'{nome}.parquet')
+            codigo = _CODIGO_PONTUACAO.format(caminho=arquivo, entrada=entrada, saida=saida,
+                                              memoria=_RESIDENTE, pico=_PICO)
+            medidas = np.array([_medir_processo(codigo) for _ in range(repeticoes)])
+            sklearn, ocioso, pico, segundos = np.median(medidas, axis=0)
+            resultados[nome] = {'sklearn importado': bool(sklearn), 'memória ociosa (MiB)': ocioso / 1024,
+                                'pico no bloco (MiB)': pico / 1024, 'segundos': segundos,
+                                'pacientes/s': qtd / segundos, 'disco (KiB)': os.path.getsize(arquivo) / 1024}
+            probabilidades[nome] = pd.read_parquet(saida)['Prob_Alto_Risco'].to_numpy()
+
+    diferenca = np.abs(probabilidades['normal'] - probabilidades['compacto']).max()
+    tabela = pd.DataFrame(resultados).T
+    print(f"--- Trabalhador de pontuação, bloco de {qtd:,} pacientes ---")
+    print(tabela.to_markdown(floatfmt=".1f"))
+    print(f"Maior diferença de probabilidade: {diferenca:.1e} "
+          f"({'dentro' if diferenca <= TOLERANCIA_COMPACTO else 'FORA'} da tolerância {TOLERANCIA_COMPACTO:.0e})")
+    return tabela, diferenca
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "converter":
+        # python pacote_modelo.py converter [prefixo]
+        pacote = converter_artefatos(sys.argv[2] if len(sys.argv) > 2 else "")
+        print(f"Pacote salvo (esquema {pacote.hash_esquema[:12]}).")
+    elif len(sys.argv) > 1 and sys.argv[1] == "compactar":
+        # python pacote_modelo.py compactar [entrada] [saida]
+        # Pelo módulo importado: a EscalaCompacta é gravada como 'pacote_modelo.EscalaCompacta', e não '__main__'
+        import pacote_modelo
+        entrada = sys.argv[2] if len(sys.argv) > 2 else ARQUIVO_PACOTE
+        saida = sys.argv[3] if len(sys.argv) > 3 else ARQUIVO_PACOTE_COMPACTO
+        pacote_modelo.gravar_pacote(pacote_modelo.compactar_pacote(carregar_pacote(entrada)), saida)
+        print(f"Pacote compacto salvo em '{saida}'.")
+        pacote_modelo.comparar_compacto(entrada, saida)
+    else:
+        comparar_carga()
@@ -0,0 +1,400 @@
+import time
+import random
+import itertools
+import threading
+from collections import Counter, deque
+from gspread.exceptions import SpreadsheetNotFound, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range
+
+# Aba falsa do Google Sheets, em memória, com a parte da interface do
+# 'gspread.Worksheet' usada pelos scripts ('get_all_values', 'get_all_records',
+# 'row_values', 'col_values', 'batch_get', 'update', 'batch_update',
+# 'batch_clear', 'update_cell', 'append_rows', 'clear').
+# Cada chamada conta como uma requisição à API: tem latência simulada
+# (fixa + por célula) e passa pelas cotas de leitura/escrita por minuto,
+# como na API real. Serve para medir chamadas e tempo de sincronização sem rede.
+# 'ClienteFalso' faz o papel do 'gspread.Client' (open_by_key -> documento ->
+# worksheet/worksheets): as abas de um cliente compartilham a mesma ApiFalsa
+# (cotas e medidas), que aceita chamadas de várias threads ao mesmo tempo e
+# pode falhar de propósito ('taxa_erro', HTTP 503) para exercitar repetições,
+# recusar requisições grandes demais ('max_celulas_por_requisicao', HTTP 400)
+# e simular uma queda de conexão depois de N escritas ('interromper_apos').
+# O documento falso cria, apaga e renomeia abas (add_worksheet, del_worksheet
+# e batch_update com deleteSheet/updateSheetProperties, tudo ou nada) e, como
+# o Drive, informa a data da última modificação (get_lastUpdateTime).
+
+LATENCIA_S = 0.3                # por requisição
+LATENCIA_POR_CELULA_S = 2e-6    # transferência
+COTA_POR_MINUTO = 60            # leituras e escritas (contadas separadamente)
+PERIODO_COTA_S = 60             # janela da cota (menor nas medições, para não esperar minutos)
+
+_IDS_ABA = itertools.count(1)   # 'sheetId' das abas falsas
+
+
+class ErroCota(Exception):
+    """Cota de requisições por minuto excedida (HTTP 429 na API real)."""
+    code = 429
+
+
+class ErroServidor(Exception):
+    """Falha transitória do servidor (HTTP 503 na API real); nada foi alterado."""
+    code = 503
+
+
+class ErroRequisicao(Exception):
+    """Requisição inválida ou grande demais (HTTP 400 na API real); não adianta repetir."""
+    code = 400
+
+
+def _texto(valor):
+    """Valor como a API devolve na leitura: texto, com vazio para None/NaN e 7.0 como '7'."""
+    if valor is None or (isinstance(valor, float) and valor != valor):
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def _numerizar(texto):
+    for tipo in (int, float):
+        try:
+            return tipo(texto)
+        except ValueError:
+            pass
+    return texto
+
+
+class ApiFalsa:
+    """Latência, cotas, falhas e medidas de uma conta da API, compartilhadas por todas as suas abas."""
+
+    def __init__(self, latencia_s=LATENCIA_S, latencia_por_celula_s=LATENCIA_POR_CELULA_S,
+                 cota_por_minuto=COTA_POR_MINUTO, periodo_cota_s=PERIODO_COTA_S, dormir=True,
+                 taxa_erro=0.0, semente=None, max_celulas_por_requisicao=None, interromper_apos=None):
+        self.latencia_s = latencia_s
+        self.latencia_por_celula_s = latencia_por_celula_s
+        self.cota_por_minuto = cota_por_minuto
+        self.periodo_cota_s = periodo_cota_s
+        self.dormir = dormir            # False: só acumula o tempo simulado (medições rápidas)
+        self.taxa_erro = taxa_erro
+        self.max_celulas_por_requisicao = max_celulas_por_requisicao
+        self.interromper_apos = interromper_apos    # escritas aceitas antes de a "conexão cair"
+        self.escritas_aceitas = 0
+        self._sorteio = random.Random(semente)
+        self._historico = {'leitura': deque(), 'escrita': deque()}
+        self._trava = threading.Lock()
+        self.zerar_medidas()
+
+    def zerar_medidas(self):
+        self.chamadas = Counter()
+        self.recusadas = Counter()      # 429 e 503 devolvidos
+        self.celulas_lidas = 0
+        self.celulas_escritas = 0
+        self.tempo_api_s = 0.0
+
+    def _agora(self):
+        return time.monotonic() + (0.0 if self.dormir else self.tempo_api_s)
+
+    def requisicao(self, metodo, tipo, celulas=0, operacao=None):
+        """
+        Simula uma requisição: cota, falha sorteada, latência e medidas. A
+        'operacao' (que altera a grade) só é executada se a requisição passar;
+        'celulas' é o tamanho conhecido antes de executá-la (limite de tamanho).
+        """
+        with self._trava:
+            if self.interromper_apos is not None and self.escritas_aceitas >= self.interromper_apos:
+                self.recusadas[503] += 1
+                raise ErroServidor(f"Conexão perdida em '{metodo}'.")
+            if self.max_celulas_por_requisicao and celulas > self.max_celulas_por_requisicao:
+                self.recusadas[400] += 1
+                raise ErroRequisicao(f"'{metodo}' com {celulas} células: acima do limite de "
+                                     f"{self.max_celulas_por_requisicao} por requisição.")
+            agora = self._agora()
+            historico = self._historico[tipo]
+            while historico and agora - historico[0] >= self.periodo_cota_s:
+                historico.popleft()
+            if len(historico) >= self.cota_por_minuto:
+                self.recusadas[429] += 1
+                raise ErroCota(f"Cota de {tipo} excedida ({self.cota_por_minuto}/min) em '{metodo}'.")
+            historico.append(agora)
+            if self.taxa_erro and self._sorteio.random() < self.taxa_erro:
+                self.recusadas[503] += 1
+                raise ErroServidor(f"Falha transitória em '{metodo}'.")
+            if operacao is not None:
+                celulas = operacao()
+            if tipo == 'escrita':
+                self.escritas_aceitas += 1
+            self.chamadas[metodo] += 1
+            if tipo == 'leitura':
+                self.celulas_lidas += celulas
+            else:
+                self.celulas_escritas += celulas
+            atraso = self.latencia_s + celulas * self.latencia_por_celula_s
+            self.tempo_api_s += atraso
+        if self.dormir:
+            time.sleep(atraso)          # fora da trava: requisições simultâneas se sobrepõem
+
+    def resumo(self):
+        return {
+            'chamadas': sum(self.chamadas.values()),
+            'por_metodo': dict(self.chamadas),
+            'recusadas': dict(self.recusadas),
+            'celulas_lidas': self.celulas_lidas,
+            'celulas_escritas': self.celulas_escritas,
+            'tempo_api_s': self.tempo_api_s,
+        }
+
+
+class PlanilhaFalsa:
+
+    def __init__(self, valores=None, title="Aba", latencia_s=LATENCIA_S,
+                 latencia_por_celula_s=LATENCIA_POR_CELULA_S, cota_por_minuto=COTA_POR_MINUTO, dormir=True,
+                 api=None):
+        self.title = title
+        self.id = next(_IDS_ABA)
+        self._documento = None
+        # Sem 'api', a aba tem a sua própria (cotas e medidas só desta aba)
+        self.api = api or ApiFalsa(latencia_s, latencia_por_celula_s, cota_por_minuto, dormir=dormir)
+        self._celulas = [[_texto(v) for v in linha] for linha in (valores or [])]
+
+    def zerar_medidas(self):
+        self.api.zerar_medidas()
+
+    def resumo(self):
+        return self.api.resumo()
+
+    def _requisicao(self, metodo, tipo, celulas=0, operacao=None):
+        if tipo == 'escrita' and operacao is not None and self._documento is not None:
+            alterar = operacao
+
+            def operacao():
+                celulas_escritas = alterar()
+                self._documento._modificado()
+                return celulas_escritas
+        self.api.requisicao(metodo, tipo, celulas, operacao)
+
+    # --- Grade ---
+
+    @property
+    def index(self):
+        return self._documento._ordem.index(self) if self._documento is not None else 0
+
+    @property
+    def row_count(self):
+        return len(self._celulas)
+
+    @property
+    def col_count(self):
+        return max((len(linha) for linha in self._celulas), default=0)
+
+    def _intervalo(self, nome):
+        grade = a1_range_to_grid_range(nome)
+        return (grade.get('startRowIndex', 0), grade.get('endRowIndex', self.row_count),
+                grade.get('startColumnIndex', 0), grade.get('endColumnIndex', self.col_count))
+
+    def _ler(self, l0, l1, c0, c1):
+        linhas = [linha[c0:c1] + [''] * (c1 - c0 - len(linha[c0:c1])) for linha in self._celulas[l0:l1]]
+        while linhas and not any(linhas[-1]):
+            linhas.pop()   # como a API: linhas vazias no fim não são devolvidas
+        return linhas
+
+    def _escrever(self, l0, c0, valores):
+        for i, linha in enumerate(valores):
+            while len(self._celulas) <= l0 + i:
+                self._celulas.append([])
+            destino = self._celulas[l0 + i]
+            if len(destino) < c0 + len(linha):
+                destino.extend([''] * (c0 + len(linha) - len(destino)))
+            destino[c0:c0 + len(linha)] = [_texto(v) for v in linha]
+        return sum(len(linha) for linha in valores)
+
+    # --- Leitura ---
+
+    def _leitura(self, metodo, ler, celulas):
+        """Faz a leitura 'ler()' dentro da requisição (consistente com escritas de outras threads)."""
+        resultado = []
+
+        def operacao():
+            resultado.append(ler())
+            return celulas(resultado[0])
+        self._requisicao(metodo, 'leitura', operacao=operacao)
+        return resultado[0]
+
+    def get_all_values(self, **kwargs):
+        return self._leitura('get_all_values', lambda: self._ler(0, self.row_count, 0, self.col_count),
+                             lambda valores: sum(len(l) for l in valores))
+
+    def get_all_records(self, **kwargs):
+        valores = self._leitura('get_all_records', lambda: self._ler(0, self.row_count, 0, self.col_count),
+                                lambda valores: sum(len(l) for l in valores))
+        if not valores:
+            return []
+        cabecalho = valores[0]
+        return [dict(zip(cabecalho, (_numerizar(v) for v in linha))) for linha in valores[1:]]
+
+    def row_values(self, linha):
+        def ler():
+            valores = self._ler(linha - 1, linha, 0, self.col_count)
+            valores = valores[0] if valores else []
+            while valores and valores[-1] == '':
+                valores.pop()
+            return valores
+        return self._leitura('row_values', ler, len)
+
+    def col_values(self, coluna):
+        return self._leitura('col_values', lambda: [l[0] for l in self._ler(0, self.row_count, coluna - 1, coluna)],
+                             len)
+
+    def batch_get(self, ranges, **kwargs):
+        return self._leitura('batch_get', lambda: [self._ler(*self._intervalo(nome)) for nome in ranges],
+                             lambda resultado: sum(len(l) for valores in resultado for l in valores))
+
+    # --- Escrita ---
+
+    def update(self, values=None, range_name=None, value_input_option=None, **kwargs):
+        if isinstance(values, str) and isinstance(range_name, list):
+            values, range_name = range_name, values  # ordem antiga (gspread < 6): update(range, values)
+        l0, _, c0, _ = self._intervalo(range_name or 'A1')
+        self._requisicao('update', 'escrita', sum(len(linha) for linha in values),
+                         operacao=lambda: self._escrever(l0, c0, values))
+
+    def batch_update(self, data, value_input_option=None, **kwargs):
+        def operacao():
+            celulas = 0
+            for item in data:
+                l0, _, c0, _ = self._intervalo(item['range'])
+                celulas += self._escrever(l0, c0, item['values'])
+            return celulas
+        self._requisicao('batch_update', 'escrita', sum(len(linha) for item in data for linha in item['values']),
+                         operacao=operacao)
+
+    def batch_clear(self, ranges):
+        def operacao():
+            celulas = 0
+            for nome in ranges:
+                l0, l1, c0, c1 = self._intervalo(nome)
+                for linha in self._celulas[l0:l1]:
+                    trecho = linha[c0:c1]
+                    celulas += len(trecho)
+                    linha[c0:c0 + len(trecho)] = [''] * len(trecho)
+            return celulas
+        self._requisicao('batch_clear', 'escrita', operacao=operacao)
+
+    def update_cell(self, linha, coluna, valor):
+        self._requisicao('update_cell', 'escrita', operacao=lambda: self._escrever(linha - 1, coluna - 1, [[valor]]))
+
+    def append_rows(self, values, value_input_option=None, **kwargs):
+        def operacao():
+            inicio = self.row_count
+            while inicio and not any(self._celulas[inicio - 1]):
+                inicio -= 1
+            return self._escrever(inicio, 0, values)
+        self._requisicao('append_rows', 'escrita', sum(len(linha) for linha in values), operacao=operacao)
+
+    def clear(self):
+        def operacao():
+            self._celulas = []
+            return 0
+        self._requisicao('clear', 'escrita', operacao=operacao)
+
+
+class DocumentoFalso:
+    """Planilha (documento) falsa: abas em ordem, como o 'gspread.Spreadsheet'."""
+
+    def __init__(self, chave, abas, api):
+        self.id = chave
+        self._ordem = list(abas)
+        self._api = api
+        self._modificacao_ms = time.time_ns() // 1_000_000
+        for aba in self._ordem:
+            aba._documento = self
+
+    def _modificado(self):
+        self._modificacao_ms = max(time.time_ns() // 1_000_000, self._modificacao_ms + 1)   # sempre avança
+
+    def get_lastUpdateTime(self):
+        """'modifiedTime' do Drive: data da última alteração em qualquer aba (ISO 8601, UTC)."""
+        self._api.requisicao('get_file_drive_metadata', 'leitura')
+        segundos, ms = divmod(self._modificacao_ms, 1000)
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(segundos)) + f'.{ms:03d}Z'
+
+    def _por_titulo(self, titulo):
+        return next((aba for aba in self._ordem if aba.title == titulo), None)
+
+    def worksheet(self, titulo):
+        self._api.requisicao('fetch_sheet_metadata', 'leitura')
+        aba = self._por_titulo(titulo)
+        if aba is None:
+            raise WorksheetNotFound(titulo)
+        return aba
+
+    def worksheets(self, **kwargs):
+        self._api.requisicao('fetch_sheet_metadata', 'leitura')
+        return list(self._ordem)
+
+    def add_worksheet(self, title, rows=1000, cols=26, index=None):
+        def operacao():
+            if self._por_titulo(title) is not None:
+                raise ErroRequisicao(f"Já existe uma aba chamada '{title}'.")
+            aba = PlanilhaFalsa(title=title, api=self._api)
+            aba._documento = self
+            self._ordem.insert(len(self._ordem) if index is None else index, aba)
+            self._modificado()
+            return 0
+        self._api.requisicao('add_worksheet', 'escrita', operacao=operacao)
+        return self._por_titulo(title)
+
+    def del_worksheet(self, aba):
+        self.batch_update({'requests': [{'deleteSheet': {'sheetId': aba.id}}]})
+
+    def batch_update(self, body):
+        """Só 'deleteSheet' e 'updateSheetProperties' (title/index); tudo ou nada, como na API."""
+        def operacao():
+            ordem = list(self._ordem)
+            titulos = {}
+            for pedido in body['requests']:
+                if 'deleteSheet' in pedido:
+                    aba = next((a for a in ordem if a.id == pedido['deleteSheet']['sheetId']), None)
+                    if aba is None:
+                        raise ErroRequisicao(f"Aba {pedido['deleteSheet']['sheetId']} não existe.")
+                    ordem.remove(aba)
+                elif 'updateSheetProperties' in pedido:
+                    propriedades = pedido['updateSheetProperties']['properties']
+                    aba = next((a for a in ordem if a.id == propriedades['sheetId']), None)
+                    if aba is None:
+                        raise ErroRequisicao(f"Aba {propriedades['sheetId']} não existe.")
+                    if 'index' in propriedades:
+                        ordem.remove(aba)
+                        ordem.insert(propriedades['index'], aba)
+                    if 'title' in propriedades:
+                        titulos[aba.id] = propriedades['title']
+                else:
+                    raise ErroRequisicao(f"Pedido não suportado: {list(pedido)}")
+            nomes = [titulos.get(a.id, a.title) for a in ordem]
+            if len(set(nomes)) != len(nomes):
+                raise ErroRequisicao("Títulos de abas repetidos.")
+            for aba in ordem:
+                aba.title = titulos.get(aba.id, aba.title)
+            self._ordem = ordem
+            self._modificado()
+            return 0
+        self._api.requisicao('batch_update_documento', 'escrita', operacao=operacao)
+        return {'replies': [{} for _ in body['requests']]}
+
+
+class ClienteFalso:
+    """
+    Substituto do 'gspread.Client': 'documentos' é {chave: {título da aba: valores}}.
+    Os demais argumentos vão para a ApiFalsa compartilhada (latência, cota, falhas).
+    """
+
+    def __init__(self, documentos, **opcoes_api):
+        self.api = ApiFalsa(**opcoes_api)
+        self.documentos = {chave: DocumentoFalso(chave, [PlanilhaFalsa(valores, titulo, api=self.api)
+                                                         for titulo, valores in abas.items()], self.api)
+                           for chave, abas in documentos.items()}
+
+    def open_by_key(self, chave):
+        self.api.requisicao('open_by_key', 'leitura')
+        if chave not in self.documentos:
+            raise SpreadsheetNotFound(chave)
+        return self.documentos[chave]
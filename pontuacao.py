@@ -0,0 +1,133 @@
+import numpy as np
+
+from engenharia_features import codificar_sexo, calcular_features, FEATURES_DERIVADAS
+from normalizacao_planilha import coagir_numerico, coagir_s_n, coagir_sexo
+
+# Núcleo de pontuação compartilhado pelos serviços que recebem pacientes no
+# esquema de 'features.txt' (registros JSON, DataFrames, dicts de arrays) e
+# devolvem a probabilidade de alto risco com o pacote do modelo.
+# Ausentes recebem o valor de imputação do treino guardado no pacote (em vez
+# da mediana do próprio lote) — assim o resultado de um paciente não depende
+# dos outros do lote e um pedido de uma linha também pode ser imputado.
+
+ESCALARES = (str, int, float, bool, type(None), np.number, np.bool_)   # valores aceitos nos registros
+
+
+def codificar_s_n(valores):
+    """Flags '_s_n': 0/1 ficam como estão; 'S'/'Sim'/'1' viram 1 e o resto 0 (como em '[4.1]')."""
+    return coagir_s_n(valores)[0]
+
+
+def colunas_necessarias(pacote):
+    """Colunas de entrada usadas para montar X (features diretas + pares de sensores das derivadas)."""
+    colunas = [f for f in pacote.features if f not in FEATURES_DERIVADAS]
+    for esq, dir_, _ in FEATURES_DERIVADAS.values():
+        colunas += [c for c in (esq, dir_) if c not in colunas]
+    return colunas
+
+
+def registros_para_colunas(registros, colunas):
+    """
+    Lista de dicts -> dict coluna -> lista (só as colunas pedidas). Todo registro
+    precisa trazer todas as colunas: um valor null é aceito (recebe a imputação
+    do treino), mas uma chave ausente levanta KeyError com as chaves faltantes.
+    Valores que não são números, textos ou null (listas, objetos) levantam TypeError.
+    """
+    for i, registro in enumerate(registros):
+        faltantes = [c for c in colunas if c not in registro]
+        if faltantes:
+            raise KeyError(f"registro {i}: {', '.join(faltantes)}")
+        compostos = [c for c in colunas if not isinstance(registro[c], ESCALARES)]
+        if compostos:
+            raise TypeError(f"Valores devem ser números, textos ou null: registro {i}: "
+                            + ', '.join(f"{c}={registro[c]!r}" for c in compostos))
+    return {c: [r[c] for r in registros] for c in colunas}
+
+
+def descrever_invalidos(invalidos, registros, inicio=0):
+    """
+    Uma mensagem por registro com células inválidas ('registro 0: idade='abc''),
+    para as linhas [inicio, inicio + len(registros)) das máscaras de 'invalidos'.
+    """
+    mensagens = []
+    for i, registro in enumerate(registros):
+        colunas = [c for c, mascara in invalidos.items() if mascara[inicio + i]]
+        if colunas:
+            mensagens.append(f"registro {i}: " + ', '.join(f"{c}={registro.get(c)!r}" for c in colunas))
+    return mensagens
+
+
+def matriz_features(colunas, pacote, dtype=None, com_invalidos=False):
+    """
+    Monta X (na ordem de 'pacote.features'), imputado e escalado, a partir de
+    um mapeamento coluna -> valores. Levanta KeyError se faltar coluna.
+    'dtype': float64 por padrão; float32 com um pacote compacto. Cada coluna é
+    calculada em float64 e só então convertida, então os valores de X são os
+    mesmos que a floresta veria a partir de um X em float64.
+    Com 'com_invalidos', retorna (X, invalidos): {coluna de entrada: máscara das
+    linhas} só para as colunas com células inválidas (texto não numérico, sexo
+    desconhecido...), que em X foram imputadas como ausentes.
+    """
+    if dtype is None:
+        dtype = np.float32 if pacote.compacto else np.float64
+    derivadas = calcular_features(colunas)
+    n = len(next(iter(derivadas.values())))
+    X = np.empty((n, len(pacote.features)), dtype=dtype)
+    scaler = pacote.scaler
+    numericas = {f: k for k, f in enumerate(pacote.features_numericas)}
+    centrar = getattr(scaler, 'with_mean', True)
+    dividir = getattr(scaler, 'with_std', True)
+    invalidos = {}
+
+    def anotar(coluna, mascara):
+        if mascara.any():
+            invalidos[coluna] = mascara
+
+    for j, feature in enumerate(pacote.features):
+        if feature in derivadas:
+            valores = derivadas[feature]
+            if com_invalidos:
+                for coluna in FEATURES_DERIVADAS[feature][:2]:
+                    anotar(coluna, coagir_numerico(colunas[coluna])[1])
+        elif feature == 'sexo':
+            valores = codificar_sexo(colunas['sexo'])
+            if com_invalidos:
+                anotar('sexo', coagir_sexo(colunas['sexo'])[1])
+        elif feature.endswith('_s_n'):
+            valores, mascara = coagir_s_n(colunas[feature])
+            anotar(feature, mascara)
+        else:
+            valores, mascara = coagir_numerico(colunas[feature])
+            anotar(feature, mascara)
+        valores = np.asarray(valores, dtype=np.float64)
+        ausentes = np.isnan(valores)
+        if ausentes.any():
+            valores = np.where(ausentes, pacote.imputacao[j], valores)
+        if feature in numericas:
+            k = numericas[feature]
+            if centrar:
+                valores = valores - scaler.mean_[k]
+            if dividir:
+                valores = valores / scaler.scale_[k]
+        X[:, j] = valores
+    return (X, invalidos) if com_invalidos else X
+
+
+def pontuar(dados, pacote):
+    """
+    Probabilidade de alto risco para cada paciente de 'dados'
+    (DataFrame, dict de colunas ou lista de registros). Levanta KeyError se
+    faltar coluna e ValueError se houver células inválidas (em vez de
+    pontuá-las como ausentes).
+    """
+    registros = dados if isinstance(dados, list) else None
+    if registros is not None:
+        dados = registros_para_colunas(registros, colunas_necessarias(pacote))
+    X, invalidos = matriz_features(dados, pacote, com_invalidos=True)
+    if invalidos:
+        if registros is not None:
+            detalhes = descrever_invalidos(invalidos, registros)
+        else:
+            detalhes = [f"{c}: {int(m.sum())} célula(s)" for c, m in invalidos.items()]
+        raise ValueError("Valores inválidos: " + '; '.join(detalhes))
+    return pacote.predict_proba(X)[:, 1]
@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from formato_colunar import ler_pacientes_em_blocos
+from gerador_streaming import EscritorLotes
+from engenharia_features import ALVO
+from pacote_modelo import carregar_pacote, ARQUIVO_PACOTE
+from pontuacao import matriz_features
+from explicacoes import explicar as explicar_risco, principais_fatores
+
+# Pontuação em lote de arquivos grandes de pacientes (Parquet ou CSV de
+# exportação). A entrada é lida em blocos; cada bloco é pontuado por um
+# processo do pool (o pacote é carregado com mmap em cada processo, então os
+# arrays da floresta são as mesmas páginas na memória) e o resultado é gravado
+# na ordem original assim que fica pronto. A memória fica limitada a
+# tamanho_bloco x blocos em andamento.
+# Blocos grandes vão ao RandomForest original guardado no pacote (bem mais
+# rápido que a floresta compilada em volume; ver 'PacoteModelo.predict_proba'),
+# com n_jobs=1 nos processos do pool: o paralelismo já vem dos processos.
+# Com 'explicar', cada paciente recebe também as contribuições de cada feature
+# para a probabilidade (decomposição pelos caminhos das árvores) e um texto
+# com os principais fatores, calculados no mesmo bloco.
+
+COLUNAS_IDENTIFICACAO = ['id', 'nome', 'sobrenome']
+TAMANHO_BLOCO = 100_000
+
+_pacote = None  # pacote do processo trabalhador
+
+
+def _iniciar_trabalhador(caminho_pacote):
+    global _pacote
+    _pacote = carregar_pacote(caminho_pacote)
+    if _pacote.modelo is not None:
+        _pacote.modelo.n_jobs = 1
+
+
+def pontuar_bloco(df, pacote=None, explicar=False):
+    """
+    Resultado de um bloco: identificação, 'Risco_Real' (se o alvo estiver
+    presente), 'Risco_Previsto' e 'Prob_Alto_Risco', na ordem das linhas.
+    Com 'explicar': 'Fatores_Risco' e uma coluna 'Contrib_<feature>' por feature.
+    """
+    pacote = pacote or _pacote
+    X = matriz_features(df, pacote)
+    proba = pacote.predict_proba(X)
+    resultado = df[[c for c in COLUNAS_IDENTIFICACAO if c in df.columns]].reset_index(drop=True)
+    if ALVO in df.columns:
+        resultado['Risco_Real'] = df[ALVO].to_numpy()
+    resultado['Risco_Previsto'] = pacote.classes[np.argmax(proba, axis=1)].astype('int8')
+    resultado['Prob_Alto_Risco'] = proba[:, 1]
+    if explicar:
+        _, contribuicoes = explicar_risco(X, pacote)
+        resultado['Fatores_Risco'] = principais_fatores(contribuicoes)
+        for feature in pacote.features:
+            resultado[f'Contrib_{feature}'] = contribuicoes[feature].to_numpy(dtype=np.float32)
+    return resultado
+
+
+class MetricasIncrementais:
+    """Matriz de confusão (classes 0/1) acumulada bloco a bloco."""
+
+    def __init__(self):
+        self.matriz = np.zeros((2, 2), dtype=np.int64)
+
+    def atualizar(self, real, previsto):
+        real = np.asarray(real)
+        valido = ~pd.isna(real)
+        indices = real[valido].astype(np.int64) * 2 + np.asarray(previsto)[valido].astype(np.int64)
+        self.matriz += np.bincount(indices, minlength=4).reshape(2, 2)
+
+    def acuracia(self):
+        total = self.matriz.sum()
+        return np.trace(self.matriz) / total if total else float('nan')
+
+    def relatorio(self):
+        """Precisão, recall, F1 e suporte por classe, como o classification_report do sklearn."""
+        acertos = np.diag(self.matriz)
+        suporte = self.matriz.sum(axis=1)
+        previstos = self.matriz.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precisao = np.nan_to_num(acertos / previstos)
+            recall = np.nan_to_num(acertos / suporte)
+            f1 = np.nan_to_num(2 * precisao * recall / (precisao + recall))
+        tabela = pd.DataFrame({'precision': precisao, 'recall': recall, 'f1-score': f1, 'support': suporte},
+                              index=['0', '1'])
+        pesos = suporte / suporte.sum() if suporte.sum() else np.zeros(2)
+        tabela.loc['macro avg'] = [precisao.mean(), recall.mean(), f1.mean(), suporte.sum()]
+        tabela.loc['weighted avg'] = [precisao @ pesos, recall @ pesos, f1 @ pesos, suporte.sum()]
+        tabela['support'] = tabela['support'].astype(int)
+        return tabela
+
+
+def pontuar_arquivo(entrada, saida, caminho_pacote=ARQUIVO_PACOTE, tamanho_bloco=TAMANHO_BLOCO,
+                    processos=None, verbose=True, explicar=False):
+    """
+    Pontua 'entrada' em blocos e grava os resultados em 'saida' ('.csv' grava o
+    CSV de exportação; outro caminho grava Parquet, um row group por bloco).
+
+    Com processos > 1 os blocos são pontuados em paralelo, com no máximo
+    2 x processos blocos em andamento. Se o alvo estiver presente, a matriz de
+    confusão é acumulada durante a leitura. 'explicar' grava também as
+    contribuições por feature de cada paciente (ver 'pontuar_bloco').
+    Retorna (linhas, MetricasIncrementais ou None).
+    """
+    processos = processos or os.cpu_count()
+    formato = 'csv' if saida.endswith('.csv') else 'parquet'
+    metricas = None
+    linhas = 0
+    inicio = time.perf_counter()
+
+    def gravar(resultado):
+        nonlocal metricas, linhas
+        escritor.escrever(resultado)
+        if 'Risco_Real' in resultado.columns:
+            metricas = metricas or MetricasIncrementais()
+            metricas.atualizar(resultado['Risco_Real'], resultado['Risco_Previsto'])
+        linhas += len(resultado)
+        if verbose:
+            print(f"  {linhas:,} pacientes pontuados ({time.perf_counter() - inicio:.1f} s)")
+
+    blocos = ler_pacientes_em_blocos(entrada, tamanho_bloco)
+    with EscritorLotes(saida, formato) as escritor:
+        if processos == 1:
+            pacote = carregar_pacote(caminho_pacote)
+            for bloco in blocos:
+                gravar(pontuar_bloco(bloco, pacote, explicar))
+        else:
+            with ProcessPoolExecutor(processos, initializer=_iniciar_trabalhador,
+                                     initargs=(caminho_pacote,)) as pool:
+                pendentes = deque()
+                for bloco in blocos:
+                    pendentes.append(pool.submit(pontuar_bloco, bloco, None, explicar))
+                    if len(pendentes) >= 2 * processos:
+                        gravar(pendentes.popleft().result())
+                while pendentes:
+                    gravar(pendentes.popleft().result())
+
+    if verbose:
+        segundos = time.perf_counter() - inicio
+        print(f"\n{linhas:,} pacientes em {segundos:.1f} s ({linhas / segundos:,.0f} pacientes/s) -> '{saida}'")
+        if metricas is not None:
+            print(metricas.relatorio().to_markdown(floatfmt=("", ".4f", ".4f", ".4f", ".0f")))
+            print(f"Acurácia: {metricas.acuracia():.4f}")
+            print("Matriz de Confusão:")
+            print(metricas.matriz)
+    return linhas, metricas
+
+
+if __name__ == "__main__":
+    # python pontuacao_lotes.py entrada.parquet saida.parquet [processos] [tamanho_bloco]
+    if len(sys.argv) < 3:
+        print("Uso: python pontuacao_lotes.py <entrada> <saida> [processos] [tamanho_bloco]")
+        sys.exit(1)
+    try:
+        pontuar_arquivo(sys.argv[1], sys.argv[2],
+                        processos=int(sys.argv[3]) if len(sys.argv) > 3 else None,
+                        tamanho_bloco=int(sys.argv[4]) if len(sys.argv) > 4 else TAMANHO_BLOCO)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Erro: {e}")
+        sys.exit(1)
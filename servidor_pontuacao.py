@@ -0,0 +1,247 @@
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+
+from pacote_modelo import carregar_pacote, ARQUIVO_PACOTE
+from pontuacao import matriz_features, registros_para_colunas, colunas_necessarias, descrever_invalidos
+
+# Serviço local de pontuação de risco. O pacote do modelo fica carregado na
+# memória; pedidos concorrentes são agrupados em micro-lotes antes de chamar
+# a floresta (uma chamada vetorizada para vários pacientes em vez de uma por
+# pedido).
+#
+#   POST /pontuar   corpo: um registro, uma lista de registros ou {"registros": [...]}
+#                   (colunas de 'features.txt'); resposta com probabilidade e risco.
+#                   Chave ausente ou célula inválida (ex.: "idade": "abc") -> 400
+#                   com os registros e colunas; null é aceito (imputação do treino);
+#                   qualquer outra falha -> 500 (contada em "erros" e registrada no stderr)
+#   GET  /metricas  contadores e percentis de latência
+#   GET  /saude     versão e hash do esquema do pacote
+
+PORTA_PADRAO = 8765
+MAX_LOTE = 512                  # pacientes por micro-lote
+MAX_ESPERA_S = 0.002            # espera máxima por mais pedidos depois do primeiro
+LIMIAR_RISCO = 0.5
+JANELA_LATENCIAS = 10_000
+
+
+class Metricas:
+    """Contadores de vazão e janela das últimas latências (em segundos)."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.inicio = time.perf_counter()
+        self.pedidos = 0
+        self.pacientes = 0
+        self.lotes = 0
+        self.erros = 0
+        self.latencias = deque(maxlen=JANELA_LATENCIAS)
+
+    def registrar_pedido(self, n_pacientes, segundos):
+        with self._trava:
+            self.pedidos += 1
+            self.pacientes += n_pacientes
+            self.latencias.append(segundos)
+
+    def registrar_lote(self):
+        with self._trava:
+            self.lotes += 1
+
+    def registrar_erro(self):
+        with self._trava:
+            self.erros += 1
+
+    def resumo(self):
+        with self._trava:
+            latencias = np.array(self.latencias)
+            decorrido = time.perf_counter() - self.inicio
+            resumo = {
+                'pedidos': self.pedidos,
+                'pacientes': self.pacientes,
+                'lotes': self.lotes,
+                'erros': self.erros,
+                'pacientes_por_lote': self.pacientes / self.lotes if self.lotes else 0.0,
+                'pedidos_por_s': self.pedidos / decorrido,
+                'pacientes_por_s': self.pacientes / decorrido,
+            }
+        if len(latencias):
+            for p in (50, 90, 99):
+                resumo[f'latencia_p{p}_ms'] = float(np.percentile(latencias, p) * 1e3)
+        return resumo
+
+
+class Agrupador:
+    """
+    Junta pedidos concorrentes em micro-lotes. Cada pedido entra na fila com
+    um Future; uma thread retira o primeiro, espera até MAX_ESPERA_S por mais
+    (sem passar de MAX_LOTE pacientes), pontua tudo de uma vez e devolve a
+    fatia de cada pedido.
+    """
+
+    def __init__(self, pacote, metricas, max_lote=MAX_LOTE, max_espera_s=MAX_ESPERA_S):
+        self.pacote = pacote
+        self.metricas = metricas
+        self.max_lote = max_lote
+        self.max_espera_s = max_espera_s
+        self.colunas = colunas_necessarias(pacote)
+        self._fila = queue.Queue()
+        self._thread = threading.Thread(target=self._laco, daemon=True)
+        self._thread.start()
+
+    def pontuar(self, registros):
+        futuro = Future()
+        self._fila.put((registros, futuro))
+        return futuro.result()
+
+    def _laco(self):
+        while True:
+            lote = [self._fila.get()]
+            n = len(lote[0][0])
+            limite = time.perf_counter() + self.max_espera_s
+            while n < self.max_lote:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    break
+                try:
+                    item = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                lote.append(item)
+                n += len(item[0])
+            self._processar(lote)
+
+    def _pontuar(self, registros):
+        X, invalidos = matriz_features(registros_para_colunas(registros, self.colunas), self.pacote,
+                                       com_invalidos=True)
+        return self.pacote.predict_proba(X)[:, 1], invalidos
+
+    @staticmethod
+    def _entregar(futuro, regs, proba, invalidos, inicio=0):
+        """Resultado do pedido, ou ValueError se algum dos seus registros tiver células inválidas."""
+        mensagens = descrever_invalidos(invalidos, regs, inicio)
+        if mensagens:
+            futuro.set_exception(ValueError("Valores inválidos: " + '; '.join(mensagens)))
+        else:
+            futuro.set_result(proba[inicio:inicio + len(regs)])
+
+    def _processar(self, lote):
+        registros = [r for regs, _ in lote for r in regs]
+        try:
+            proba, invalidos = self._pontuar(registros)
+        except Exception:
+            # Um registro malformado não derruba os outros pedidos do lote: pontua um a um
+            for regs, futuro in lote:
+                try:
+                    self._entregar(futuro, regs, *self._pontuar(regs))
+                except Exception as e:
+                    futuro.set_exception(e)
+            self.metricas.registrar_lote()
+            return
+        self.metricas.registrar_lote()
+        inicio = 0
+        for regs, futuro in lote:
+            self._entregar(futuro, regs, proba, invalidos, inicio)
+            inicio += len(regs)
+
+
+class ServidorPontuacao(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256    # fila de conexões pendentes (o padrão, 5, recusa clientes sob carga)
+
+
+def criar_servidor(pacote, porta=PORTA_PADRAO, host="127.0.0.1", max_lote=MAX_LOTE, max_espera_s=MAX_ESPERA_S):
+    metricas = Metricas()
+    agrupador = Agrupador(pacote, metricas, max_lote, max_espera_s)
+
+    class Manipulador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # conexões persistentes (keep-alive)
+        disable_nagle_algorithm = True  # evita ~40 ms de atraso (Nagle + ACK atrasado) em respostas pequenas
+
+        def _responder(self, status, corpo):
+            dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            if self.path == '/metricas':
+                self._responder(200, metricas.resumo())
+            elif self.path == '/saude':
+                self._responder(200, {'status': 'ok', 'versao': pacote.versao, 'hash_esquema': pacote.hash_esquema})
+            else:
+                self._responder(404, {'erro': f"Caminho '{self.path}' não encontrado."})
+
+        def do_POST(self):
+            if self.path != '/pontuar':
+                self._responder(404, {'erro': f"Caminho '{self.path}' não encontrado."})
+                return
+            inicio = time.perf_counter()
+            try:
+                corpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                unico = isinstance(corpo, dict) and 'registros' not in corpo
+                registros = [corpo] if unico else (corpo['registros'] if isinstance(corpo, dict) else corpo)
+                if not isinstance(registros, list) or not all(isinstance(r, dict) for r in registros):
+                    raise ValueError("Envie um registro, uma lista de registros ou {\"registros\": [...]}.")
+                proba = agrupador.pontuar(registros) if registros else np.array([])
+            except KeyError as e:
+                metricas.registrar_erro()
+                self._responder(400, {'erro': f"Colunas necessárias ausentes no {e.args[0]}."})
+                return
+            except (ValueError, TypeError) as e:
+                # TypeError: valores que não são números nem textos (listas, objetos)
+                metricas.registrar_erro()
+                self._responder(400, {'erro': str(e)})
+                return
+            except Exception as e:
+                # Ex.: corpo fora de UTF-8 ou falha na thread do agrupador: responde em vez de derrubar a conexão
+                metricas.registrar_erro()
+                print(f"Erro inesperado em POST /pontuar: {e!r}", file=sys.stderr)
+                self._responder(500, {'erro': "Erro interno ao pontuar."})
+                return
+
+            riscos = (proba >= LIMIAR_RISCO).astype(int).tolist()
+            if unico:
+                resposta = {'probabilidade': float(proba[0]), 'risco': riscos[0]}
+            else:
+                resposta = {'probabilidades': proba.tolist(), 'riscos': riscos}
+            self._responder(200, resposta)
+            metricas.registrar_pedido(len(registros), time.perf_counter() - inicio)
+
+        def log_message(self, formato, *args):
+            pass  # sem log por pedido (custo alto sob carga)
+
+    servidor = ServidorPontuacao((host, porta), Manipulador)
+    servidor.metricas = metricas
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço local de pontuação de risco (micro-lotes).")
+    parser.add_argument('--pacote', default=ARQUIVO_PACOTE)
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    parser.add_argument('--max-lote', type=int, default=MAX_LOTE)
+    parser.add_argument('--max-espera-ms', type=float, default=MAX_ESPERA_S * 1e3)
+    args = parser.parse_args()
+
+    try:
+        pacote = carregar_pacote(args.pacote)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Erro ao carregar o pacote do modelo: {e}")
+        sys.exit(1)
+
+    servidor = criar_servidor(pacote, args.porta, max_lote=args.max_lote, max_espera_s=args.max_espera_ms / 1e3)
+    print(f"Servindo em http://127.0.0.1:{args.porta} (pacote {pacote.versao}, esquema {pacote.hash_esquema[:12]})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nEncerrando.")
+        servidor.server_close()
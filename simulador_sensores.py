@@ -0,0 +1,223 @@
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from gerador_vetorizado import STANCE_TIME_MEDIA_S, VELOCIDADE_MEDIA_M_S_BASE, HUMIDITY_RANGE_PERC
+
+# Simulador de séries temporais brutas da palmilha (in-shoe), passo a passo.
+# Cada paciente é descrito por uma linha do gerador v3 (perfil) e vira uma
+# matriz (amostras x canais) float32 gravada como .npy via memmap, de modo
+# que a série nunca precisa caber inteira na memória.
+
+# Regiões plantares: (nome, centro da fase de apoio em que o pico ocorre, peso relativo ao pico do pé)
+REGIOES = [
+    ('calcanhar', 0.15, 0.80),
+    ('mediope', 0.40, 0.35),
+    ('metatarso', 0.70, 1.00),
+    ('halux', 0.85, 0.70),
+]
+LARGURA_PICO_FASE = 0.12
+FRACAO_APOIO = 0.62             # fração da passada em que o pé está no chão
+PRESSAO_REPOUSO_FRAC = 0.10     # pressão em repouso (sentado/parado) como fração do pico
+RUIDO_PRESSAO_KPA = 2.0
+VARIACAO_PASSADA = 0.05         # variação de pico entre passadas (desvio relativo)
+
+AQUECIMENTO_MARCHA_C = 0.8      # aumento de temperatura durante a marcha
+TAU_TEMPERATURA_MIN = 15.0
+RUIDO_TEMPERATURA_C = 0.05
+AUMENTO_UMIDADE_MARCHA_PERC = 15.0
+TAU_UMIDADE_MIN = 20.0
+RUIDO_ACELERACAO_G = 0.02
+
+CANAIS = (
+    [f'pressao_esq_{nome}_kpa' for nome, _, _ in REGIOES]
+    + [f'pressao_dir_{nome}_kpa' for nome, _, _ in REGIOES]
+    + ['temperatura_esq_c', 'temperatura_dir_c',
+       'umidade_esq_perc', 'umidade_dir_perc',
+       'aceleracao_vertical_g']
+)
+N_CANAIS = len(CANAIS)
+
+
+def _periodo_passada(velocidade):
+    """Período da passada (s): tempo de apoio do v3 dividido pela fração de apoio."""
+    stance_time = np.clip(STANCE_TIME_MEDIA_S / (velocidade / VELOCIDADE_MEDIA_M_S_BASE), 0.5, 1.1)
+    return stance_time / FRACAO_APOIO
+
+
+def _media_movel_exponencial(alvo, inicial, tau):
+    """Filtro de primeira ordem minuto a minuto (resposta térmica/umidade lenta)."""
+    alfa = 1 - np.exp(-1.0 / tau)
+    saida = np.empty_like(alvo)
+    valor = inicial
+    for i, a in enumerate(alvo):
+        valor += (a - valor) * alfa
+        saida[i] = valor
+    return saida
+
+
+def _pressao_pe(fase_pe, andando, fator_passada, pico, rng):
+    """Pressão (kPa) das regiões de um pé; retorna matriz (n, len(REGIOES))."""
+    s = fase_pe / FRACAO_APOIO
+    apoio = andando & (s < 1.0)
+    saida = np.empty((len(fase_pe), len(REGIOES)), dtype=np.float32)
+    for r, (_, centro, peso) in enumerate(REGIOES):
+        onda = np.exp(-0.5 * ((s - centro) / LARGURA_PICO_FASE) ** 2)
+        valor = np.where(apoio, pico * peso * onda * fator_passada, 0.0)
+        valor += np.where(andando, 0.0, PRESSAO_REPOUSO_FRAC * pico * peso)
+        valor += rng.normal(0, RUIDO_PRESSAO_KPA, len(fase_pe))
+        saida[:, r] = np.maximum(valor, 0.0)
+    return saida
+
+
+def simular_paciente(perfil, caminho, hz=100, dias=7, horas_uso_dia=8.0, rng=None, minutos_por_bloco=10):
+    """
+    Simula 'dias' dias de uso da palmilha para um paciente e grava em 'caminho' (.npy).
+
+    'perfil' é uma linha do gerador v3 (dict ou Series). Usa a velocidade da
+    marcha (cadência e tempo de apoio), a contagem de passos diária (quanto
+    tempo o paciente caminha), os picos de pressão de cada pé, a aceleração
+    vertical RMS e as temperaturas/umidades de cada pé como linha de base —
+    as temperaturas já trazem o "hot spot" sorteado pelo gerador para os
+    pacientes de alto risco.
+
+    A série é escrita bloco a bloco ('minutos_por_bloco') num memmap, com
+    memória limitada ao bloco. Retorna o número de amostras gravadas.
+    """
+    if rng is None:
+        rng = np.random.default_rng(42)
+
+    velocidade = float(perfil['velocidade_marcha_m_s'])
+    periodo = _periodo_passada(velocidade)
+    pico_esq = float(perfil['pressao_pico_esq_kpa'])
+    pico_dir = float(perfil['pressao_pico_dir_kpa'])
+    amplitude_acel = float(perfil['aceleracao_vertical_rms']) * np.sqrt(2)
+
+    minutos_dia = int(horas_uso_dia * 60)
+    amostras_minuto = 60 * hz
+    amostras_dia = minutos_dia * amostras_minuto
+    total = dias * amostras_dia
+
+    # Fração dos minutos em marcha para atingir a contagem de passos diária (2 passos por passada)
+    segundos_andando = float(perfil['contagem_passos']) * periodo / 2
+    p_andar = min(1.0, segundos_andando / (minutos_dia * 60))
+
+    serie = np.lib.format.open_memmap(caminho, mode='w+', dtype=np.float32, shape=(total, N_CANAIS))
+
+    fase = 0.0
+    for dia in range(dias):
+        andando_min = rng.random(minutos_dia) < p_andar
+
+        # Temperatura e umidade evoluem minuto a minuto conforme a atividade
+        temp_min = []
+        umid_min = []
+        for lado in ('esq', 'dir'):
+            t_base = float(perfil[f'temperatura_{lado}_c'])
+            u_base = float(perfil[f'umidade_{lado}_perc'])
+            temp_min.append(_media_movel_exponencial(
+                t_base + AQUECIMENTO_MARCHA_C * andando_min, t_base, TAU_TEMPERATURA_MIN))
+            umid_min.append(np.clip(_media_movel_exponencial(
+                u_base + AUMENTO_UMIDADE_MARCHA_PERC * andando_min, u_base, TAU_UMIDADE_MIN),
+                *HUMIDITY_RANGE_PERC))
+
+        for inicio_min in range(0, minutos_dia, minutos_por_bloco):
+            fim_min = min(inicio_min + minutos_por_bloco, minutos_dia)
+            n = (fim_min - inicio_min) * amostras_minuto
+            andando = np.repeat(andando_min[inicio_min:fim_min], amostras_minuto)
+
+            # Fase da passada acumulada apenas nas amostras em marcha
+            fases = fase + np.cumsum(andando / (periodo * hz))
+            passada = np.floor(fases).astype(np.int64)
+            primeira = passada[0]
+            fator = rng.normal(1.0, VARIACAO_PASSADA, passada[-1] - primeira + 2)
+            fator_passada = fator[passada - primeira]
+            fase = fases[-1]
+
+            fase_esq = fases % 1.0
+            fase_dir = (fases + 0.5) % 1.0
+
+            bloco = np.empty((n, N_CANAIS), dtype=np.float32)
+            n_reg = len(REGIOES)
+            bloco[:, :n_reg] = _pressao_pe(fase_esq, andando, fator_passada, pico_esq, rng)
+            bloco[:, n_reg:2 * n_reg] = _pressao_pe(fase_dir, andando, fator_passada, pico_dir, rng)
+
+            trecho = slice(inicio_min, fim_min)
+            for c, valores in enumerate(temp_min + umid_min):
+                bloco[:, 2 * n_reg + c] = np.repeat(valores[trecho], amostras_minuto)
+            bloco[:, 2 * n_reg:2 * n_reg + 2] += rng.normal(0, RUIDO_TEMPERATURA_C, (n, 2))
+
+            # Aceleração vertical (g): dois impactos por passada durante a marcha
+            acel = 1.0 + andando * amplitude_acel * np.sin(4 * np.pi * fases)
+            bloco[:, -1] = acel + rng.normal(0, RUIDO_ACELERACAO_G, n)
+
+            inicio = dia * amostras_dia + inicio_min * amostras_minuto
+            serie[inicio:inicio + n] = bloco
+
+    serie.flush()
+    del serie
+    return total
+
+
+def _simular_tarefa(tarefa):
+    perfil, caminho, hz, dias, horas_uso_dia, semente = tarefa
+    return simular_paciente(perfil, caminho, hz, dias, horas_uso_dia, np.random.default_rng(semente))
+
+
+def simular_coorte(df_perfis, diretorio, hz=100, dias=7, horas_uso_dia=8.0, seed=42, processos=1):
+    """
+    Simula as séries de todos os pacientes de 'df_perfis' em 'diretorio'.
+
+    Grava um '<id>.npy' por paciente e um 'manifesto.json' com a frequência,
+    os canais e o número de amostras de cada arquivo. Cada paciente recebe
+    um filho de 'SeedSequence(seed)', então o resultado não depende de
+    'processos'. Retorna o manifesto.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    sementes = np.random.SeedSequence(seed).spawn(len(df_perfis))
+    perfis = df_perfis.to_dict('records')
+    tarefas = [
+        (perfil, os.path.join(diretorio, f"{perfil['id']}.npy"), hz, dias, horas_uso_dia, semente)
+        for perfil, semente in zip(perfis, sementes)
+    ]
+
+    if processos > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            amostras = list(executor.map(_simular_tarefa, tarefas))
+    else:
+        amostras = [_simular_tarefa(tarefa) for tarefa in tarefas]
+
+    manifesto = {
+        'hz': hz,
+        'dias': dias,
+        'horas_uso_dia': horas_uso_dia,
+        'canais': CANAIS,
+        'dtype': 'float32',
+        'pacientes': [
+            {'id': perfil['id'], 'arquivo': os.path.basename(tarefa[1]), 'amostras': n,
+             'risco_ulcera_calc': int(perfil['risco_ulcera_calc'])}
+            for perfil, tarefa, n in zip(perfis, tarefas, amostras)
+        ],
+    }
+    with open(os.path.join(diretorio, 'manifesto.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    return manifesto
+
+
+def carregar_serie(diretorio, id_paciente):
+    """Abre a série de um paciente como memmap somente leitura (amostras x canais)."""
+    return np.load(os.path.join(diretorio, f"{id_paciente}.npy"), mmap_mode='r')
+
+
+if __name__ == "__main__":
+    from gerador_vetorizado import gerar_lote
+
+    perfis = gerar_lote(8, np.random.default_rng(42), incluir_nomes=False)
+    inicio = time.perf_counter()
+    manifesto = simular_coorte(perfis, "series_sensores", hz=100, dias=1, horas_uso_dia=8.0)
+    segundos = time.perf_counter() - inicio
+
+    total_amostras = sum(p['amostras'] for p in manifesto['pacientes'])
+    print(f"{len(perfis)} pacientes, {total_amostras:,} amostras x {N_CANAIS} canais em {segundos:.1f} s "
+          f"({total_amostras / segundos:,.0f} amostras/s)")
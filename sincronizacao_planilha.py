@@ -0,0 +1,320 @@
+import os
+import hashlib
+import numpy as np
+import joblib
+from gspread.utils import rowcol_to_a1
+
+# Sincronização incremental entre as abas do Google Sheets e os scripts.
+# Um instantâneo local (por aba e por script) guarda o cabeçalho, os ids e um
+# hash de cada linha da última sincronização. Com ele:
+#   - '[5]' envia só as linhas novas/alteradas (em vez de 'clear()' + envio de tudo),
+#     conferindo antes só o cabeçalho e a coluna de ids da aba;
+#   - '[4.1]' sabe quais pacientes mudaram e reescreve só as células de risco
+#     cujo valor mudou.
+# As escritas são agrupadas em intervalos contíguos de linhas e enviadas no
+# menor número de chamadas 'batch_update' possível.
+# Com uma aba do ClientePlanilhas, as escritas independentes (lotes, limpeza
+# do fim da aba) são enviadas em paralelo.
+# As leituras usam UNFORMATTED_VALUE: números voltam como números (8.8, e não
+# '8,8' conforme a localidade da planilha) e os hashes batem com os valores locais.
+
+MAX_CELULAS_POR_CHAMADA = 200_000   # células por 'batch_update' (limite de tamanho da requisição)
+MAX_LACUNA = 2                      # linhas inalteradas entre dois intervalos que são reenviadas para uni-los
+RENDERIZACAO = 'UNFORMATTED_VALUE'
+
+
+def normalizar_celula(valor):
+    """Texto canônico de uma célula: vazio para None/NaN, 7.0 como '7'."""
+    if valor is None or (isinstance(valor, float) and valor != valor):
+        return ''
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def hash_linha(linha):
+    texto = '\x1f'.join(normalizar_celula(v) for v in linha).rstrip('\x1f')
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=16).digest()
+
+
+def agrupar_intervalos(indices, max_lacuna=MAX_LACUNA):
+    """Índices ordenados -> intervalos [inicio, fim) contíguos (lacunas de até 'max_lacuna' são unidas)."""
+    intervalos = []
+    for i in indices:
+        if intervalos and i - intervalos[-1][1] <= max_lacuna:
+            intervalos[-1][1] = i + 1
+        else:
+            intervalos.append([i, i + 1])
+    return [tuple(intervalo) for intervalo in intervalos]
+
+
+def _executar(aba, tarefas):
+    """Executa as tarefas (funções sem argumentos) em paralelo se a aba for do ClientePlanilhas; senão, em ordem."""
+    em_paralelo = getattr(aba, 'em_paralelo', None)
+    if em_paralelo is not None and len(tarefas) > 1:
+        return em_paralelo(*tarefas)
+    return [tarefa() for tarefa in tarefas]
+
+
+def _tarefas_envio(aba, dados, value_input_option):
+    """Uma tarefa 'batch_update' por lote de até MAX_CELULAS_POR_CHAMADA células (intervalos disjuntos)."""
+    lotes, lote, celulas = [], [], 0
+    for item in dados:
+        n = sum(len(linha) for linha in item['values'])
+        if lote and celulas + n > MAX_CELULAS_POR_CHAMADA:
+            lotes.append(lote)
+            lote, celulas = [], 0
+        lote.append(item)
+        celulas += n
+    if lote:
+        lotes.append(lote)
+    return [lambda lote=lote: aba.batch_update(lote, value_input_option=value_input_option) for lote in lotes]
+
+
+def _enviar_em_lotes(aba, dados, value_input_option):
+    """Envia os intervalos em 'batch_update', dividindo só quando passa de MAX_CELULAS_POR_CHAMADA."""
+    tarefas = _tarefas_envio(aba, dados, value_input_option)
+    _executar(aba, tarefas)
+    return len(tarefas)
+
+
+# --- Instantâneo ---
+
+def carregar_instantaneo(caminho):
+    """Retorna {'cabecalho', 'ids', 'hashes', 'revisao'} ou None se não houver instantâneo."""
+    if not caminho or not os.path.exists(caminho):
+        return None
+    conteudo = joblib.load(caminho)
+    bruto = conteudo['hashes'].tobytes()
+    conteudo['hashes'] = [bruto[i * 16:(i + 1) * 16] for i in range(len(conteudo['ids']))]
+    conteudo.setdefault('revisao', None)   # instantâneos gravados antes da revisão
+    return conteudo
+
+
+def salvar_instantaneo(caminho, cabecalho, linhas, coluna_id=0, hashes=None, ids=None, revisao=None):
+    """
+    Grava o instantâneo; com 'hashes' e 'ids' já calculados (ex.: carga em blocos), 'linhas' pode ser None.
+    'revisao' (opcional) é a data da última modificação da planilha vista nesta sincronização.
+    """
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    hashes = hashes if hashes is not None else [hash_linha(linha) for linha in linhas]
+    if ids is None:
+        ids = [normalizar_celula(linha[coluna_id]) if len(linha) > coluna_id else '' for linha in linhas]
+    conteudo = {
+        'cabecalho': list(cabecalho),
+        'ids': list(ids),
+        'hashes': np.frombuffer(b''.join(hashes), dtype=np.uint8).reshape(-1, 16),
+        'revisao': revisao,
+    }
+    temporario = caminho + '.tmp'
+    joblib.dump(conteudo, temporario)
+    os.replace(temporario, caminho)
+
+
+def _linhas_alteradas(hashes_antigos, hashes_novos):
+    return [i for i, h in enumerate(hashes_novos) if i >= len(hashes_antigos) or hashes_antigos[i] != h]
+
+
+# --- Leitura com diferenças ('[4.1]') ---
+
+def ler_alteracoes(aba, caminho_instantaneo=None, ignorar=()):
+    """
+    Lê a aba inteira numa única chamada e compara cada linha (sem as colunas
+    de 'ignorar', ex.: a coluna de resultado) com o instantâneo.
+    Retorna (cabecalho, linhas, hashes, alteradas) — 'alteradas' são os índices
+    (0 = primeira linha de dados) novos ou modificados desde o instantâneo
+    (todos, se não houver instantâneo).
+    """
+    valores = aba.get_all_values(value_render_option=RENDERIZACAO)
+    if not valores:
+        return [], [], [], []
+    cabecalho = [normalizar_celula(c) for c in valores[0]]
+    linhas = valores[1:]
+    manter = [j for j, nome in enumerate(cabecalho) if nome not in ignorar]
+    hashes = [hash_linha([linha[j] if j < len(linha) else '' for j in manter]) for linha in linhas]
+
+    instantaneo = carregar_instantaneo(caminho_instantaneo)
+    if instantaneo is None or instantaneo['cabecalho'] != [cabecalho[j] for j in manter]:
+        alteradas = list(range(len(linhas)))
+    else:
+        alteradas = _linhas_alteradas(instantaneo['hashes'], hashes)
+    return cabecalho, linhas, hashes, alteradas
+
+
+def atualizar_coluna(aba, cabecalho, linhas, nome_coluna, valores, value_input_option='USER_ENTERED',
+                     max_lacuna=MAX_LACUNA):
+    """
+    Escreve 'valores' (um por linha de dados: números ou textos) na coluna 'nome_coluna', mas só
+    nas células cujo conteúdo atual (de 'linhas', lidas antes) é diferente.
+    Cria o cabeçalho se a coluna não existir. Retorna um resumo da escrita.
+    """
+    if nome_coluna in cabecalho:
+        j = cabecalho.index(nome_coluna)
+        atuais = [normalizar_celula(linha[j]) if j < len(linha) else '' for linha in linhas]
+    else:
+        j = len(cabecalho)
+        atuais = [''] * len(linhas)
+    novos = [normalizar_celula(v) for v in valores]
+    alteradas = [i for i, (atual, novo) in enumerate(zip(atuais, novos)) if atual != novo]
+
+    letra = rowcol_to_a1(1, j + 1)[:-1]
+    dados = []
+    if nome_coluna not in cabecalho:
+        dados.append({'range': f'{letra}1', 'values': [[nome_coluna]]})
+    intervalos = agrupar_intervalos(alteradas, max_lacuna)
+    for inicio, fim in intervalos:
+        # Linha i dos dados = linha i + 2 da planilha (a 1 é o cabeçalho)
+        dados.append({'range': f'{letra}{inicio + 2}:{letra}{fim + 1}',
+                      'values': [[v if isinstance(v, str) else float(v)] for v in valores[inicio:fim]]})
+    chamadas = _enviar_em_lotes(aba, dados, value_input_option) if dados else 0
+    return {'coluna': letra, 'celulas_alteradas': len(alteradas), 'intervalos': len(intervalos),
+            'chamadas': chamadas}
+
+
+# --- Envio com diferenças ('[5]') ---
+
+def linhas_para_envio(linhas):
+    """Linhas como vão para a API: None/NaN viram célula vazia, o resto segue como está."""
+    return [[normalizar_celula(v) if v is None or v != v else v for v in linha] for linha in linhas]
+
+
+def _ultima_coluna(n_colunas):
+    return rowcol_to_a1(1, max(n_colunas, 1))[:-1]
+
+
+def enviar_tabela(aba, cabecalho, linhas, caminho_instantaneo, coluna_id=0, value_input_option='RAW',
+                  max_lacuna=MAX_LACUNA):
+    """
+    Deixa a aba igual a cabeçalho + 'linhas' enviando só o que mudou.
+
+    Com instantâneo, confere numa só leitura o cabeçalho e a coluna de ids da
+    aba; se baterem, as diferenças vêm dos hashes do instantâneo (sem baixar a
+    aba). Sem instantâneo, ou se a aba foi editada por fora, a aba é lida uma
+    vez e comparada linha a linha. Linhas que sobrarem no fim são apagadas.
+    Retorna um resumo da sincronização.
+    """
+    cabecalho = list(cabecalho)
+    ultima = _ultima_coluna(len(cabecalho))
+    hashes_novos = [hash_linha(linha) for linha in linhas]
+    instantaneo = carregar_instantaneo(caminho_instantaneo)
+
+    base = None
+    if instantaneo is not None and instantaneo['cabecalho'] == cabecalho:
+        letra_id = rowcol_to_a1(1, coluna_id + 1)[:-1]
+        lido_cabecalho, lido_ids = aba.batch_get([f'A1:{ultima}1', f'{letra_id}2:{letra_id}'],
+                                                 value_render_option=RENDERIZACAO)
+        lido_cabecalho = [normalizar_celula(c) for c in (lido_cabecalho[0] if lido_cabecalho else [])]
+        lido_ids = [normalizar_celula(l[0]) if l else '' for l in lido_ids]
+        if lido_cabecalho == cabecalho and lido_ids == instantaneo['ids']:
+            base = {'cabecalho': cabecalho, 'hashes': instantaneo['hashes']}
+    if base is None:
+        valores = aba.get_all_values(value_render_option=RENDERIZACAO)
+        n = len(cabecalho)
+        base = {
+            'cabecalho': [normalizar_celula(c) for c in (valores[0][:n] if valores else [])],
+            'hashes': [hash_linha(linha[:n]) for linha in valores[1:]],
+        }
+
+    dados = []
+    if base['cabecalho'] != cabecalho:
+        dados.append({'range': f'A1:{ultima}1', 'values': [cabecalho]})
+    alteradas = _linhas_alteradas(base['hashes'], hashes_novos)
+    intervalos = agrupar_intervalos(alteradas, max_lacuna)
+    for inicio, fim in intervalos:
+        dados.append({'range': f'A{inicio + 2}:{ultima}{fim + 1}',
+                      'values': linhas_para_envio(linhas[inicio:fim])})
+    tarefas = _tarefas_envio(aba, dados, value_input_option)
+    sobrando = len(base['hashes']) - len(linhas)
+    if sobrando > 0:
+        tarefas.append(lambda: aba.batch_clear([f'{len(linhas) + 2}:{len(base["hashes"]) + 1}']))
+    _executar(aba, tarefas)   # intervalos disjuntos: a ordem não importa
+    chamadas = len(tarefas)
+
+    salvar_instantaneo(caminho_instantaneo, cabecalho, linhas, coluna_id, hashes_novos)
+    return {'linhas': len(linhas), 'linhas_alteradas': len(alteradas), 'linhas_apagadas': max(sobrando, 0),
+            'intervalos': len(intervalos), 'chamadas_escrita': chamadas}
+
+
+# --- Medição offline ---
+
+def medir_sincronizacao(qtd=20_000, fracao_alterada=0.01, seed=42):
+    """
+    Compara, numa PlanilhaFalsa (latência e cota simuladas, sem dormir), o
+    envio completo de '[5]' e a reescrita da coluna inteira de '[4.1]' com a
+    sincronização incremental, depois de alterar 'fracao_alterada' das linhas.
+    """
+    import tempfile
+    import pandas as pd
+    from planilha_falsa import PlanilhaFalsa
+    from gerador_vetorizado import gerar_lote
+    from formato_colunar import para_exportacao
+
+    rng = np.random.default_rng(seed)
+    df = para_exportacao(gerar_lote(qtd, rng))
+    cabecalho = df.columns.tolist()
+    linhas = df.values.tolist()
+    alterar = rng.choice(qtd, max(1, int(qtd * fracao_alterada)), replace=False)
+    linhas_depois = [list(l) for l in linhas]
+    j_idade = cabecalho.index('idade')
+    for i in alterar:
+        linhas_depois[i][j_idade] += 1
+    proba = rng.random(qtd).round(2)
+    proba_depois = proba.copy()
+    proba_depois[alterar] = (proba_depois[alterar] + 0.01).round(2)
+
+    resultados = []
+
+    def medir(nome, aba, funcao):
+        aba.zerar_medidas()
+        funcao()
+        resumo = aba.resumo()
+        resultados.append({'cenario': nome, 'chamadas': resumo['chamadas'],
+                           'celulas_lidas': resumo['celulas_lidas'], 'celulas_escritas': resumo['celulas_escritas'],
+                           'tempo_api_s': resumo['tempo_api_s']})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        instantaneo = os.path.join(tmp, 'envio.joblib')
+
+        # '[5]': envio completo x incremental (segunda execução, com 1% alterado)
+        aba = PlanilhaFalsa(dormir=False)
+        aba.clear()
+        aba.update([cabecalho] + linhas)
+
+        def envio_completo():
+            aba.clear()
+            aba.update([cabecalho] + linhas_depois)
+        medir('[5] clear + envio completo', aba, envio_completo)
+
+        aba = PlanilhaFalsa([cabecalho] + linhas, dormir=False)
+        salvar_instantaneo(instantaneo, cabecalho, linhas)
+        medir('[5] incremental', aba, lambda: enviar_tabela(aba, cabecalho, linhas_depois, instantaneo))
+
+        # '[4.1]': coluna de risco inteira x só as células alteradas
+        coluna = 'risco_modelo_rf'
+        inicial = [cabecalho + [coluna]] + [l + [p] for l, p in zip(linhas, proba)]
+
+        aba = PlanilhaFalsa(inicial, dormir=False)
+
+        def coluna_completa():
+            registros = aba.get_all_records()
+            cabecalho_lido = aba.row_values(1)
+            letra = rowcol_to_a1(1, cabecalho_lido.index(coluna) + 1)[:-1]
+            aba.update([[p] for p in proba_depois], f'{letra}2:{letra}{len(registros) + 1}')
+        medir('[4.1] leitura + coluna inteira', aba, coluna_completa)
+
+        aba = PlanilhaFalsa(inicial, dormir=False)
+
+        def coluna_incremental():
+            cab, lidas, _, _ = ler_alteracoes(aba, ignorar=[coluna])
+            atualizar_coluna(aba, cab, lidas, coluna, proba_depois)
+        medir('[4.1] leitura + células alteradas', aba, coluna_incremental)
+
+    tabela = pd.DataFrame(resultados)
+    print(f"--- {qtd:,} pacientes, {len(alterar):,} alterados ---")
+    print(tabela.to_markdown(index=False, floatfmt=".2f"))
+    return tabela
+
+
+if __name__ == "__main__":
+    import sys
+    medir_sincronizacao(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
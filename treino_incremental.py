@@ -0,0 +1,211 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestClassifier
+
+from formato_colunar import ler_pacientes_em_blocos, COLUNAS_ESQUEMA
+from pacote_modelo import salvar_pacote, ARQUIVO_PACOTE
+from engenharia_features import (
+    adicionar_features, FEATURES_DERIVADAS, FEATURES_NUMERICAS,
+    COLUNAS_SENSORES_BRUTAS, ALVO,
+)
+
+# Treino "out-of-core" para coortes maiores que a RAM.
+# Em vez de concatenar tudo, escalar, aplicar SMOTE e treinar em memória
+# (como em '[2] - analise_modelagem.py'), os dados são percorridos em blocos:
+#   1ª passada: StandardScaler.partial_fit e contagem de classes (só linhas de treino);
+#   2ª passada: uma floresta pequena por bloco, com pesos de classe no lugar do SMOTE;
+#               as árvores são reunidas num único RandomForestClassifier;
+#   3ª passada: avaliação no teste com matriz de confusão e ROC AUC acumuladas.
+# A memória fica limitada ao tamanho do bloco (mais as árvores já treinadas).
+# Os artefatos têm os mesmos nomes e formatos dos gerados por '[2]'.
+
+ARQUIVOS_PADRAO = ["pacientes_simulados_v3_literatura.parquet", "novos_1000_pacientes.parquet"]
+N_BINS_AUC = 1000
+
+
+def ordem_features():
+    """
+    Ordem das colunas de X, igual à de '[2]' para dados no esquema de features.txt:
+    colunas do esquema (sem identificação, sensores brutos e alvo) seguidas das derivadas.
+    """
+    remover = {'id', 'nome', 'sobrenome', ALVO, *COLUNAS_SENSORES_BRUTAS}
+    return [c for c in COLUNAS_ESQUEMA if c not in remover] + list(FEATURES_DERIVADAS)
+
+
+def _blocos(caminhos, tamanho_bloco):
+    """Percorre todos os arquivos em sequência, devolvendo (indice_bloco, DataFrame)."""
+    indice = 0
+    for caminho in caminhos:
+        for bloco in ler_pacientes_em_blocos(caminho, tamanho_bloco):
+            yield indice, bloco
+            indice += 1
+
+
+def _mascara_teste(indice_bloco, n, fracao_teste, seed):
+    """Sorteio determinístico de quais linhas do bloco vão para o teste (igual em todas as passadas)."""
+    rng = np.random.default_rng([seed, indice_bloco])
+    return rng.random(n) < fracao_teste
+
+
+def _preparar(bloco, features):
+    """Engenharia de features do bloco; retorna (X float32 sem escalar, y)."""
+    adicionar_features(bloco)
+    X = np.column_stack([np.asarray(bloco[f], dtype=np.float32) for f in features])
+    y = bloco[ALVO].to_numpy().astype(np.int8)
+    return X, y
+
+
+def _numericas(X, indices_num):
+    """Colunas numéricas como DataFrame, para que o scaler guarde os nomes (como em '[2]')."""
+    return pd.DataFrame(X[:, indices_num], columns=FEATURES_NUMERICAS)
+
+
+def _imputar_e_escalar(X, indices_num, scaler):
+    """Escala as colunas numéricas e troca ausentes por 0 (a média, já escalada)."""
+    X[:, indices_num] = scaler.transform(_numericas(X, indices_num))
+    np.nan_to_num(X, copy=False, nan=0.0)
+    return X
+
+
+class AcumuladorMetricas:
+    """Matriz de confusão e ROC AUC (por histograma de probabilidades) acumuladas bloco a bloco."""
+
+    def __init__(self, n_bins=N_BINS_AUC):
+        self.confusao = np.zeros((2, 2), dtype=np.int64)
+        self.hist = np.zeros((2, n_bins), dtype=np.int64)
+        self.n_bins = n_bins
+
+    def atualizar(self, y, proba, limiar=0.5):
+        pred = (proba >= limiar).astype(np.int64)
+        np.add.at(self.confusao, (y.astype(np.int64), pred), 1)
+        bins = np.minimum((proba * self.n_bins).astype(np.int64), self.n_bins - 1)
+        for classe in (0, 1):
+            self.hist[classe] += np.bincount(bins[y == classe], minlength=self.n_bins)
+
+    def f1(self):
+        tp = self.confusao[1, 1]
+        fp = self.confusao[0, 1]
+        fn = self.confusao[1, 0]
+        return 2 * tp / (2 * tp + fp + fn) if tp else 0.0
+
+    def roc_auc(self):
+        """AUC pela estatística de Mann-Whitney sobre os histogramas (empates contam 1/2)."""
+        neg, pos = self.hist[0], self.hist[1]
+        if neg.sum() == 0 or pos.sum() == 0:
+            return float('nan')
+        negativos_abaixo = np.cumsum(neg) - neg
+        ganhos = (pos * negativos_abaixo).sum() + 0.5 * (pos * neg).sum()
+        return ganhos / (pos.sum() * neg.sum())
+
+
+def treinar_out_of_core(caminhos=ARQUIVOS_PADRAO, tamanho_bloco=250_000, n_estimators=100,
+                        max_depth=10, fracao_teste=0.3, seed=42, n_jobs=-1,
+                        prefixo_artefatos="", verbose=True):
+    """
+    Treina o RandomForest de '[2]' percorrendo os dados em blocos.
+
+    O desbalanceamento é tratado com pesos de classe ('balanced', calculados
+    com as contagens globais da 1ª passada) em vez de SMOTE, sem criar cópias
+    sobreamostradas. Cada bloco recebe ceil(n_estimators / n_blocos) árvores.
+
+    Salva 'modelo_rf_v1.joblib', 'scaler_v1.joblib', 'features_v1.joblib',
+    'numeric_features_v1.joblib' e o pacote único (com 'prefixo_artefatos') e retorna
+    (modelo, scaler, features, metricas_teste).
+    """
+    features = ordem_features()
+    indices_num = [features.index(f) for f in FEATURES_NUMERICAS]
+    tempos = {}
+
+    # --- 1ª passada: scaler incremental e contagem de classes (treino) ---
+    inicio = time.perf_counter()
+    scaler = StandardScaler()
+    contagem = np.zeros(2, dtype=np.int64)
+    n_blocos = 0
+    for indice, bloco in _blocos(caminhos, tamanho_bloco):
+        X, y = _preparar(bloco, features)
+        treino = ~_mascara_teste(indice, len(y), fracao_teste, seed)
+        scaler.partial_fit(_numericas(X[treino], indices_num))
+        contagem += np.bincount(y[treino], minlength=2)
+        n_blocos += 1
+    tempos['estatisticas'] = time.perf_counter() - inicio
+
+    if n_blocos == 0:
+        raise ValueError("Nenhum dado encontrado nos arquivos informados.")
+    pesos_classe = contagem.sum() / (2 * np.maximum(contagem, 1))
+    arvores_por_bloco = max(1, math.ceil(n_estimators / n_blocos))
+    if verbose:
+        print(f"{contagem.sum()} pacientes de treino em {n_blocos} blocos "
+              f"(classe 0: {contagem[0]}, classe 1: {contagem[1]}).")
+        print(f"Pesos de classe: {np.round(pesos_classe, 3).tolist()} | {arvores_por_bloco} árvores por bloco.")
+
+    # --- 2ª passada: uma floresta por bloco, reunidas num único modelo ---
+    inicio = time.perf_counter()
+    modelo = None
+    for indice, bloco in _blocos(caminhos, tamanho_bloco):
+        X, y = _preparar(bloco, features)
+        treino = ~_mascara_teste(indice, len(y), fracao_teste, seed)
+        X, y = _imputar_e_escalar(X[treino], indices_num, scaler), y[treino]
+        if len(np.unique(y)) < 2:
+            if verbose:
+                print(f"Aviso: bloco {indice} tem uma única classe; ignorado no treino.")
+            continue
+
+        floresta = RandomForestClassifier(
+            n_estimators=arvores_por_bloco, max_depth=max_depth,
+            random_state=seed + indice, n_jobs=n_jobs)
+        floresta.fit(X, y, sample_weight=pesos_classe[y])
+
+        if modelo is None:
+            modelo = floresta
+        else:
+            modelo.estimators_ += floresta.estimators_
+            modelo.n_estimators = len(modelo.estimators_)
+    tempos['treino'] = time.perf_counter() - inicio
+
+    if modelo is None:
+        raise ValueError("Nenhum bloco com as duas classes; não foi possível treinar.")
+    modelo.feature_names_in_ = np.array(features, dtype=object)
+
+    # --- 3ª passada: avaliação no teste ---
+    inicio = time.perf_counter()
+    metricas = AcumuladorMetricas()
+    for indice, bloco in _blocos(caminhos, tamanho_bloco):
+        X, y = _preparar(bloco, features)
+        teste = _mascara_teste(indice, len(y), fracao_teste, seed)
+        if not teste.any():
+            continue
+        X = _imputar_e_escalar(X[teste], indices_num, scaler)
+        proba = modelo.predict_proba(pd.DataFrame(X, columns=features))[:, 1]
+        metricas.atualizar(y[teste], proba)
+    tempos['avaliacao'] = time.perf_counter() - inicio
+
+    # --- Salvamento (mesmos artefatos de '[2]') ---
+    joblib.dump(modelo, f'{prefixo_artefatos}modelo_rf_v1.joblib')
+    joblib.dump(scaler, f'{prefixo_artefatos}scaler_v1.joblib')
+    joblib.dump(pd.Index(features), f'{prefixo_artefatos}features_v1.joblib')
+    joblib.dump(list(FEATURES_NUMERICAS), f'{prefixo_artefatos}numeric_features_v1.joblib')
+    # Sem 'imputacao': o pacote usa a média do scaler (numéricas) e 0 (demais), o mesmo de '_imputar_e_escalar'
+    salvar_pacote(modelo, scaler, features, FEATURES_NUMERICAS, f'{prefixo_artefatos}{ARQUIVO_PACOTE}')
+
+    if verbose:
+        print("\n" + "=" * 30)
+        print("AVALIAÇÃO NO TESTE (OUT-OF-CORE)")
+        print("=" * 30)
+        print(f"Árvores: {modelo.n_estimators}")
+        print(f"F1 teste:      {metricas.f1():.4f}")
+        print(f"ROC AUC teste: {metricas.roc_auc():.4f}")
+        print("Matriz de Confusão (Teste):")
+        print(metricas.confusao)
+        print("Tempos (s): " + ", ".join(f"{etapa} {t:.1f}" for etapa, t in tempos.items()))
+        print("Artefatos salvos: modelo_rf_v1.joblib, scaler_v1.joblib, features_v1.joblib, "
+              f"numeric_features_v1.joblib, {ARQUIVO_PACOTE}")
+
+    return modelo, scaler, features, metricas
+
+
+if __name__ == "__main__":
+    treinar_out_of_core()